@@ -0,0 +1,206 @@
+"""
+Ce module mesure la construction de l'index, son rechargement et la latence des recherches sur des corpus
+synthétiques de tailles croissantes, et enregistre les résultats dans un fichier JSON pour comparer deux commits.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+
+# Permet d'importer les modules du projet lorsque le script est lancé depuis benchmarks/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from corpus_generator import generate_corpus, generate_queries, write_corpus
+from models.Corpus import Corpus
+from models.Scorer import BM25Scorer, CosineScorer
+from models.SearchEngine import SearchEngine
+
+SCORERS = {"cosine": CosineScorer, "bm25": BM25Scorer}
+
+def load_corpus(data_file, cleaned_file):
+    """
+    Cette fonction charge un corpus à partir de ses fichiers.
+
+    :param data_file: Chemin du fichier des données complètes.
+    :param cleaned_file: Chemin du fichier des données nettoyées.
+    :return: Un objet Corpus.
+    """
+    corpus = Corpus()
+    corpus.load_from_files(data_file, cleaned_file)
+    return corpus
+
+def measure_build(data_file, cleaned_file, scorer_name, measure_memory=True):
+    """
+    Cette fonction mesure la construction de l'index (SearchEngine.__init__) : durée et pic de mémoire.
+    Le pic de mémoire est mesuré lors d'une seconde construction, tracemalloc ralentissant l'exécution.
+
+    :param data_file: Chemin du fichier des données complètes.
+    :param cleaned_file: Chemin du fichier des données nettoyées.
+    :param scorer_name: Nom de la fonction de score (clé de SCORERS).
+    :param measure_memory: Mesurer le pic de mémoire.
+    :return: Un tuple (moteur de recherche, durée en secondes, pic de mémoire en octets ou None).
+    """
+    corpus = load_corpus(data_file, cleaned_file)
+    gc.collect()
+    start = time.perf_counter()
+    search_engine = SearchEngine(corpus, scorer=SCORERS[scorer_name](), cache_size=0)
+    build_seconds = time.perf_counter() - start
+
+    peak_memory = None
+    if measure_memory:
+        corpus = load_corpus(data_file, cleaned_file)
+        gc.collect()
+        tracemalloc.start()
+        SearchEngine(corpus, scorer=SCORERS[scorer_name](), cache_size=0)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return search_engine, build_seconds, peak_memory
+
+def measure_index_load(data_file, cleaned_file, index_path):
+    """
+    Cette fonction mesure le rechargement d'un index enregistré sur le disque.
+
+    :param data_file: Chemin du fichier des données complètes.
+    :param cleaned_file: Chemin du fichier des données nettoyées.
+    :param index_path: Répertoire de l'index enregistré.
+    :return: La durée du rechargement en secondes.
+    """
+    # Première construction : enregistrement de l'index
+    SearchEngine(load_corpus(data_file, cleaned_file), index_path=index_path, cache_size=0)
+    corpus = load_corpus(data_file, cleaned_file)
+    start = time.perf_counter()
+    SearchEngine(corpus, index_path=index_path, cache_size=0)
+    return time.perf_counter() - start
+
+def measure_search(search_engine, queries, top_n):
+    """
+    Cette fonction mesure la latence de chaque recherche (cache désactivé) et le débit total.
+
+    :param search_engine: Objet SearchEngine dont l'index est construit.
+    :param queries: Liste des requêtes.
+    :param top_n: Nombre de résultats par requête.
+    :return: Dictionnaire des percentiles de latence (en millisecondes) et du débit (requêtes par seconde).
+    """
+    # Préparation de la fonction de score hors mesure
+    search_engine.search(queries[0], top_n=top_n)
+
+    latencies = np.empty(len(queries))
+    start = time.perf_counter()
+    for i, query in enumerate(queries):
+        query_start = time.perf_counter()
+        search_engine.search(query, top_n=top_n)
+        latencies[i] = time.perf_counter() - query_start
+    total_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    search_engine.search_batch(queries, top_n=top_n)
+    batch_seconds = time.perf_counter() - start
+
+    latencies *= 1000
+    return {
+        "latency_ms_mean": float(latencies.mean()),
+        "latency_ms_p50": float(np.percentile(latencies, 50)),
+        "latency_ms_p90": float(np.percentile(latencies, 90)),
+        "latency_ms_p99": float(np.percentile(latencies, 99)),
+        "latency_ms_max": float(latencies.max()),
+        "qps": len(queries) / total_seconds,
+        "batch_qps": len(queries) / batch_seconds,
+    }
+
+def run_benchmark(num_documents, num_queries=1000, top_n=10, scorer_name="cosine", vocabulary_size=50000, mean_length=300, seed=0, measure_memory=True, work_dir=None):
+    """
+    Cette fonction exécute le benchmark complet sur un corpus synthétique de num_documents villes.
+
+    :param num_documents: Nombre de villes du corpus.
+    :param num_queries: Nombre de requêtes mesurées.
+    :param top_n: Nombre de résultats par requête.
+    :param scorer_name: Nom de la fonction de score (clé de SCORERS).
+    :param vocabulary_size: Nombre de mots distincts.
+    :param mean_length: Nombre moyen de mots par texte.
+    :param seed: Graine du générateur aléatoire.
+    :param measure_memory: Mesurer le pic de mémoire de la construction.
+    :param work_dir: Répertoire des fichiers temporaires (par défaut, celui du système).
+    :return: Dictionnaire des mesures.
+    """
+    corpus_data, vocabulary, probabilities = generate_corpus(num_documents, vocabulary_size, mean_length, seed=seed)
+    queries = generate_queries(vocabulary, probabilities, num_queries, seed=seed + 1)
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as directory:
+        data_file = os.path.join(directory, "data.json")
+        cleaned_file = os.path.join(directory, "data_cleaned.json")
+        write_corpus(corpus_data, data_file, cleaned_file)
+        num_words = sum(len(details["do"].split()) for details in corpus_data.values())
+        del corpus_data
+
+        search_engine, build_seconds, peak_memory = measure_build(data_file, cleaned_file, scorer_name, measure_memory)
+        results = {
+            "num_documents": num_documents,
+            "num_words": num_words,
+            "vocabulary_size": len(search_engine.corpus.vocabulary),
+            "postings": int(search_engine.corpus.index.nnz),
+            "scorer": scorer_name,
+            "build_seconds": build_seconds,
+            "build_peak_memory_mb": peak_memory / 2 ** 20 if peak_memory is not None else None,
+            "index_load_seconds": measure_index_load(data_file, cleaned_file, os.path.join(directory, "index")),
+        }
+        results.update(measure_search(search_engine, queries, top_n))
+    return results
+
+def get_environment():
+    """
+    Cette fonction décrit l'environnement d'exécution, pour comparer les résultats entre deux commits.
+
+    :return: Dictionnaire (commit, date, versions de Python et de numpy, plateforme).
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+    }
+
+def main():
+    """
+    Cette fonction exécute le benchmark pour chaque taille de corpus demandée et enregistre le rapport.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark de l'indexation et de la recherche sur des corpus synthétiques")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Nombre de villes de chaque corpus")
+    parser.add_argument("--queries", type=int, default=1000, help="Nombre de requêtes par corpus")
+    parser.add_argument("--top-n", type=int, default=10, help="Nombre de résultats par requête")
+    parser.add_argument("--scorer", choices=sorted(SCORERS), default="cosine", help="Fonction de score")
+    parser.add_argument("--vocabulary-size", type=int, default=50000, help="Nombre de mots distincts")
+    parser.add_argument("--mean-length", type=int, default=300, help="Nombre moyen de mots par texte")
+    parser.add_argument("--seed", type=int, default=0, help="Graine du générateur aléatoire")
+    parser.add_argument("--no-memory", action="store_true", help="Ne pas mesurer le pic de mémoire")
+    parser.add_argument("--output", default="benchmark_results.json", help="Fichier JSON des résultats")
+    args = parser.parse_args()
+
+    report = {"environment": get_environment(), "results": []}
+    for num_documents in args.sizes:
+        results = run_benchmark(num_documents, args.queries, args.top_n, args.scorer, args.vocabulary_size,
+                                args.mean_length, args.seed, not args.no_memory)
+        report["results"].append(results)
+        print(f"{num_documents} villes : construction {results['build_seconds']:.2f} s, "
+              f"p50 {results['latency_ms_p50']:.2f} ms, p99 {results['latency_ms_p99']:.2f} ms, {results['qps']:.0f} requêtes/s")
+
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=4)
+    print(f"Résultats enregistrés dans {args.output}")
+
+if __name__ == "__main__":
+    main()
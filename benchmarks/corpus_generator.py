@@ -0,0 +1,104 @@
+"""
+Ce module génère des corpus synthétiques au format de data.json (textes dont la fréquence des mots suit une loi de Zipf)
+et les requêtes correspondantes, utilisés par le benchmark.
+"""
+import argparse
+import json
+import numpy as np
+
+# Lettres utilisées pour générer les mots du vocabulaire synthétique
+ALPHABET = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+
+def generate_vocabulary(vocabulary_size, rng):
+    """
+    Cette fonction génère un vocabulaire de mots distincts, de 3 à 10 lettres.
+
+    :param vocabulary_size: Nombre de mots du vocabulaire.
+    :param rng: Générateur aléatoire numpy.
+    :return: Tableau numpy des mots.
+    """
+    words = set()
+    while len(words) < vocabulary_size:
+        lengths = rng.integers(3, 11, size=vocabulary_size)
+        letters = rng.choice(ALPHABET, size=(vocabulary_size, 10))
+        words.update("".join(row[:length]) for row, length in zip(letters, lengths))
+    return np.array(sorted(words)[:vocabulary_size])
+
+def generate_corpus(num_documents, vocabulary_size=50000, mean_length=300, zipf_exponent=1.07, seed=0):
+    """
+    Cette fonction génère un corpus synthétique ayant la même forme que data.json : {ville: {"do": texte}}.
+    La fréquence des mots suit une loi de Zipf et la longueur des textes une loi log-normale, comme pour un texte réel.
+    Le corpus est entièrement déterminé par ses paramètres (même graine, même corpus).
+
+    :param num_documents: Nombre de villes.
+    :param vocabulary_size: Nombre de mots distincts.
+    :param mean_length: Nombre moyen de mots par texte.
+    :param zipf_exponent: Exposant de la loi de Zipf.
+    :param seed: Graine du générateur aléatoire.
+    :return: Un tuple (corpus, vocabulaire, probabilités des mots).
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = generate_vocabulary(vocabulary_size, rng)
+    # Les rangs sont mélangés pour que la fréquence d'un mot ne dépende pas de son ordre alphabétique
+    probabilities = 1.0 / np.arange(1, vocabulary_size + 1) ** zipf_exponent
+    probabilities = rng.permutation(probabilities / probabilities.sum())
+
+    sigma = 0.8
+    lengths = np.maximum(1, rng.lognormal(np.log(mean_length) - sigma ** 2 / 2, sigma, size=num_documents).astype(np.int64))
+    words = vocabulary[rng.choice(vocabulary_size, size=int(lengths.sum()), p=probabilities)]
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+    corpus = {}
+    for i in range(num_documents):
+        corpus[f"City {i:06d}"] = {"do": " ".join(words[offsets[i]:offsets[i + 1]])}
+    return corpus, vocabulary, probabilities
+
+def generate_queries(vocabulary, probabilities, num_queries, max_terms=3, seed=0):
+    """
+    Cette fonction génère des requêtes de 1 à max_terms mots, tirés selon leur fréquence dans le corpus.
+
+    :param vocabulary: Tableau des mots.
+    :param probabilities: Probabilité de chaque mot.
+    :param num_queries: Nombre de requêtes.
+    :param max_terms: Nombre maximum de mots par requête.
+    :param seed: Graine du générateur aléatoire.
+    :return: La liste des requêtes.
+    """
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(1, max_terms + 1, size=num_queries)
+    words = vocabulary[rng.choice(len(vocabulary), size=int(sizes.sum()), p=probabilities)]
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    return [" ".join(words[offsets[i]:offsets[i + 1]]) for i in range(num_queries)]
+
+def write_corpus(corpus, data_file, cleaned_file):
+    """
+    Cette fonction enregistre le corpus au format de data.json et data_cleaned.json.
+    Les textes générés étant déjà nettoyés, les deux fichiers ont le même contenu.
+
+    :param corpus: Le corpus généré.
+    :param data_file: Chemin du fichier des données complètes.
+    :param cleaned_file: Chemin du fichier des données nettoyées.
+    """
+    for file_path in (data_file, cleaned_file):
+        with open(file_path, 'w', encoding='utf-8') as file:
+            json.dump(corpus, file, ensure_ascii=False, indent=4)
+
+def main():
+    """
+    Cette fonction génère un corpus synthétique et l'enregistre, selon les arguments de la ligne de commande.
+    """
+    parser = argparse.ArgumentParser(description="Génération d'un corpus synthétique au format de data.json")
+    parser.add_argument("num_documents", type=int, help="Nombre de villes")
+    parser.add_argument("--output", default="data_synthetic.json", help="Fichier des données")
+    parser.add_argument("--cleaned-output", default="data_synthetic_cleaned.json", help="Fichier des données nettoyées")
+    parser.add_argument("--vocabulary-size", type=int, default=50000, help="Nombre de mots distincts")
+    parser.add_argument("--mean-length", type=int, default=300, help="Nombre moyen de mots par texte")
+    parser.add_argument("--seed", type=int, default=0, help="Graine du générateur aléatoire")
+    args = parser.parse_args()
+
+    corpus, _, _ = generate_corpus(args.num_documents, args.vocabulary_size, args.mean_length, seed=args.seed)
+    write_corpus(corpus, args.output, args.cleaned_output)
+    print(f"{len(corpus)} villes enregistrées dans {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,20 @@ import requests
 import mwparserfromhell
 import json
 import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.DocumentStore import DocumentStore
+
+API_URL = "https://en.wikivoyage.org/w/api.php"
+
+# Nombre maximum de titres par requête autorisé par l'API MediaWiki
+MAX_TITLES_PER_REQUEST = 50
 
 # Fonction pour récupérer l'index des sections et les afficher
 def get_section_indices(city_name:str, section_name:str)->str:
@@ -16,7 +30,6 @@ def get_section_indices(city_name:str, section_name:str)->str:
 
     :return: Retourne l'index de la section recherchée.
     """
-    API_URL = "https://en.wikivoyage.org/w/api.php"
     params_sections = {
         "action": "parse",
         "page": city_name,
@@ -49,7 +62,6 @@ def get_section_content(city_name:str, section_index:int)-> str:
 
     :return: Retourne le contenu de la section recherchée.
     """
-    API_URL = "https://en.wikivoyage.org/w/api.php"
     params_content = {
         "action": "parse",
         "page": city_name,
@@ -74,30 +86,212 @@ def get_section_content(city_name:str, section_index:int)-> str:
         print(f"Erreur : {response_content.status_code}")
         return None
 
-def save_to_json(city_name:str, section_content:str):
+def save_to_json(city_name:str, section_content:str, store_file:str="data.jsonl"):
     """
-    Cette fonction permet d'enregistrer les données récoltées pour une ville spécifique dans un fichier JSON.
+    Cette fonction permet d'enregistrer les données récoltées pour une ville spécifique.
+    Les données sont ajoutées en fin de fichier JSON Lines, sans relire ni réécrire les villes déjà enregistrées ;
+    DocumentStore.compact produit ensuite le fichier JSON final.
 
     :param city_name: Nom de la ville à rechercher.
     :param section_content: Section à enregistrer.
+    :param store_file: Fichier JSON Lines de destination.
     """
-    file_name = "data.json"
-    
-    # Charger les données existantes si le fichier existe
-    if os.path.exists(file_name):
-        with open(file_name, "r", encoding="utf-8") as json_file:
-            data = json.load(json_file)
-    else:
-        data = {}
-    
-    # Ajouter ou mettre à jour les données de la ville
-    data[city_name] = {"do": section_content}
-    
-    # Sauvegarder les données dans le fichier
-    with open(file_name, "w", encoding="utf-8") as json_file:
-        json.dump(data, json_file, ensure_ascii=False, indent=4)
+    with DocumentStore(store_file) as store:
+        store.append(city_name, {"do": section_content})
     print(f"Données de {city_name} sauvegardées.")
 
+def create_session(pool_size:int=8, retries:int=5, backoff_factor:float=0.5)->requests.Session:
+    """
+    Cette fonction permet de créer une session HTTP réutilisant ses connexions, avec relance automatique
+    (attente exponentielle) en cas d'erreur temporaire du serveur.
+
+    :param pool_size: Nombre maximum de connexions conservées ouvertes.
+    :param retries: Nombre maximum de relances d'une requête.
+    :param backoff_factor: Facteur de l'attente exponentielle entre deux relances (en secondes).
+
+    :return: Retourne la session HTTP.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = "moteur-recherche-python (crawler Wikivoyage)"
+    return session
+
+class RateLimiter:
+    """
+    Cette classe permet de limiter le nombre de requêtes envoyées par seconde, tous threads confondus.
+    """
+    def __init__(self, requests_per_second:float):
+        """
+        :param requests_per_second: Nombre maximum de requêtes par seconde (0 pour ne pas limiter).
+        """
+        self.interval = 1 / requests_per_second if requests_per_second else 0
+        self.next_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """
+        Cette méthode bloque le thread appelant jusqu'à ce qu'une nouvelle requête soit autorisée.
+        """
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+def fetch_wikitexts(session:requests.Session, titles:list, api_url:str=API_URL, rate_limiter:RateLimiter=None, timeout:float=30)->dict:
+    """
+    Cette fonction permet de récupérer en une seule requête le wikitexte complet de plusieurs pages (prop=revisions).
+
+    :param session: Session HTTP.
+    :param titles: Titres des pages (au plus MAX_TITLES_PER_REQUEST).
+    :param api_url: Adresse de l'API MediaWiki.
+    :param rate_limiter: Limiteur de débit partagé (optionnel).
+    :param timeout: Délai maximum d'attente de la réponse (en secondes).
+
+    :return: Retourne un dictionnaire {titre demandé: wikitexte}, sans les pages introuvables.
+    """
+    params = {
+        "action": "query",
+        "prop": "revisions",
+        "rvprop": "content",
+        "rvslots": "main",
+        "titles": "|".join(titles),
+        "redirects": 1,
+        "format": "json",
+        "formatversion": 2,
+    }
+    if rate_limiter is not None:
+        rate_limiter.wait()
+    response = session.get(api_url, params=params, timeout=timeout)
+    response.raise_for_status()
+    query = response.json().get("query", {})
+
+    # Retrouver le titre demandé à partir du titre normalisé ou redirigé
+    requested = {title: title for title in titles}
+    for mapping in query.get("normalized", []) + query.get("redirects", []):
+        if mapping["from"] in requested:
+            requested[mapping["to"]] = requested[mapping["from"]]
+
+    wikitexts = {}
+    for page in query.get("pages", []):
+        if page.get("missing") or not page.get("revisions"):
+            continue
+        title = requested.get(page["title"], page["title"])
+        wikitexts[title] = page["revisions"][0]["slots"]["main"]["content"]
+    return wikitexts
+
+def extract_section(wikitext:str, section_name:str)->str:
+    """
+    Cette fonction permet d'extraire une section d'une page à partir de son wikitexte et de la convertir en texte lisible.
+
+    :param wikitext: Wikitexte complet de la page.
+    :param section_name: Nom de la section recherchée.
+
+    :return: Retourne le contenu de la section, ou None si elle est introuvable.
+    """
+    wiki_code = mwparserfromhell.parse(wikitext)
+    sections = wiki_code.get_sections(
+        levels=[2],
+        matches=lambda title: title.strip_code().strip().lower() == section_name,
+    )
+    if not sections:
+        return None
+    return sections[0].strip_code()
+
+def load_checkpoint(checkpoint_file:str)->set:
+    """
+    Cette fonction permet de charger la liste des villes déjà traitées lors d'un précédent crawl.
+
+    :param checkpoint_file: Fichier de reprise.
+
+    :return: Retourne l'ensemble des villes déjà traitées.
+    """
+    if not os.path.exists(checkpoint_file):
+        return set()
+    with open(checkpoint_file, "r", encoding="utf-8") as file:
+        return set(json.load(file))
+
+def save_checkpoint(checkpoint_file:str, done:set):
+    """
+    Cette fonction permet d'enregistrer de manière atomique la liste des villes déjà traitées.
+
+    :param checkpoint_file: Fichier de reprise.
+    :param done: Ensemble des villes déjà traitées.
+    """
+    temporary_file = f"{checkpoint_file}.tmp"
+    with open(temporary_file, "w", encoding="utf-8") as file:
+        json.dump(sorted(done), file, ensure_ascii=False)
+    os.replace(temporary_file, checkpoint_file)
+
+def crawl(cities:list, section_name:str="do", api_url:str=API_URL, output_file:str="data.json",
+          store_file:str="data.jsonl", checkpoint_file:str="crawl_checkpoint.json", max_workers:int=4, batch_size:int=MAX_TITLES_PER_REQUEST,
+          requests_per_second:float=5, session:requests.Session=None)->dict:
+    """
+    Cette fonction permet de récupérer une section pour une liste de villes, par lots de pages traités en parallèle.
+    Les villes déjà traitées (fichier de reprise) sont ignorées : un crawl interrompu reprend là où il s'était arrêté.
+
+    :param cities: Liste des villes.
+    :param section_name: Nom de la section recherchée.
+    :param api_url: Adresse de l'API MediaWiki.
+    :param output_file: Fichier JSON produit à la fin du crawl (None pour ne pas le produire).
+    :param store_file: Fichier JSON Lines dans lequel les villes sont ajoutées au fil du crawl.
+    :param checkpoint_file: Fichier de reprise.
+    :param max_workers: Nombre maximum de requêtes simultanées.
+    :param batch_size: Nombre de pages demandées par requête.
+    :param requests_per_second: Nombre maximum de requêtes par seconde.
+    :param session: Session HTTP (par défaut, une session créée avec create_session).
+
+    :return: Retourne le dictionnaire {ville: contenu de la section} des villes récupérées lors de cet appel.
+    """
+    done = load_checkpoint(checkpoint_file)
+    pending = [city for city in dict.fromkeys(cities) if city not in done]
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+
+    session = session or create_session(pool_size=max_workers)
+    rate_limiter = RateLimiter(requests_per_second)
+    store = DocumentStore(store_file, flush_every=batch_size)
+    collected = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch_wikitexts, session, batch, api_url, rate_limiter): batch for batch in batches}
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                wikitexts = future.result()
+            except requests.RequestException as error:
+                print(f"Erreur pour le lot {batch[0]} ... {batch[-1]} : {error}")
+                continue
+
+            records = {}
+            for city_name in batch:
+                section_content = extract_section(wikitexts[city_name], section_name) if city_name in wikitexts else None
+                if section_content:
+                    records[city_name] = section_content
+                    store.append(city_name, {section_name: section_content})
+                else:
+                    print(f"Section '{section_name.capitalize()}' introuvable pour la ville : {city_name}.")
+
+            # Écrire le lot sur disque, puis marquer ses villes comme traitées
+            store.flush()
+            collected.update(records)
+            done.update(batch)
+            save_checkpoint(checkpoint_file, done)
+            print(f"{len(records)} villes sauvegardées ({len(done)} traitées).")
+
+    if output_file is not None:
+        store.compact(output_file)
+    return collected
+
 # Script principal pour parcourir une liste de villes
 def main():
     """
@@ -119,24 +313,8 @@ def main():
     
     # Section d'intérêt
     section_to_find = "do"
-    
-    for city_name in cities:
-        print(f"\nTraitement de la ville : {city_name}")
-        # Récupération de l'index de la section "Do"
-        section_index = get_section_indices(city_name, section_to_find)
-        
-        if section_index:
-            print(f"Section '{section_to_find.capitalize()}' trouvée pour {city_name}.")
-            
-            # Récupérer le contenu de la section
-            section_content = get_section_content(city_name, section_index)
-            if section_content:
-                # Sauvegarder dans le fichier JSON
-                save_to_json(city_name, section_content)
-            else:
-                print(f"Aucun contenu trouvé pour la section '{section_to_find.capitalize()}' de {city_name}.")
-        else:
-            print(f"Section '{section_to_find.capitalize()}' introuvable pour la ville : {city_name}.")
+
+    crawl(cities, section_to_find)
 
 
 # Exécution du script
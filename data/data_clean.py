@@ -2,68 +2,157 @@
 Ce module regroupe les différentes fonctions permettant de nettoyer le corpus.
 """
 import json
-import re
-import numpy as np
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from nltk.corpus import stopwords
 import nltk
 
-# Téléchargement des stopwords
-nltk.download('stopwords')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.Analyzer import Analyzer
+from models.DocumentStore import DocumentStore
+from models.LazyDocuments import iter_json_object
 
+# Analyseur utilisé par les processus de nettoyage
+ANALYZER = None
 
-def clean_text(text, stop_words):
+
+def load_stop_words():
+    """
+    Cette fonction permet de récupérer la liste des stop words anglais, complétée de quelques mots propres au corpus.
     """
-    Cette fonction permet de nettoyer un texte
+    # Téléchargement des stopwords
+    nltk.download('stopwords', quiet=True)
+    stop_words = set(stopwords.words('english'))
+    additional_stop_words = set([
+    'around', 'many', 'thumb', 'also'
+    ])
+    stop_words.update(additional_stop_words)
+    return stop_words
+
+def create_cleaning_analyzer(stop_words):
+    """
+    Cette fonction permet de créer l'analyseur utilisé pour le nettoyage : seules les lettres de l'alphabet latin
+    sont conservées, en minuscules, et les stop words sont supprimés.
 
-    :param text: Le texte à nettoyer
     :param stop_words: Liste des stop_words
     """
-    # Garder uniquement l'alphabet latin
-    text = re.sub(r'[^a-zA-Z]', ' ', text)
+    return Analyzer(token_pattern=r'[a-z]+', fold_accents=False, stop_words=stop_words)
 
-    # Conversion en minuscules
-    text = text.lower()
+def clean_text(text, analyzer):
+    """
+    Cette fonction permet de nettoyer un texte en une seule passe avec l'analyseur de nettoyage.
 
-    # Suppression des stop words
-    text = ' '.join(word for word in text.split() if word not in stop_words)
-    # Suppression des espaces multiples
-    text = re.sub(r'\s{2,}', ' ', text)
-    return text.strip()
+    :param text: Le texte à nettoyer
+    :param analyzer: Analyseur créé avec create_cleaning_analyzer
+    """
+    return ' '.join(analyzer.analyze(text))
 
-def clean_data(data, stop_words):
+def clean_data(data, analyzer):
     if isinstance(data, dict):
-        return {key: clean_data(value) for key, value in data.items()}
+        return {key: clean_data(value, analyzer) for key, value in data.items()}
     elif isinstance(data, list):
-        return [clean_data(item) for item in data]
+        return [clean_data(item, analyzer) for item in data]
     elif isinstance(data, str):
-        return clean_text(data, stop_words)
+        return clean_text(data, analyzer)
     else:
         return data
 
-def clean_json(input_file, output_file):
+def init_worker(analyzer):
     """
-    Cette fonction permet de nettoyer les données du fichier JSON initial et les stocker dans un nouveau fichier JSON
+    Cette fonction initialise un processus de nettoyage : l'analyseur n'est transmis qu'une seule fois par processus.
 
-    :param input_file: Fichier JSON avec les données brutes
-    :param output_file: Fichier JSON dans lequel seront stockées les données nettoyées
+    :param analyzer: Analyseur créé avec create_cleaning_analyzer
     """
-    # Lecture des données données du fichier JSON
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    global ANALYZER
+    ANALYZER = analyzer
 
-    # Liste des stop words en anglais
-    stop_words = set(stopwords.words('english'))
-    additional_stop_words = set([
-    'around', 'many', 'thumb', 'also'
-    ])
-    stop_words.update(additional_stop_words)
+def clean_chunk(chunk):
+    """
+    Cette fonction permet de nettoyer un lot de documents dans un processus de nettoyage.
 
-    # Nettoyage des données
-    cleaned_data = clean_data(data, stop_words)
+    :param chunk: Liste de couples (nom de la ville, document)
+    :return: La liste des couples nettoyés
+    """
+    return [(city, clean_data(document, ANALYZER)) for city, document in chunk]
+
+def iter_documents(input_file):
+    """
+    Cette fonction permet de parcourir les documents d'un fichier JSON (lu par blocs) ou JSON Lines (lu ligne par ligne).
+
+    :param input_file: Fichier JSON ou JSON Lines avec les données brutes
+    :return: Un générateur de couples (nom de la ville, document)
+    """
+    if input_file.endswith('.jsonl'):
+        yield from DocumentStore(input_file).iter_documents()
+    else:
+        # Lecture incrémentale : le fichier n'est pas chargé entièrement en mémoire
+        for city, document, _, _ in iter_json_object(input_file):
+            yield city, document
+
+def iter_chunks(items, chunk_size):
+    """
+    Cette fonction permet de regrouper les éléments d'un itérable en lots, sans le charger entièrement.
+    """
+    iterator = iter(items)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+def iter_cleaned_chunks(documents, analyzer, workers, chunk_size):
+    """
+    Cette fonction permet de nettoyer des documents par lots, répartis sur plusieurs processus.
+    Le nombre de lots en cours de traitement est borné et l'ordre des documents est conservé.
+
+    :param documents: Itérable de couples (nom de la ville, document)
+    :param analyzer: Analyseur créé avec create_cleaning_analyzer
+    :param workers: Nombre de processus (1 pour nettoyer dans le processus courant)
+    :param chunk_size: Nombre de documents par lot
+    :return: Un générateur de lots nettoyés
+    """
+    if workers == 1:
+        init_worker(analyzer)
+        for chunk in iter_chunks(documents, chunk_size):
+            yield clean_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(analyzer,)) as executor:
+        pending = deque()
+        for chunk in iter_chunks(documents, chunk_size):
+            pending.append(executor.submit(clean_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def clean_json(input_file, output_file, stop_words=None, workers=None, chunk_size=64):
+    """
+    Cette fonction permet de nettoyer les données du fichier JSON initial et les stocker dans un nouveau fichier JSON
+
+    :param input_file: Fichier JSON (ou JSON Lines) avec les données brutes
+    :param output_file: Fichier JSON dans lequel seront stockées les données nettoyées
+    :param stop_words: Liste des stop_words (par défaut, ceux de load_stop_words)
+    :param workers: Nombre de processus de nettoyage (par défaut, le nombre de coeurs)
+    :param chunk_size: Nombre de documents envoyés à la fois à un processus
+    """
+    if stop_words is None:
+        stop_words = load_stop_words()
+    analyzer = create_cleaning_analyzer(stop_words)
+    workers = workers or os.cpu_count() or 1
 
-    # Sauvegarde des données nettoyées dans un nouveau fichier JSON
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(cleaned_data, f, ensure_ascii=False, indent=4)
+    # Écriture progressive du fichier JSON, avec la même mise en forme que json.dump(..., indent=4)
+    temporary_file = f"{output_file}.tmp"
+    with open(temporary_file, 'w', encoding='utf-8') as f:
+        f.write('{')
+        separator = '\n'
+        for chunk in iter_cleaned_chunks(iter_documents(input_file), analyzer, workers, chunk_size):
+            for city, document in chunk:
+                entry = json.dumps({city: document}, ensure_ascii=False, indent=4)
+                f.write(separator + entry[2:-2])
+                separator = ',\n'
+        f.write('\n}' if separator != '\n' else '}')
+    os.replace(temporary_file, output_file)
 
 def main_clean_json() :
     """
@@ -5,10 +5,10 @@ import tkinter as tk
 
 # Chargement des données
 corpus = Corpus()
-corpus.load_from_files('./data/data.json', './data/data_cleaned.json')
+corpus.load_streaming('./data/data.json')
 
 # Initialisation du moteur de recherche
-search_engine = SearchEngine(corpus)
+search_engine = SearchEngine(corpus, index_path='./data/index')
 
 # Lancement de l'interface
 def main():
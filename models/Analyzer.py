@@ -0,0 +1,99 @@
+"""
+Ce module contient la classe Analyzer qui découpe les textes en termes, de manière identique pour le nettoyage,
+l'indexation et les requêtes.
+"""
+import hashlib
+import re
+import sys
+import unicodedata
+
+# Valeur sentinelle du cache : terme non encore analysé
+MISSING = object()
+
+class Analyzer:
+    """
+    Cette classe regroupe en une seule passe les étapes d'analyse d'un texte : normalisation (minuscules, suppression
+    des accents), découpage en mots, filtrage des stop words et racinisation optionnelle.
+    Les expressions régulières sont compilées une seule fois et le résultat de l'analyse de chaque mot est mis en cache.
+    """
+    def __init__(self, token_pattern=r'[a-z0-9]+', lowercase=True, fold_accents=True, stop_words=None, stemmer=None, cache_size=100000):
+        """
+        Cette méthode permet de configurer l'analyseur.
+
+        :param token_pattern: Expression régulière d'un mot, appliquée au texte normalisé.
+        :param lowercase: Conversion du texte en minuscules.
+        :param fold_accents: Suppression des accents et des caractères non latins ("Vélodrome" -> "velodrome").
+        :param stop_words: Ensemble des mots à ignorer (optionnel).
+        :param stemmer: Objet disposant d'une méthode stem (par exemple nltk.stem.PorterStemmer), optionnel.
+        :param cache_size: Nombre maximum de mots conservés dans le cache.
+        """
+        self.token_pattern = re.compile(token_pattern)
+        self.lowercase = lowercase
+        self.fold_accents = fold_accents
+        self.stop_words = frozenset(stop_words or ())
+        self.stemmer = stemmer
+        self.cache_size = cache_size
+        self.cache = {}
+
+    def __getstate__(self):
+        # Le cache n'est pas transmis aux autres processus
+        state = self.__dict__.copy()
+        state["cache"] = {}
+        return state
+
+    def signature(self):
+        """
+        Cette méthode renvoie une empreinte de la configuration de l'analyseur, enregistrée avec l'index :
+        un index construit avec une autre configuration ne doit pas être réutilisé.
+        """
+        configuration = "|".join([
+            self.token_pattern.pattern,
+            str(self.lowercase),
+            str(self.fold_accents),
+            ",".join(sorted(self.stop_words)),
+            type(self.stemmer).__name__ if self.stemmer is not None else "",
+        ])
+        return hashlib.sha256(configuration.encode("utf-8")).hexdigest()
+
+    def normalize(self, text):
+        """
+        Cette méthode normalise un texte avant son découpage.
+
+        :param text: Le texte à normaliser.
+        :return: Le texte normalisé.
+        """
+        if self.lowercase:
+            text = text.lower()
+        if self.fold_accents and not text.isascii():
+            text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+        return text
+
+    def analyze_token(self, token):
+        """
+        Cette méthode applique le filtrage des stop words et la racinisation à un mot.
+
+        :param token: Le mot extrait du texte.
+        :return: Le terme correspondant, ou None si le mot est ignoré.
+        """
+        term = self.cache.get(token, MISSING)
+        if term is MISSING:
+            if token in self.stop_words:
+                term = None
+            else:
+                term = sys.intern(self.stemmer.stem(token) if self.stemmer is not None else token)
+            if len(self.cache) < self.cache_size:
+                self.cache[token] = term
+        return term
+
+    def analyze(self, text):
+        """
+        Cette méthode découpe un texte en termes, en une seule passe sur le texte.
+
+        :param text: Le texte à analyser.
+        :return: La liste des termes du texte.
+        """
+        tokens = self.token_pattern.findall(self.normalize(text))
+        if not self.stop_words and self.stemmer is None:
+            return tokens
+        analyze_token = self.analyze_token
+        return [term for term in map(analyze_token, tokens) if term is not None]
@@ -0,0 +1,80 @@
+"""
+Ce module contient les fonctions de compression des listes d'entiers utilisées par l'index (encodage varbyte).
+"""
+import numpy as np
+
+def varbyte_encode(values):
+    """
+    Cette fonction encode des entiers positifs sur un nombre variable d'octets (format LEB128) : 7 bits par octet,
+    le bit de poids fort indiquant qu'un autre octet suit. Les petits entiers (< 128) n'occupent qu'un octet.
+
+    :param values: Tableau d'entiers positifs ou nuls.
+    :return: Un tuple (octets encodés, nombre d'octets de chaque entier).
+    """
+    values = np.asarray(values)
+    if values.dtype != np.uint64:
+        values = values.astype(np.int64, copy=False)
+    num_bytes = np.ones(len(values), dtype=np.uint8)
+    for shift in range(7, 64, 7):
+        larger = values >= (1 << shift)
+        if not larger.any():
+            break
+        num_bytes += larger
+
+    starts = np.cumsum(num_bytes, dtype=np.int64)
+    data = np.empty(int(starts[-1]) if len(values) else 0, dtype=np.uint8)
+    starts -= num_bytes
+
+    # Octet de poids faible de tous les entiers, puis octets suivants des seuls entiers qui en comportent
+    data[starts] = (values & 0x7F).astype(np.uint8) | ((num_bytes > 1).astype(np.uint8) << 7)
+    for j in range(1, int(num_bytes.max()) if len(values) else 0):
+        selected = np.flatnonzero(num_bytes > j)
+        chunk = ((values[selected] >> values.dtype.type(7 * j)) & 0x7F).astype(np.uint8)
+        chunk[num_bytes[selected] > j + 1] |= 0x80
+        data[starts[selected] + j] = chunk
+    return data, num_bytes
+
+def varbyte_decode(data):
+    """
+    Cette fonction décode une suite d'entiers encodés avec varbyte_encode.
+
+    :param data: Tableau d'octets.
+    :return: Tableau des entiers décodés (uint64).
+    """
+    data = np.asarray(data, dtype=np.uint8)
+    if len(data) == 0:
+        return np.empty(0, dtype=np.uint64)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    groups = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    shifts = (7 * (np.arange(len(data)) - starts[groups])).astype(np.uint64)
+    return np.add.reduceat((data & 0x7F).astype(np.uint64) << shifts, starts)
+
+def delta_encode(values, lengths):
+    """
+    Cette fonction remplace chaque valeur d'une liste triée par l'écart avec la valeur précédente de la même liste.
+    Les listes sont concaténées ; la première valeur de chaque liste est conservée telle quelle.
+
+    :param values: Valeurs concaténées, triées par ordre croissant dans chaque liste.
+    :param lengths: Nombre de valeurs de chaque liste.
+    :return: Les écarts.
+    """
+    values = np.asarray(values, dtype=np.int64)
+    deltas = np.diff(values, prepend=0)
+    firsts = (np.cumsum(lengths) - lengths)[np.asarray(lengths) > 0]
+    deltas[firsts] = values[firsts]
+    return deltas
+
+def delta_decode(deltas, lengths):
+    """
+    Cette fonction reconstitue les valeurs encodées avec delta_encode.
+
+    :param deltas: Écarts concaténés.
+    :param lengths: Nombre de valeurs de chaque liste.
+    :return: Les valeurs.
+    """
+    totals = np.cumsum(np.asarray(deltas, dtype=np.int64))
+    # Retirer la somme des listes précédentes
+    starts = np.cumsum(lengths) - lengths
+    offsets = np.concatenate([[0], totals])[starts]
+    return totals - np.repeat(offsets, lengths)
@@ -1,33 +1,114 @@
 """
 Ce module contient la classe Corpus qui permet de stocker et intéragir avec les données textuelles récoltées.
 """
-import math
 import pandas as pd
+import hashlib
 import json
+import os
 import re
+import threading
+import time
 import numpy as np
-from collections import Counter, defaultdict
+from collections import Counter
+from collections.abc import Sized
+from models.Analyzer import Analyzer
+from models.DocumentStore import DocumentStore
+from models.InvertedIndex import InvertedIndex
+from models.LazyDocuments import LazyDocuments
+from models.Metrics import Metrics
+from models.Vocabulary import TermIndex, Vocabulary
+
+# Version du format de l'index enregistré sur disque, à incrémenter à chaque changement de format
+INDEX_FORMAT_VERSION = 4
+
+# Tableaux du Corpus enregistrés avec l'index
+INDEX_ARRAYS = ("doc_lengths", "tf_values", "idf_vector", "tfidf_values", "doc_norms", "city_names")
+
+# Attributs du Corpus remplacés par la fusion des mises à jour en attente
+MERGED_ATTRIBUTES = ("vocabulary", "term_index", "index", "city_names", "city_index", "doc_lengths", "tf_values",
+                     "idf_vector", "tfidf_values", "doc_norms")
 
 class Corpus:
     """
     Cette classe permet de gérer et manipuler des données textuelles organisées par ville.
     """
-    def __init__(self):
+    def __init__(self, analyzer=None, store_positions=True, metrics=None, compact=False, merge_ratio=0.1):
+        """
+        :param analyzer: Analyseur utilisé pour découper les textes et les requêtes (par défaut, Analyzer()).
+        :param store_positions: Conserver la position des mots dans l'index (requêtes de phrases et de proximité).
+        :param metrics: Objet Metrics recevant la durée des étapes de l'indexation (par défaut, un nouvel objet).
+        :param compact: Compresser l'index (identifiants des documents en varbyte, poids en float32) pour réduire
+                        la mémoire occupée, au prix d'un décodage lors de la recherche et d'une précision réduite des scores.
+        :param merge_ratio: Proportion de documents ajoutés ou supprimés (par rapport aux documents indexés) au-delà
+                            de laquelle refresh lance la fusion de l'index en arrière-plan.
+        """
+        self.analyzer = analyzer or Analyzer()
+        self.store_positions = store_positions
+        self.compact = compact
+        self.merge_ratio = merge_ratio
+        self.metrics = metrics or Metrics()
         self.data = {}
         self.cleaned_data = {}
         self.concatenated_text = None
+        self.index = None
+        self.tf_values = None
+        self.tfidf_values = None
+        self.doc_norms = None
+        self.vocabulary = []
+        self.term_index = {}
+        self.city_names = []
+        self.city_index = {}
+        self.data_file_path = None
+        # Statistiques de la collection entière, lorsque le corpus n'en indexe qu'une partie (shard)
+        self.collection = None
+        # Verrou protégeant les mises à jour de l'index, et numéro de version de l'index
+        self.lock = threading.RLock()
+        self.generation = 0
+        # Version de l'index fusionné et de ses poids (inchangée lorsque seuls les documents en attente changent)
+        self.index_generation = 0
+        # Documents ajoutés depuis la dernière fusion, indexés à part par refresh (objet Corpus, ou None)
+        self.pending = None
+        self.num_updates = 0
+        self.refreshed_updates = 0
+        # Verrou de la fusion : les ajouts et suppressions attendent la fin d'une fusion en cours, pas les recherches
+        self.merge_lock = threading.RLock()
+        self.merge_thread = None
 
     def load_from_files(self, data_file_path, cleaned_file_path):
         """
         Charge les données à partir de deux fichiers : un fichier complet et un fichier nettoyé.
         """
-        # Charger le fichier data.json (données complètes)
-        with open(data_file_path, 'r', encoding='utf-8') as file:
-            self.data = json.load(file)
-        
-        # Charger le fichier data_cleaned.json (données nettoyées)
-        with open(cleaned_file_path, 'r', encoding='utf-8') as file:
-            self.cleaned_data = json.load(file)
+        with self.metrics.time("build", "load"):
+            # Charger le fichier data.json (données complètes)
+            self.data_file_path = data_file_path
+            with open(data_file_path, 'r', encoding='utf-8') as file:
+                self.data = json.load(file)
+
+            # Charger le fichier data_cleaned.json (données nettoyées)
+            with open(cleaned_file_path, 'r', encoding='utf-8') as file:
+                self.cleaned_data = json.load(file)
+
+    def load_from_store(self, store_file_path):
+        """
+        Charge les données directement depuis un fichier JSON Lines (DocumentStore), lu ligne par ligne.
+        Pour une ville enregistrée plusieurs fois, seule la version la plus récente est conservée.
+        """
+        with self.metrics.time("build", "load"):
+            self.data_file_path = store_file_path
+            self.data = {}
+            for city_name, document in DocumentStore(store_file_path).iter_documents():
+                self.data[city_name] = document
+
+    def load_streaming(self, data_file_path):
+        """
+        Charge les données sans les garder en mémoire : le fichier JSON (ou JSON Lines) est lu de manière incrémentale
+        pour repérer la position de chaque ville, et data donne accès aux textes en les relisant sur le disque.
+        L'index est ensuite construit en lisant les textes un par un.
+        """
+        with self.metrics.time("build", "load"):
+            self.data_file_path = data_file_path
+            self.data = LazyDocuments.from_file(data_file_path)
+            self.cleaned_data = {}
 
     def get_city_activities(self, city_name):
         """
@@ -58,42 +139,66 @@ class Corpus:
         print(f"Nombre de villes contenues dans le corpus : {num_cities}")
         print(f"Nombre moyen de caractères à traiter par ville : {avg_do_length:.0f}")
 
-        # Compter les mots dans toutes les sections "do"
-        word_counter = Counter()
-        for details in self.data.values():
-            # Nettoyage du texte en supprimant la ponctuation et en mettant tout en minuscule
-            words = re.findall(r'\b\w+\b', details['do'].lower())
-            word_counter.update(words)
-        
-        # Obtenir les 10 mots les plus fréquents
-        most_common_words = word_counter.most_common(10)
+        # Obtenir les 10 mots les plus fréquents, à partir des statistiques de l'index
+        most_common_words = self.most_common_terms(10)
 
         # Affichage des 10 mots les plus fréquents
         print(f"\nLes 10 mots les plus fréquents dans le corpus :")
         for word, count in most_common_words:
             print(f"{word}: {count}")
 
+    def most_common_terms(self, n=10):
+        """
+        Cette méthode renvoie les termes les plus fréquents du corpus, calculés à partir des postings de l'index
+        (construit lors du premier appel), sans relire les textes.
+
+        :param n: Nombre de termes à retourner.
+        :return: Liste de tuples (terme, nombre d'occurrences), du plus fréquent au moins fréquent.
+        """
+        self.build_index()
+        with self.lock:
+            index = self.index
+            vocabulary = self.vocabulary
+        frequencies = np.bincount(index.posting_term_ids(), weights=index.counts, minlength=index.vocabulary_size)
+        # À fréquence égale, les termes sont classés par ordre alphabétique
+        order = np.argsort(-frequencies, kind="stable")[:n]
+        return [(vocabulary[term_id], int(frequencies[term_id])) for term_id in order if frequencies[term_id] > 0]
+
     def search(self, keyword):
         """
         Cette méthode permet de rechercher un mot clé dans le corpus et renvoie son occurrence par ville.
+        Le résultat est lu dans l'index inversé (construit lors du premier appel) : les postings du terme
+        pour un mot, ou les positions de ses termes pour une suite de mots. Si l'index ne conserve pas les positions,
+        la suite de mots est comptée dans le texte des seuls documents contenant tous ses termes.
+
+        :param keyword: Le mot (ou la suite de mots) recherché, découpé avec l'analyseur du corpus.
+        :return: Liste de tuples (ville, nombre d'occurrences), dans l'ordre du corpus.
         """
-        # Initialisation d'une liste pour stocker les résultats des villes et des sections "do"
-        matches = []
-        
-        # Recherche du mot-clé dans chaque section "do" des villes
-        for city, details in self.data.items():
-            if "do" in details:
-                # Utilisation d'expression régulière pour trouver les occurrences du mot-clé dans la section "do"
-                pattern = re.compile(rf'\b{re.escape(keyword)}\b', re.IGNORECASE)
-                city_matches = pattern.findall(details['do'])
-                
-                # Mot-clé est trouvé, on enregistre la ville et le nombre de correspondances
-                if city_matches:
-                    matches.append((city, len(city_matches)))
-                else :
-                    print("Ce mot n'est pas contenu dans ce Corpus.")
-        
-        return matches
+        self.build_index()
+        with self.lock:
+            term_ids = self.encode_phrase(keyword)
+            if term_ids is None:
+                return []
+            if len(term_ids) == 1:
+                doc_ids, counts = self.index.postings(term_ids[0])
+            elif self.index.has_positions:
+                doc_ids, counts = self.index.phrase_counts(term_ids)
+            else:
+                doc_ids = self.index.common_documents(term_ids)
+                counts = [self.count_phrase(self.tokenize(self.data[self.city_names[doc_id]]["do"]), self.tokenize(keyword))
+                          for doc_id in doc_ids]
+            return [(self.city_names[doc_id], int(count)) for doc_id, count in zip(doc_ids, counts) if count > 0]
+
+    def count_phrase(self, words, phrase):
+        """
+        Cette méthode compte les occurrences d'une suite de termes dans la liste des termes d'un texte.
+
+        :param words: Termes du texte.
+        :param phrase: Termes de la suite recherchée.
+        :return: Le nombre d'occurrences.
+        """
+        size = len(phrase)
+        return sum(1 for start in range(len(words) - size + 1) if words[start:start + size] == phrase)
     
     def clean_text_to_english(self, text):
         """
@@ -114,62 +219,559 @@ class Corpus:
         """
         Cette méthode concatène toutes les sections 'do' pour chaque ville et prépare les textes.
         """
-        texts = []
+        return list(self.iter_texts())
+
+    def iter_texts(self):
+        """
+        Cette méthode parcourt les sections 'do' de chaque ville une par une, sans les conserver.
+        Les noms des villes sont enregistrés au fur et à mesure du parcours.
+
+        :return: Un générateur des textes.
+        """
         self.city_names = []
+        self.city_index = {}
         for city, details in self.data.items():
             if "do" in details:
-                texts.append(details["do"])
+                self.city_index[city] = len(self.city_names)
                 self.city_names.append(city)
-        return texts
+                yield details["do"]
 
-    def calculate_tf(self, texts):
+    def build_index(self):
         """
-        Cette méthode calcule la matrice TF.
+        Cette méthode construit l'index et calcule les poids TF-IDF s'ils ne l'ont pas encore été,
+        ou fusionne les mises à jour en attente (voir merge).
         """
-        self.vocabulary = sorted(set(word for text in texts for word in re.findall(r'\b\w+\b', text.lower())))
-        tf_matrix = []
+        with self.lock:
+            if self.index is None:
+                self.calculate_tf(self.iter_texts())
+                self.calculate_idf()
+                self.calculate_tfidf()
+                return
+        self.merge()
 
+    def tokenize(self, text):
+        """
+        Cette méthode découpe un texte en termes avec l'analyseur du corpus, commun à l'indexation et aux requêtes.
+
+        :param text: Le texte à découper.
+        :return: La liste des termes du texte.
+        """
+        return self.analyzer.analyze(text)
+
+    def encode_query(self, query):
+        """
+        Cette méthode encode une requête sous forme creuse, avec le même découpage que celui utilisé pour l'indexation.
+        Son coût est proportionnel à la longueur de la requête et non à la taille du vocabulaire.
+
+        :param query: Requête textuelle.
+        :return: Les identifiants des termes connus de la requête et leur nombre d'occurrences.
+        """
+        query_word_counts = Counter(self.tokenize(query))
+        term_counts = [(self.term_index[word], count) for word, count in query_word_counts.items() if word in self.term_index]
+        term_ids = np.array([term_id for term_id, _ in term_counts], dtype=np.int64)
+        weights = np.array([count for _, count in term_counts], dtype=np.float64)
+        return term_ids, weights
+
+    def encode_phrase(self, phrase):
+        """
+        Cette méthode encode une phrase en la suite des identifiants de ses termes.
+
+        :param phrase: La phrase.
+        :return: Les identifiants des termes, dans l'ordre, ou None si un terme est absent du corpus.
+        """
+        words = self.tokenize(phrase)
+        if not words or any(word not in self.term_index for word in words):
+            return None
+        return [self.term_index[word] for word in words]
+
+    def calculate_tf(self, texts):
+        """
+        Cette méthode construit l'index inversé des occurrences (et de leurs positions) et calcule les poids TF
+        de chaque posting. Chaque texte n'est découpé qu'une seule fois : les fréquences documentaires utilisées par
+        calculate_idf sont déduites du même index.
+        Les textes sont lus un par un (texts peut être un générateur) et seuls les identifiants de leurs termes
+        sont conservés ; le vocabulaire est trié une fois tous les textes lus.
+        """
+        term_index = {}
+        doc_term_ids = []
+        # Durée du découpage seul, sans la lecture des textes (qui peuvent être relus sur le disque)
+        tokenize_seconds = 0.0
         for text in texts:
-            # Nettoyage du texte 
-            text = self.clean_text_to_english(text)
-            
-            word_counts = Counter(re.findall(r'\b\w+\b', text.lower()))
-            total_words = sum(word_counts.values())
-            tf_vector = [word_counts[word] / total_words for word in self.vocabulary]
-            tf_matrix.append(tf_vector)
+            start = time.perf_counter()
+            words = self.tokenize(text)
+            doc_term_ids.append(np.fromiter((term_index.setdefault(word, len(term_index)) for word in words), dtype=np.int32, count=len(words)))
+            tokenize_seconds += time.perf_counter() - start
+        self.metrics.observe("build", "tokenize", tokenize_seconds)
 
-        self.tf_matrix = np.array(tf_matrix)
+        # Trier le vocabulaire et renuméroter les termes (identifiants provisoires dans l'ordre d'apparition)
+        term_mapping = self.set_vocabulary(list(term_index))
+        del term_index
+        doc_term_ids = [term_mapping[term_ids] for term_ids in doc_term_ids]
 
-    def calculate_idf(self, texts):
+        with self.metrics.time("build", "index"):
+            self.index = InvertedIndex.from_term_sequences(doc_term_ids, len(self.vocabulary), self.store_positions)
+        self.pending = None
+        self.update_tf_values()
+
+    def set_vocabulary(self, words):
         """
-        Cette méthode calcule le vecteur IDF.
+        Cette méthode trie les termes et les enregistre dans une liste associée au dictionnaire {terme: identifiant}
+        (recherche d'un terme en temps constant), ou dans un objet Vocabulary (bloc d'octets contigu, plus compact
+        mais recherche dichotomique) si l'index est compressé.
+
+        :param words: Liste des termes, dans l'ordre de leurs identifiants actuels.
+        :return: Le nouvel identifiant de chaque terme.
         """
-        num_documents = len(texts)
-        doc_frequency = defaultdict(int)
+        order = sorted(range(len(words)), key=words.__getitem__)
+        term_mapping = np.empty(len(words), dtype=np.int32)
+        term_mapping[order] = np.arange(len(words), dtype=np.int32)
+        if self.compact:
+            self.vocabulary = Vocabulary.from_words([words[i] for i in order])
+            self.term_index = TermIndex(self.vocabulary)
+        else:
+            self.vocabulary = [words[i] for i in order]
+            self.term_index = {word: i for i, word in enumerate(self.vocabulary)}
+        return term_mapping
 
-        for word in self.vocabulary:
-            for text in texts:
-                if word in text.lower():
-                    doc_frequency[word] += 1
+    def update_tf_values(self):
+        """
+        Cette méthode calcule la longueur de chaque document et les poids TF de chaque posting à partir de l'index.
+        """
+        with self.metrics.time("build", "tf"):
+            # Nombre de mots de chaque document, utilisé pour normaliser les occurrences
+            self.doc_lengths = np.maximum(np.bincount(self.index.doc_ids, weights=self.index.counts, minlength=self.index.num_documents), 1)
+            self.tf_values = self.index.counts / self.doc_lengths[self.index.doc_ids]
+
+    def calculate_idf(self, texts=None):
+        """
+        Cette méthode calcule le vecteur IDF à partir des fréquences documentaires de l'index.
+        L'index est construit à partir de texts s'il ne l'a pas encore été. Si texts est une liste, il est reconstruit
+        lorsque son nombre de textes diffère du nombre de documents indexés ; un générateur n'est pas parcouru
+        si l'index existe déjà.
+
+        :param texts: Textes des documents (liste ou générateur), optionnel.
+        """
+        if self.index is None:
+            self.calculate_tf(self.iter_texts() if texts is None else texts)
+        elif isinstance(texts, Sized) and self.index.num_documents != len(texts):
+            self.calculate_tf(texts)
+
+        with self.metrics.time("build", "idf"):
+            num_documents, doc_frequency, _ = self.collection_statistics()
+
+            self.idf_vector = np.log(num_documents / (doc_frequency + 1))
 
-        self.idf_vector = np.array([
-            math.log((num_documents / (doc_frequency[word] + 1))) for word in self.vocabulary
-        ])
+    def collection_statistics(self):
+        """
+        Cette méthode renvoie les statistiques utilisées par les poids IDF et BM25 : celles de l'index, ou celles
+        de la collection entière (attribut collection) lorsque le corpus est un shard, pour que les scores
+        soient identiques à ceux d'un index unique.
+
+        :return: Le nombre de documents, le nombre de documents contenant chaque terme et la longueur moyenne des documents.
+        """
+        if self.collection is not None:
+            return self.collection["num_documents"], self.collection["doc_frequency"], self.collection["average_length"]
+        num_documents = self.index.num_documents
+        average_length = np.asarray(self.doc_lengths, dtype=np.float64).mean() if num_documents else 1.0
+        return num_documents, self.index.document_frequencies(), average_length
 
     def calculate_tfidf(self):
         """
-        Cette méthode calcule la matrice TF-IDF à partir des matrices TF et IDF.
+        Cette méthode calcule les poids TF-IDF de chaque posting à partir des poids TF et du vecteur IDF,
+        ainsi que la norme de chaque document, calculée une seule fois lors de l'indexation.
+        """
+        with self.metrics.time("build", "tfidf"):
+            self.tfidf_values = self.tf_values * self.idf_vector[self.index.posting_term_ids()]
+            if self.compact:
+                self.tf_values = self.tf_values.astype(np.float32)
+                self.tfidf_values = self.tfidf_values.astype(np.float32)
+        with self.metrics.time("build", "norms"):
+            self.doc_norms = self.index.document_norms(self.tfidf_values)
+        if self.compact:
+            with self.metrics.time("build", "compress"):
+                self.index = self.index.compress()
+        self.index_generation += 1
+        self.generation += 1
+
+    @property
+    def is_dirty(self):
+        """
+        Indique si des documents ont été ajoutés, modifiés ou supprimés depuis la dernière fusion de l'index.
+        """
+        return self.index is not None and self.index.is_dirty
+
+    def add_document(self, city_name, text):
         """
-        self.tfidf_matrix = self.tf_matrix * self.idf_vector
+        Cette méthode ajoute une ville à l'index sans le reconstruire : seul son texte est découpé, et ses postings
+        sont ajoutés en attente. Elle est prise en compte par le prochain appel de refresh, et intégrée à l'index
+        lors de la fusion (merge). Elle attend la fin d'une fusion en cours.
 
-    def get_tfidf_matrix(self):
+        :param city_name: Nom de la ville.
+        :param text: Texte de la section 'do' de la ville.
+        """
+        with self.merge_lock, self.lock:
+            if city_name in self.city_index:
+                raise ValueError(f"La ville {city_name} est déjà indexée.")
+            if self.index is None:
+                # Index vide, auquel les documents sont ajoutés en attente
+                self.calculate_tf([])
+                self.calculate_idf()
+                self.calculate_tfidf()
+
+            # Ajouter les nouveaux mots en fin de vocabulaire (il est retrié lors de la fusion)
+            term_positions = {}
+            for position, word in enumerate(self.tokenize(text)):
+                if word not in self.term_index:
+                    if not isinstance(self.vocabulary, list):
+                        # Le vocabulaire compact n'est pas modifiable : il est recopié jusqu'à la prochaine fusion
+                        self.vocabulary = list(self.vocabulary)
+                        self.term_index = {word: i for i, word in enumerate(self.vocabulary)}
+                    self.term_index[word] = len(self.vocabulary)
+                    self.vocabulary.append(word)
+                term_positions.setdefault(self.term_index[word], []).append(position)
+
+            term_counts = {term_id: len(positions) for term_id, positions in term_positions.items()}
+            doc_id = self.index.add_document(term_counts, term_positions)
+            self.city_names.append(city_name)
+            self.city_index[city_name] = doc_id
+            self.data[city_name] = {"do": text}
+            self.num_updates += 1
+
+    def update_document(self, city_name, text):
+        """
+        Cette méthode remplace le texte d'une ville dans l'index (ou l'ajoute si elle n'y figure pas encore).
+
+        :param city_name: Nom de la ville.
+        :param text: Nouveau texte de la section 'do' de la ville.
+        """
+        with self.merge_lock, self.lock:
+            if city_name in self.city_index:
+                self.delete_document(city_name)
+            self.add_document(city_name, text)
+
+    def delete_document(self, city_name):
+        """
+        Cette méthode retire une ville de l'index. Elle est exclue des résultats dès le prochain appel de refresh,
+        et ses postings sont supprimés lors de la fusion.
+
+        :param city_name: Nom de la ville.
+        """
+        with self.merge_lock, self.lock:
+            if city_name not in self.city_index:
+                raise ValueError(f"La ville {city_name} n'est pas indexée.")
+            self.index.delete_document(self.city_index.pop(city_name))
+            self.data.pop(city_name, None)
+            self.num_updates += 1
+
+    def refresh(self):
+        """
+        Cette méthode rend visibles les ajouts et suppressions en attente, sans fusionner l'index : les documents ajoutés
+        sont indexés à part (attribut pending), avec leurs propres poids et normes, et les documents supprimés
+        sont exclus lors de la recherche. Son coût ne dépend que de la taille des documents ajoutés : les poids et
+        les normes des autres documents ne sont pas recalculés.
+        Lorsque les mises à jour en attente dépassent merge_ratio fois le nombre de documents indexés, la fusion
+        complète est lancée en arrière-plan (voir merge).
+        """
+        with self.lock:
+            if self.index is None or self.refreshed_updates == self.num_updates:
+                return
+            with self.metrics.time("build", "pending"):
+                self.pending = self.build_pending()
+            self.refreshed_updates = self.num_updates
+            self.generation += 1
+
+            if self.index.num_pending_documents + len(self.index.deleted) > self.merge_ratio * self.index.num_documents:
+                self.merge(background=True)
+
+    def build_pending(self):
+        """
+        Cette méthode indexe les documents en attente dans un corpus séparé, qui partage le vocabulaire du corpus.
+        Les statistiques de la collection (nombre de documents, fréquences documentaires, longueur moyenne) sont
+        celles de l'index augmentées de ces documents, comme pour un shard (voir collection_statistics).
+        Elle doit être appelée en détenant le verrou du corpus.
+
+        :return: Un objet Corpus dont le document i est le document num_documents + i de l'index, ou None.
+        """
+        index = self.index.pending_index(len(self.vocabulary))
+        if index is None:
+            return None
+        pending = Corpus(self.analyzer, self.store_positions)
+        pending.vocabulary, pending.term_index = self.vocabulary, self.term_index
+        pending.index = index
+        pending.update_tf_values()
+
+        num_documents, doc_frequency, average_length = self.collection_statistics()
+        total_doc_frequency = index.document_frequencies().astype(np.int64)
+        total_doc_frequency[:len(doc_frequency)] += doc_frequency
+        total_documents = num_documents + index.num_documents
+        pending.collection = {
+            "num_documents": total_documents,
+            "doc_frequency": total_doc_frequency,
+            "average_length": (average_length * num_documents + pending.doc_lengths.sum()) / total_documents,
+        }
+        pending.calculate_idf()
+        pending.calculate_tfidf()
+        return pending
+
+    def merge(self, background=False):
+        """
+        Cette méthode fusionne les ajouts et suppressions en attente dans l'index : les postings sont fusionnés, puis
+        les poids IDF, TF-IDF et les normes de tous les documents sont recalculés, sans relire les textes.
+        Le calcul est effectué sans détenir le verrou du corpus : les recherches continuent d'utiliser l'index précédent
+        et les documents en attente, et le nouvel index est publié à la fin. Seuls les ajouts et suppressions attendent
+        la fin de la fusion. Elle ne doit pas être appelée en détenant le verrou du corpus.
+
+        :param background: Lancer la fusion dans un thread et rendre la main immédiatement.
+        """
+        if background:
+            with self.lock:
+                if self.merge_thread is None or not self.merge_thread.is_alive():
+                    self.merge_thread = threading.Thread(target=self.merge, name="index-merge", daemon=True)
+                    self.merge_thread.start()
+            return
+
+        with self.merge_lock:
+            with self.lock:
+                if not self.is_dirty:
+                    return
+                index, vocabulary, city_names = self.index, self.vocabulary, self.city_names
+
+            merged = Corpus(self.analyzer, self.store_positions, self.metrics, self.compact)
+            merged.collection = self.collection
+            # Retrier le vocabulaire si de nouveaux mots ont été ajoutés
+            term_mapping = None
+            if len(vocabulary) > index.vocabulary_size:
+                term_mapping = merged.set_vocabulary(vocabulary)
+            else:
+                merged.vocabulary, merged.term_index = vocabulary, self.term_index
+
+            with self.metrics.time("build", "merge"):
+                merged.index, doc_mapping = index.merge(len(vocabulary), term_mapping)
+            merged.city_names = [city for city, doc_id in zip(city_names, doc_mapping) if doc_id >= 0]
+            merged.city_index = {city: i for i, city in enumerate(merged.city_names)}
+            merged.update_tf_values()
+            merged.calculate_idf()
+            merged.calculate_tfidf()
+
+            with self.lock:
+                for name in MERGED_ATTRIBUTES:
+                    setattr(self, name, getattr(merged, name))
+                self.pending = None
+                self.refreshed_updates = self.num_updates
+                self.index_generation += 1
+                self.generation += 1
+
+    @property
+    def tf_matrix(self):
+        """
+        Matrice TF dense reconstruite à partir de l'index, destinée à la visualisation.
+        """
+        if self.tf_values is None:
+            return None
+        return self.index.to_dense(self.tf_values)
+
+    @property
+    def tfidf_matrix(self):
+        """
+        Matrice TF-IDF dense reconstruite à partir de l'index, destinée à la visualisation.
+        """
+        if self.tfidf_values is None:
+            return None
+        return self.index.to_dense(self.tfidf_values)
+
+    def get_tfidf_matrix(self, sparse=True):
         """
         Cette méthode renvoie la matrice TF-IDF sous forme de DataFrame pour une visualisation.
+        Par défaut, les colonnes sont creuses (pandas.SparseDtype) : les postings de l'index, au format CSC, forment
+        directement une matrice creuse scipy convertie en DataFrame, sans passer par la matrice dense. Elle nécessite scipy.
+
+        :param sparse: Renvoyer un DataFrame creux (False pour une matrice dense, réservée aux petits corpus).
+        """
+        # Les documents en attente figurent dans la matrice après la fusion
+        self.merge()
+        if self.tfidf_values is None:
+            raise ValueError("La matrice TF-IDF n'a pas encore été calculée.")
+        if not sparse:
+            return pd.DataFrame(
+                self.tfidf_matrix,
+                index=self.city_names,
+                columns=list(self.vocabulary)
+            )
+
+        try:
+            from scipy.sparse import csc_matrix
+        except ImportError as error:
+            raise ImportError("L'export creux de la matrice TF-IDF nécessite scipy (pip install scipy).") from error
+
+        index = self.index
+        matrix = csc_matrix((np.asarray(self.tfidf_values, dtype=np.float64), index.all_doc_ids(), index.indptr),
+                            shape=(index.num_documents, index.vocabulary_size))
+        dataframe = pd.DataFrame.sparse.from_spmatrix(matrix, index=self.city_names, columns=list(self.vocabulary))
+        # Selon la version de pandas, la valeur par défaut des colonnes est NaN : elle est remplacée par 0
+        # sans modifier les valeurs stockées
+        return pd.DataFrame({
+            word: pd.arrays.SparseArray(column.array.sp_values, sparse_index=column.array.sp_index, fill_value=0.0)
+            for word, column in dataframe.items()
+        }, index=self.city_names)
+
+    def iter_tfidf_chunks(self, chunk_size=1000):
+        """
+        Cette méthode parcourt la matrice TF-IDF par blocs de chunk_size villes, au format long : une ligne par couple
+        (ville, terme) de poids non nul. La mémoire utilisée dépend de la taille d'un bloc, et non de la taille
+        de la matrice complète.
+
+        :param chunk_size: Nombre de villes par bloc.
+        :return: Un générateur de DataFrame contenant les colonnes "City", "Term" et "TF-IDF".
+        """
+        self.merge()
+        # Version de l'index lue en une fois : les mises à jour ultérieures ne modifient pas le parcours
+        with self.lock:
+            if self.tfidf_values is None:
+                raise ValueError("La matrice TF-IDF n'a pas encore été calculée.")
+            index, tfidf_values = self.index, self.tfidf_values
+            vocabulary = np.array(list(self.vocabulary), dtype=object)
+            city_names = np.asarray(self.city_names, dtype=object)
+
+        order, doc_indptr = index.document_order()
+        doc_ids = index.all_doc_ids()
+        for start in range(0, index.num_documents, chunk_size):
+            end = min(start + chunk_size, index.num_documents)
+            positions = order[doc_indptr[start]:doc_indptr[end]]
+            values = np.asarray(tfidf_values[positions], dtype=np.float64)
+            # Les termes présents dans presque tous les documents ont un poids nul
+            positions, values = positions[values != 0], values[values != 0]
+            term_ids = np.searchsorted(index.indptr, positions, side="right") - 1
+            yield pd.DataFrame({
+                "City": city_names[doc_ids[positions]],
+                "Term": vocabulary[term_ids],
+                "TF-IDF": values,
+            })
+
+    def write_tfidf_parquet(self, file_path, chunk_size=1000):
+        """
+        Cette méthode enregistre la matrice TF-IDF au format Parquet (format long, voir iter_tfidf_chunks),
+        un groupe de lignes par bloc de villes. Elle nécessite pyarrow.
+
+        :param file_path: Chemin du fichier Parquet.
+        :param chunk_size: Nombre de villes par bloc.
+        :return: Le nombre de lignes écrites.
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as error:
+            raise ImportError("L'export Parquet nécessite pyarrow (pip install pyarrow).") from error
+
+        schema = pa.schema([("City", pa.string()), ("Term", pa.string()), ("TF-IDF", pa.float64())])
+        num_rows = 0
+        with pq.ParquetWriter(file_path, schema) as writer:
+            for chunk in self.iter_tfidf_chunks(chunk_size):
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                num_rows += len(chunk)
+        return num_rows
+
+    @staticmethod
+    def fingerprint(file_path):
+        """
+        Cette méthode calcule l'empreinte (SHA-256) d'un fichier de données, utilisée pour invalider l'index
+        enregistré lorsque les données changent.
+
+        :param file_path: Chemin du fichier.
+        :return: L'empreinte sous forme hexadécimale.
+        """
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def save_index(self, directory, fingerprint=None):
+        """
+        Cette méthode enregistre l'index construit (vocabulaire, IDF, normes, postings, noms des villes) dans un répertoire.
+        Le fichier meta.json est écrit en dernier : un index dont l'écriture a été interrompue est considéré comme invalide.
+
+        :param directory: Répertoire de destination.
+        :param fingerprint: Empreinte des données sources (par défaut celle du fichier chargé avec load_from_files).
         """
-        if self.tfidf_matrix is None:
+        self.merge()
+        if self.tfidf_values is None:
             raise ValueError("La matrice TF-IDF n'a pas encore été calculée.")
-        return pd.DataFrame(
-            self.tfidf_matrix,
-            index=self.city_names,
-            columns=self.vocabulary
-        )
+        if fingerprint is None and self.data_file_path is not None:
+            fingerprint = self.fingerprint(self.data_file_path)
+
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, "meta.json")
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+
+        with self.metrics.time("build", "save_index"):
+            self.index.save(directory)
+            for name in INDEX_ARRAYS:
+                np.save(os.path.join(directory, f"{name}.npy"), np.asarray(getattr(self, name)))
+            vocabulary = self.vocabulary if isinstance(self.vocabulary, Vocabulary) else Vocabulary.from_words(self.vocabulary)
+            np.save(os.path.join(directory, "vocabulary_data.npy"), vocabulary.data)
+            np.save(os.path.join(directory, "vocabulary_offsets.npy"), vocabulary.offsets)
+            if self.collection is not None:
+                np.save(os.path.join(directory, "collection_doc_frequency.npy"), self.collection["doc_frequency"])
+
+        meta = {
+            "format_version": INDEX_FORMAT_VERSION,
+            "fingerprint": fingerprint,
+            "analyzer": self.analyzer.signature(),
+            "num_documents": self.index.num_documents,
+            "positions": self.index.has_positions,
+            "compressed": self.index.is_compressed,
+        }
+        if self.collection is not None:
+            meta["collection"] = {"num_documents": self.collection["num_documents"], "average_length": float(self.collection["average_length"])}
+        with open(meta_path, 'w', encoding='utf-8') as file:
+            json.dump(meta, file)
+
+    def load_index(self, directory, fingerprint=None, mmap_mode='r'):
+        """
+        Cette méthode recharge un index enregistré avec save_index. Les tableaux sont projetés en mémoire en lecture seule.
+
+        :param directory: Répertoire contenant l'index.
+        :param fingerprint: Empreinte attendue des données sources (None pour ne pas la vérifier).
+        :param mmap_mode: Mode de projection mémoire passé à np.load (None pour tout charger en mémoire).
+        :return: True si l'index a été chargé, False s'il est absent, d'une autre version, construit avec
+                 un autre analyseur, sans les positions requises, compressé autrement que demandé (compact) ou périmé.
+        """
+        meta_path = os.path.join(directory, "meta.json")
+        if not os.path.exists(meta_path):
+            return False
+        with open(meta_path, 'r', encoding='utf-8') as file:
+            meta = json.load(file)
+        if meta.get("format_version") != INDEX_FORMAT_VERSION:
+            return False
+        if fingerprint is not None and meta.get("fingerprint") != fingerprint:
+            return False
+        if meta.get("analyzer") != self.analyzer.signature():
+            return False
+        if self.store_positions and not meta.get("positions"):
+            return False
+        if meta.get("compressed", False) != self.compact:
+            return False
+
+        with self.metrics.time("build", "load_index"):
+            self.index = InvertedIndex.load(directory, meta["num_documents"], mmap_mode=mmap_mode, compressed=meta["compressed"])
+            for name in INDEX_ARRAYS:
+                setattr(self, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode))
+            vocabulary = Vocabulary(np.load(os.path.join(directory, "vocabulary_data.npy"), mmap_mode=mmap_mode),
+                                    np.load(os.path.join(directory, "vocabulary_offsets.npy"), mmap_mode=mmap_mode))
+            if self.compact:
+                self.vocabulary = vocabulary
+                self.term_index = TermIndex(vocabulary)
+            else:
+                self.vocabulary = list(vocabulary)
+                self.term_index = {word: i for i, word in enumerate(self.vocabulary)}
+            self.city_names = self.city_names.tolist()
+            self.city_index = {city: i for i, city in enumerate(self.city_names)}
+            self.collection = None
+            if "collection" in meta:
+                doc_frequency = np.load(os.path.join(directory, "collection_doc_frequency.npy"), mmap_mode=mmap_mode)
+                self.collection = {**meta["collection"], "doc_frequency": doc_frequency}
+            self.pending = None
+        self.index_generation += 1
+        self.generation += 1
+        return True
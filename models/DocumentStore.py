@@ -0,0 +1,96 @@
+"""
+Ce module contient la classe DocumentStore qui permet de stocker les documents récoltés dans un fichier JSON Lines en ajout seul.
+"""
+import json
+import os
+
+class DocumentStore:
+    """
+    Cette classe gère un fichier JSON Lines en ajout seul : chaque ligne contient un document {"city": ..., "do": ...}.
+    Les ajouts sont regroupés en mémoire puis écrits par lots ; un enregistrement plus récent d'une ville remplace
+    les précédents. Une écriture interrompue ne peut corrompre que la dernière ligne, qui est alors ignorée.
+    """
+    def __init__(self, path, flush_every=100):
+        """
+        Cette méthode permet d'initialiser le stockage.
+
+        :param path: Chemin du fichier JSON Lines.
+        :param flush_every: Nombre de documents conservés en mémoire avant une écriture sur disque.
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self.buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def append(self, city_name, document):
+        """
+        Cette méthode ajoute (ou remplace) le document d'une ville.
+
+        :param city_name: Nom de la ville.
+        :param document: Dictionnaire des sections de la ville, par exemple {"do": ...}.
+        """
+        self.buffer.append(json.dumps({"city": city_name, **document}, ensure_ascii=False))
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """
+        Cette méthode écrit sur disque les documents en attente, en fin de fichier.
+        """
+        if not self.buffer:
+            return
+        lines = "\n".join(self.buffer) + "\n"
+        with open(self.path, "ab") as file:
+            # Isoler une éventuelle ligne tronquée par une écriture interrompue
+            if file.tell() > 0:
+                with open(self.path, "rb") as reader:
+                    reader.seek(-1, os.SEEK_END)
+                    if reader.read(1) != b"\n":
+                        lines = "\n" + lines
+            file.write(lines.encode("utf-8"))
+            file.flush()
+            os.fsync(file.fileno())
+        self.buffer = []
+
+    def iter_documents(self):
+        """
+        Cette méthode parcourt le fichier ligne par ligne, sans le charger entièrement en mémoire.
+
+        :return: Un générateur de couples (nom de la ville, document).
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Dernière ligne tronquée par une écriture interrompue
+                    continue
+                city_name = record.pop("city")
+                yield city_name, record
+
+    def load(self):
+        """
+        Cette méthode renvoie la dernière version du document de chaque ville.
+
+        :return: Dictionnaire {nom de la ville: document}.
+        """
+        return dict(self.iter_documents())
+
+    def compact(self, json_path):
+        """
+        Cette méthode exporte de manière atomique le contenu du stockage au format JSON lu par Corpus.load_from_files.
+
+        :param json_path: Chemin du fichier JSON de destination.
+        """
+        self.flush()
+        temporary_path = f"{json_path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(self.load(), file, ensure_ascii=False, indent=4)
+        os.replace(temporary_path, json_path)
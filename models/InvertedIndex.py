@@ -0,0 +1,587 @@
+"""
+Ce module contient la classe InvertedIndex qui stocke les listes de postings (terme -> documents) du corpus.
+"""
+import os
+import numpy as np
+from models.Compression import delta_decode, delta_encode, varbyte_decode, varbyte_encode
+
+def concatenate_ranges(starts, lengths):
+    """
+    Cette fonction renvoie les indices de plusieurs intervalles [début, début + longueur), concaténés.
+
+    :param starts: Début de chaque intervalle.
+    :param lengths: Longueur de chaque intervalle.
+    :return: Tableau des indices.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return offsets + np.arange(int(lengths.sum()))
+
+# Écart entre les clés de deux documents dans position_keys (supérieur à toute position)
+POSITION_STRIDE = 1 << 32
+
+def encode_positions(positions, counts):
+    """
+    Cette fonction encode les positions des occurrences de chaque posting (écarts puis varbyte).
+
+    :param positions: Positions concaténées, croissantes dans chaque posting.
+    :param counts: Nombre de positions de chaque posting (au moins 1).
+    :return: Les octets encodés et la position de début des octets de chaque posting (taille nombre de postings + 1).
+    """
+    data, num_bytes = varbyte_encode(delta_encode(positions, counts))
+    byte_ends = np.cumsum(num_bytes)[np.cumsum(counts) - 1] if len(counts) else np.empty(0, dtype=np.int64)
+    return data, np.concatenate([[0], byte_ends]).astype(np.int64)
+
+class InvertedIndex:
+    """
+    Cette classe représente un index inversé creux : pour chaque terme du vocabulaire, la liste des documents
+    qui le contiennent et le nombre d'occurrences du terme dans chacun d'eux.
+
+    Les postings de tous les termes sont stockés de manière contiguë (format CSC) :
+    - indptr : position de début des postings de chaque terme (taille V + 1)
+    - doc_ids : identifiants des documents, triés par ordre croissant pour chaque terme (taille nnz)
+    - counts : nombre d'occurrences du terme dans le document (taille nnz)
+
+    La mémoire occupée est donc proportionnelle au nombre d'entrées non nulles et non à (documents x vocabulaire).
+
+    L'index peut aussi conserver la position de chaque occurrence (index positionnel), pour les requêtes
+    de phrases et de proximité. Les positions de chaque posting sont encodées par écarts puis en varbyte :
+    - position_offsets : position de début des positions encodées de chaque posting (taille nnz + 1)
+    - position_data : positions encodées de tous les postings (octets)
+
+    Dans un index compressé (voir compress), doc_ids vaut None : les identifiants des documents de chaque terme sont
+    encodés de la même manière dans doc_id_data, doc_id_offsets donnant la position de début de chaque terme (taille V + 1).
+    Ils sont décodés lors de la lecture, terme par terme (term_doc_ids, gather_doc_ids).
+
+    Les documents ajoutés ou supprimés après la construction sont conservés à part (postings en attente, documents
+    supprimés) jusqu'à l'appel de merge, qui reconstruit des tableaux contigus sans relire les textes.
+    Les tableaux et num_documents ne sont jamais modifiés : une recherche en cours sur l'index n'est pas affectée
+    par un ajout. Avant la fusion, les documents en attente peuvent être indexés à part (pending_index)
+    et les documents supprimés exclus des résultats.
+    """
+    def __init__(self, indptr, doc_ids, counts, num_documents, position_offsets=None, position_data=None,
+                 doc_id_offsets=None, doc_id_data=None):
+        """
+        Cette méthode permet d'initialiser l'index à partir de ses tableaux.
+
+        :param indptr: Position de début des postings de chaque terme.
+        :param doc_ids: Identifiants des documents de chaque posting (None si l'index est compressé).
+        :param counts: Nombre d'occurrences de chaque posting.
+        :param num_documents: Nombre de documents des postings (sans les documents ajoutés en attente de fusion).
+        :param position_offsets: Début des positions encodées de chaque posting (None si l'index n'est pas positionnel).
+        :param position_data: Positions encodées de tous les postings (None si l'index n'est pas positionnel).
+        :param doc_id_offsets: Début des identifiants encodés de chaque terme (index compressé).
+        :param doc_id_data: Identifiants des documents encodés (index compressé).
+        """
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.counts = counts
+        self.num_documents = num_documents
+        self.position_offsets = position_offsets
+        self.position_data = position_data
+        self.doc_id_offsets = doc_id_offsets
+        self.doc_id_data = doc_id_data
+        self.pending_doc_ids = []
+        self.pending_term_ids = []
+        self.pending_counts = []
+        self.pending_positions = []
+        self.num_pending_documents = 0
+        self.deleted = set()
+
+    @classmethod
+    def from_term_sequences(cls, doc_term_ids, vocabulary_size, store_positions=True):
+        """
+        Cette méthode construit l'index à partir de la suite des termes de chaque document, en une seule passe
+        vectorisée. La position de chaque occurrence est conservée si store_positions est vrai.
+
+        :param doc_term_ids: Liste (un élément par document) des identifiants des termes du document, dans l'ordre du texte.
+        :param vocabulary_size: Taille du vocabulaire.
+        :param store_positions: Conserver les positions des occurrences (index positionnel).
+
+        :return: Un objet InvertedIndex.
+        """
+        num_documents = len(doc_term_ids)
+        stride = max(num_documents, 1)
+        lengths = np.fromiter(map(len, doc_term_ids), dtype=np.int64, count=num_documents)
+
+        # Clé de chaque occurrence : (terme, document)
+        keys = np.concatenate(doc_term_ids).astype(np.int64) if num_documents else np.empty(0, dtype=np.int64)
+        keys *= stride
+        keys += np.repeat(np.arange(num_documents, dtype=np.int64), lengths)
+
+        # Tri stable : les positions restent croissantes dans chaque posting
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        starts = np.flatnonzero(np.diff(keys, prepend=-1))
+        counts = np.diff(np.append(starts, len(keys)))
+        keys = keys[starts]
+
+        indptr = np.zeros(vocabulary_size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // stride, minlength=vocabulary_size), out=indptr[1:])
+        index = cls(indptr, (keys % stride).astype(np.int32), counts.astype(np.int32), num_documents)
+
+        if store_positions:
+            # Position de chaque occurrence dans son document, dans l'ordre des postings
+            positions = np.arange(len(order), dtype=np.int64)
+            positions -= np.repeat(np.cumsum(lengths) - lengths, lengths)
+            positions = positions[order]
+            del order
+            index.position_data, index.position_offsets = encode_positions(positions, counts)
+        return index
+
+    def save(self, directory):
+        """
+        Cette méthode enregistre les tableaux de l'index dans un répertoire, au format binaire NumPy (.npy).
+
+        :param directory: Répertoire de destination.
+        """
+        for name in self.array_names():
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+
+    def array_names(self):
+        """
+        Cette méthode renvoie le nom des tableaux de l'index (les positions ne figurent que dans un index positionnel,
+        et les identifiants des documents sont encodés dans un index compressé).
+        """
+        names = ("indptr", "doc_id_offsets", "doc_id_data", "counts") if self.is_compressed else ("indptr", "doc_ids", "counts")
+        return names + ("position_offsets", "position_data") if self.has_positions else names
+
+    @classmethod
+    def load(cls, directory, num_documents, mmap_mode="r", compressed=False):
+        """
+        Cette méthode recharge un index enregistré avec save. Par défaut, les tableaux sont projetés en mémoire
+        (memory-map) en lecture seule : le chargement est immédiat et plusieurs processus partagent les mêmes pages.
+
+        :param directory: Répertoire contenant l'index.
+        :param num_documents: Nombre total de documents indexés.
+        :param mmap_mode: Mode de projection mémoire passé à np.load (None pour tout charger en mémoire).
+        :param compressed: Indique si l'index a été enregistré compressé.
+
+        :return: Un objet InvertedIndex.
+        """
+        def load_array(name):
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+
+        if compressed:
+            index = cls(load_array("indptr"), None, load_array("counts"), num_documents,
+                        doc_id_offsets=load_array("doc_id_offsets"), doc_id_data=load_array("doc_id_data"))
+        else:
+            index = cls(load_array("indptr"), load_array("doc_ids"), load_array("counts"), num_documents)
+        if os.path.exists(os.path.join(directory, "position_data.npy")):
+            index.position_offsets = load_array("position_offsets")
+            index.position_data = load_array("position_data")
+        return index
+
+    def compress(self):
+        """
+        Cette méthode renvoie une version compressée de l'index : les identifiants des documents de chaque terme
+        sont encodés par écarts puis en varbyte (un octet par posting pour les termes fréquents), et les occurrences
+        ainsi que le début des positions de chaque posting sont stockés dans le plus petit type entier suffisant.
+
+        :return: Le nouvel index.
+        """
+        if self.is_compressed:
+            return self
+        if self.is_dirty:
+            raise ValueError("L'index contient des mises à jour en attente.")
+        data, num_bytes = varbyte_encode(delta_encode(self.doc_ids, self.document_frequencies()))
+        byte_ends = np.concatenate([[0], np.cumsum(num_bytes, dtype=np.int64)])
+        counts = self.counts.astype(np.min_scalar_type(int(self.counts.max()) if len(self.counts) else 0))
+        position_offsets = self.position_offsets
+        if self.has_positions:
+            position_offsets = position_offsets.astype(np.min_scalar_type(int(position_offsets[-1])))
+        return InvertedIndex(self.indptr, None, counts, self.num_documents, position_offsets, self.position_data,
+                             doc_id_offsets=byte_ends[self.indptr], doc_id_data=data)
+
+    @property
+    def is_compressed(self):
+        """
+        Indique si les identifiants des documents sont compressés.
+        """
+        return self.doc_ids is None
+
+    @property
+    def has_positions(self):
+        """
+        Indique si l'index conserve la position des occurrences.
+        """
+        return self.position_offsets is not None
+
+    @property
+    def is_dirty(self):
+        """
+        Indique si des documents ont été ajoutés ou supprimés depuis la dernière fusion.
+        """
+        return bool(self.num_pending_documents or self.deleted)
+
+    def add_document(self, term_counts, term_positions=None):
+        """
+        Cette méthode ajoute un document à l'index, sans reconstruire les postings existants.
+
+        :param term_counts: Dictionnaire {identifiant du terme: occurrences} du document.
+        :param term_positions: Dictionnaire {identifiant du terme: positions croissantes}, requis si l'index est positionnel.
+
+        :return: L'identifiant attribué au document.
+        """
+        doc_id = self.num_documents + self.num_pending_documents
+        self.num_pending_documents += 1
+
+        term_ids = list(term_counts.keys())
+        self.pending_doc_ids.extend([doc_id] * len(term_ids))
+        self.pending_term_ids.extend(term_ids)
+        self.pending_counts.extend(term_counts.values())
+        if self.has_positions:
+            if term_positions is None:
+                raise ValueError("Les positions des termes sont requises par un index positionnel.")
+            self.pending_positions.extend(np.asarray(term_positions[term_id], dtype=np.int64) for term_id in term_ids)
+        return doc_id
+
+    def delete_document(self, doc_id):
+        """
+        Cette méthode marque un document comme supprimé. Ses postings sont retirés lors de la prochaine fusion.
+
+        :param doc_id: Identifiant du document.
+        """
+        self.deleted.add(doc_id)
+
+    def pending_index(self, vocabulary_size):
+        """
+        Cette méthode construit un index séparé des seuls documents en attente, sans fusionner les postings existants :
+        son coût ne dépend que de la taille des documents ajoutés. Le document d'identifiant num_documents + i
+        y porte l'identifiant i ; les documents supprimés n'en sont pas retirés.
+
+        :param vocabulary_size: Taille du vocabulaire après les ajouts.
+
+        :return: Un objet InvertedIndex, ou None si aucun document n'est en attente.
+        """
+        if not self.num_pending_documents:
+            return None
+        pending = InvertedIndex(np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), 0)
+        if self.has_positions:
+            pending.position_offsets = np.zeros(1, dtype=np.int64)
+            pending.position_data = np.empty(0, dtype=np.uint8)
+        pending.pending_doc_ids = [doc_id - self.num_documents for doc_id in self.pending_doc_ids]
+        pending.pending_term_ids = self.pending_term_ids
+        pending.pending_counts = self.pending_counts
+        pending.pending_positions = self.pending_positions
+        pending.num_pending_documents = self.num_pending_documents
+        return pending.merge(vocabulary_size)[0]
+
+    def merge(self, vocabulary_size, term_mapping=None):
+        """
+        Cette méthode fusionne les documents ajoutés dans des tableaux contigus et retire les documents supprimés.
+        Les identifiants des documents restants sont renumérotés de manière contiguë, dans le même ordre.
+
+        :param vocabulary_size: Taille du vocabulaire après les ajouts.
+        :param term_mapping: Nouvel identifiant de chaque terme, si le vocabulaire a été réordonné (optionnel).
+
+        :return: Le nouvel index, et le nouvel identifiant de chaque ancien document (-1 s'il a été supprimé).
+        """
+        term_ids = np.concatenate([self.posting_term_ids(), np.array(self.pending_term_ids, dtype=np.int32)])
+        doc_ids = np.concatenate([self.all_doc_ids(), np.array(self.pending_doc_ids, dtype=np.int32)])
+        counts = np.concatenate([self.counts, np.array(self.pending_counts, dtype=np.int32)])
+        if term_mapping is not None:
+            term_ids = term_mapping[term_ids]
+
+        alive = np.ones(self.num_documents + self.num_pending_documents, dtype=bool)
+        alive[list(self.deleted)] = False
+        doc_mapping = (np.cumsum(alive) - 1).astype(np.int32)
+        doc_mapping[~alive] = -1
+        keep = alive[doc_ids]
+        term_ids, doc_ids, counts = term_ids[keep], doc_mapping[doc_ids[keep]], counts[keep]
+
+        # Tri stable par terme (puis par document, les documents ajoutés ayant les identifiants les plus grands)
+        order = np.lexsort((doc_ids, term_ids))
+        indptr = np.zeros(vocabulary_size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=vocabulary_size), out=indptr[1:])
+        index = InvertedIndex(indptr, doc_ids[order], counts[order], int(alive.sum()))
+
+        if self.has_positions:
+            # Les positions de chaque posting sont encodées indépendamment : les postings existants sont déplacés
+            # sans être décodés, seuls ceux des documents ajoutés sont encodés
+            pending_lengths = np.array(self.pending_counts, dtype=np.int64)
+            pending_positions = np.concatenate(self.pending_positions) if self.pending_positions else np.empty(0, dtype=np.int64)
+            pending_data, pending_offsets = encode_positions(pending_positions, pending_lengths)
+            byte_starts = np.concatenate([self.position_offsets[:-1], pending_offsets[:-1] + len(self.position_data)])[keep][order]
+            byte_lengths = np.concatenate([np.diff(self.position_offsets), np.diff(pending_offsets)])[keep][order]
+            data = np.concatenate([self.position_data, pending_data])
+            index.position_data = data[concatenate_ranges(byte_starts, byte_lengths)]
+            index.position_offsets = np.concatenate([[0], np.cumsum(byte_lengths)]).astype(np.int64)
+
+        return index, doc_mapping
+
+    def expand_vocabulary(self, term_mapping, vocabulary_size):
+        """
+        Cette méthode renumérote les termes dans un vocabulaire plus grand qui contient le vocabulaire de l'index
+        (par exemple, le vocabulaire commun à plusieurs shards). La correspondance étant croissante, l'ordre des postings
+        est inchangé : seul indptr est recalculé, les autres tableaux sont partagés avec l'index d'origine.
+
+        :param term_mapping: Nouvel identifiant de chaque terme, croissant.
+        :param vocabulary_size: Taille du nouveau vocabulaire.
+
+        :return: Le nouvel index.
+        """
+        if self.is_dirty:
+            raise ValueError("L'index contient des mises à jour en attente.")
+
+        def expand(pointers):
+            lengths = np.zeros(vocabulary_size, dtype=np.int64)
+            lengths[term_mapping] = np.diff(pointers)
+            expanded = np.zeros(vocabulary_size + 1, dtype=np.int64)
+            np.cumsum(lengths, out=expanded[1:])
+            return expanded
+
+        doc_id_offsets = expand(self.doc_id_offsets) if self.is_compressed else None
+        return InvertedIndex(expand(self.indptr), self.doc_ids, self.counts, self.num_documents, self.position_offsets,
+                             self.position_data, doc_id_offsets, self.doc_id_data)
+
+    @property
+    def nnz(self):
+        """
+        Nombre de postings (entrées non nulles) contenus dans l'index.
+        """
+        return len(self.counts)
+
+    @property
+    def vocabulary_size(self):
+        """
+        Nombre de termes indexés.
+        """
+        return len(self.indptr) - 1
+
+    def postings(self, term_id):
+        """
+        Cette méthode renvoie les postings d'un terme.
+
+        :param term_id: Identifiant du terme.
+
+        :return: Les identifiants des documents et le nombre d'occurrences associé.
+        """
+        return self.term_doc_ids(term_id), self.counts[self.posting_slice(term_id)]
+
+    def posting_slice(self, term_id):
+        """
+        Cette méthode renvoie l'intervalle des postings d'un terme, afin de lire des valeurs alignées sur les postings.
+
+        :param term_id: Identifiant du terme.
+
+        :return: Un objet slice.
+        """
+        return slice(self.indptr[term_id], self.indptr[term_id + 1])
+
+    def gather(self, term_ids):
+        """
+        Cette méthode renvoie les positions de tous les postings d'une liste de termes, en un seul tableau.
+
+        :param term_ids: Identifiants des termes.
+
+        :return: Les positions des postings et le nombre de postings de chaque terme.
+        """
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        starts = self.indptr[term_ids]
+        lengths = self.indptr[term_ids + 1] - starts
+        return concatenate_ranges(starts, lengths), lengths
+
+    def all_doc_ids(self):
+        """
+        Cette méthode renvoie l'identifiant du document de chaque posting (décodés si l'index est compressé).
+        """
+        if not self.is_compressed:
+            return self.doc_ids
+        return delta_decode(varbyte_decode(self.doc_id_data), self.document_frequencies())
+
+    def term_doc_ids(self, term_id):
+        """
+        Cette méthode renvoie les identifiants des documents contenant un terme, triés par ordre croissant.
+
+        :param term_id: Identifiant du terme.
+        """
+        if not self.is_compressed:
+            return self.doc_ids[self.posting_slice(term_id)]
+        return np.cumsum(varbyte_decode(self.doc_id_data[self.doc_id_offsets[term_id]:self.doc_id_offsets[term_id + 1]]).astype(np.int64))
+
+    def gather_doc_ids(self, term_ids):
+        """
+        Cette méthode renvoie les identifiants des documents de tous les postings d'une liste de termes,
+        dans l'ordre des positions renvoyées par gather. Seuls les postings de ces termes sont décodés.
+
+        :param term_ids: Identifiants des termes.
+        """
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        if not self.is_compressed:
+            return self.doc_ids[self.gather(term_ids)[0]]
+        starts = self.doc_id_offsets[term_ids]
+        deltas = varbyte_decode(self.doc_id_data[concatenate_ranges(starts, self.doc_id_offsets[term_ids + 1] - starts)])
+        return delta_decode(deltas, self.indptr[term_ids + 1] - self.indptr[term_ids])
+
+    def find_postings(self, term_id, doc_ids):
+        """
+        Cette méthode renvoie la position des postings d'un terme pour des documents qui le contiennent tous.
+
+        :param term_id: Identifiant du terme.
+        :param doc_ids: Identifiants des documents, triés par ordre croissant.
+
+        :return: Les positions des postings.
+        """
+        postings_slice = self.posting_slice(term_id)
+        return postings_slice.start + np.searchsorted(self.term_doc_ids(term_id), doc_ids)
+
+    def term_positions(self, postings):
+        """
+        Cette méthode décode les positions des occurrences de plusieurs postings.
+
+        :param postings: Positions des postings.
+
+        :return: Les positions des occurrences (concaténées, croissantes dans chaque posting) et leur nombre par posting.
+        """
+        if not self.has_positions:
+            raise ValueError("L'index ne conserve pas la position des termes.")
+        postings = np.asarray(postings, dtype=np.int64)
+        starts = self.position_offsets[postings]
+        lengths = self.position_offsets[postings + 1] - starts
+        counts = np.asarray(self.counts[postings], dtype=np.int64)
+        deltas = varbyte_decode(self.position_data[concatenate_ranges(starts, lengths)])
+        return delta_decode(deltas, counts), counts
+
+    def common_documents(self, term_ids):
+        """
+        Cette méthode renvoie les documents contenant tous les termes, par intersection de leurs postings.
+
+        :param term_ids: Identifiants des termes.
+
+        :return: Identifiants des documents, triés par ordre croissant.
+        """
+        # Intersection en commençant par les listes les plus courtes
+        term_ids = sorted(set(int(term_id) for term_id in term_ids), key=lambda term_id: self.indptr[term_id + 1] - self.indptr[term_id])
+        documents = np.asarray(self.term_doc_ids(term_ids[0]))
+        for term_id in term_ids[1:]:
+            documents = np.intersect1d(documents, self.term_doc_ids(term_id), assume_unique=True)
+        return documents
+
+    def position_keys(self, term_id, documents, offset=0):
+        """
+        Cette méthode renvoie une clé par occurrence d'un terme dans des documents : rang du document multiplié par
+        POSITION_STRIDE, plus la position de l'occurrence diminuée de offset. Les clés sont triées par ordre croissant.
+        """
+        positions, counts = self.term_positions(self.find_postings(term_id, documents))
+        return np.repeat(np.arange(len(documents), dtype=np.int64), counts) * POSITION_STRIDE + positions - offset
+
+    def phrase_counts(self, term_ids):
+        """
+        Cette méthode compte les occurrences d'une phrase (suite de termes consécutifs) dans chaque document.
+        Seuls les documents contenant tous les termes sont examinés, et seules leurs positions sont décodées.
+
+        :param term_ids: Identifiants des termes de la phrase, dans l'ordre.
+
+        :return: Les identifiants des documents contenant la phrase et le nombre d'occurrences de la phrase.
+        """
+        documents = self.common_documents(term_ids)
+        if len(documents) == 0:
+            return documents, np.empty(0, dtype=np.int64)
+
+        # Une occurrence de la phrase débute à la position p si chaque terme i apparaît à la position p + i
+        matches = self.position_keys(term_ids[0], documents)
+        for offset, term_id in enumerate(term_ids[1:], start=1):
+            matches = np.intersect1d(matches, self.position_keys(term_id, documents, offset), assume_unique=True)
+
+        counts = np.bincount(matches // POSITION_STRIDE, minlength=len(documents))
+        return documents[counts > 0], counts[counts > 0]
+
+    def near_counts(self, left_term_id, right_term_id, distance):
+        """
+        Cette méthode compte, dans chaque document, les occurrences d'un terme situées à au plus distance positions
+        d'une occurrence d'un autre terme (dans un sens ou dans l'autre).
+
+        :param left_term_id: Identifiant du premier terme.
+        :param right_term_id: Identifiant du second terme.
+        :param distance: Écart maximal entre les positions des deux termes.
+
+        :return: Les identifiants des documents concernés et le nombre d'occurrences proches.
+        """
+        documents = self.common_documents([left_term_id, right_term_id])
+        if len(documents) == 0:
+            return documents, np.empty(0, dtype=np.int64)
+
+        right = self.position_keys(right_term_id, documents)
+        if left_term_id == right_term_id:
+            # Même terme : écart avec l'occurrence précédente et la suivante
+            gaps = np.diff(right)
+            near = np.zeros(len(right), dtype=bool)
+            near[1:] |= gaps <= distance
+            near[:-1] |= gaps <= distance
+        else:
+            # Occurrence du premier terme la plus proche de chaque occurrence du second
+            left = self.position_keys(left_term_id, documents)
+            following = np.searchsorted(left, right)
+            gaps = np.minimum(
+                np.abs(right - left[np.maximum(following - 1, 0)]),
+                np.abs(left[np.minimum(following, len(left) - 1)] - right),
+            )
+            near = gaps <= distance
+
+        counts = np.bincount(right[near] // POSITION_STRIDE, minlength=len(documents))
+        return documents[counts > 0], counts[counts > 0]
+
+    def dot(self, term_ids, query_weights, values):
+        """
+        Cette méthode calcule en un seul produit matrice-vecteur creux le produit scalaire entre une requête
+        et tous les documents. Seuls les postings des termes de la requête sont parcourus.
+
+        :param term_ids: Identifiants des termes de la requête.
+        :param query_weights: Poids des termes de la requête.
+        :param values: Poids de chaque posting (par exemple TF-IDF).
+
+        :return: Vecteur des produits scalaires (un élément par document).
+        """
+        positions, lengths = self.gather(term_ids)
+        weights = values[positions] * np.repeat(query_weights, lengths)
+        # bincount renvoie des entiers lorsqu'aucun posting n'est parcouru
+        return np.bincount(self.gather_doc_ids(term_ids), weights=weights, minlength=self.num_documents).astype(np.float64, copy=False)
+
+    def document_frequencies(self):
+        """
+        Cette méthode renvoie le nombre de documents contenant chaque terme.
+        """
+        return np.diff(self.indptr)
+
+    def posting_term_ids(self):
+        """
+        Cette méthode renvoie l'identifiant du terme de chaque posting.
+        """
+        return np.repeat(np.arange(self.vocabulary_size, dtype=np.int32), self.document_frequencies())
+
+    def document_norms(self, values):
+        """
+        Cette méthode calcule la norme euclidienne de chaque document à partir de valeurs alignées sur les postings.
+
+        :param values: Poids de chaque posting (par exemple TF-IDF).
+
+        :return: Vecteur des normes des documents.
+        """
+        return np.sqrt(np.bincount(self.all_doc_ids(), weights=np.square(values, dtype=np.float64), minlength=self.num_documents))
+
+    def document_order(self):
+        """
+        Cette méthode renvoie l'ordre des postings par document (puis par terme), pour parcourir l'index ligne par ligne.
+
+        :return: Les positions des postings triées par document, et la position de début de chaque document dans cet ordre.
+        """
+        doc_ids = self.all_doc_ids()
+        order = np.argsort(doc_ids, kind="stable")
+        doc_indptr = np.zeros(self.num_documents + 1, dtype=np.int64)
+        np.cumsum(np.bincount(doc_ids, minlength=self.num_documents), out=doc_indptr[1:])
+        return order, doc_indptr
+
+    def to_dense(self, values):
+        """
+        Cette méthode reconstruit la matrice dense (documents x vocabulaire) à partir de valeurs alignées sur les postings.
+        Elle n'est destinée qu'à la visualisation de petits corpus.
+
+        :param values: Poids de chaque posting.
+
+        :return: Matrice dense.
+        """
+        matrix = np.zeros((self.num_documents, self.vocabulary_size))
+        matrix[self.all_doc_ids(), self.posting_term_ids()] = values
+        return matrix
@@ -0,0 +1,182 @@
+"""
+Ce module contient la classe LazyDocuments qui donne accès aux documents d'un fichier JSON ou JSON Lines
+sans les charger en mémoire, ainsi que les fonctions de lecture incrémentale de ces fichiers.
+"""
+import codecs
+import json
+import re
+from collections.abc import MutableMapping
+
+# Espaces autorisés entre les éléments JSON
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+def iter_json_object(path, chunk_size=1 << 20):
+    """
+    Cette fonction parcourt un fichier contenant un objet JSON ({clé: valeur, ...}) sans le charger entièrement :
+    le fichier est lu par blocs et chaque valeur est décodée dès qu'elle est complète.
+
+    :param path: Chemin du fichier JSON.
+    :param chunk_size: Taille des blocs lus (en octets).
+    :return: Un générateur de tuples (clé, valeur, position de début, position de fin), les positions étant
+             exprimées en octets dans le fichier.
+    """
+    decoder = json.JSONDecoder()
+    utf8_decoder = codecs.getincrementaldecoder("utf-8")()
+    with open(path, "rb") as file:
+        # Texte lu mais pas encore consommé ; position est un indice dans buffer, byte_position l'offset correspondant
+        buffer, position, byte_position = "", 0, 0
+
+        def read_more():
+            nonlocal buffer, position
+            # Taille doublée si une valeur dépasse le bloc courant
+            chunk = file.read(max(chunk_size, len(buffer) - position))
+            if not chunk:
+                utf8_decoder.decode(b"", final=True)
+                return False
+            buffer = buffer[position:] + utf8_decoder.decode(chunk)
+            position = 0
+            return True
+
+        def advance(end):
+            nonlocal position, byte_position
+            byte_position += len(buffer[position:end].encode("utf-8"))
+            position = end
+
+        def next_character():
+            while True:
+                advance(WHITESPACE.match(buffer, position).end())
+                if position < len(buffer):
+                    return buffer[position]
+                if not read_more():
+                    return ""
+
+        def decode_value():
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    # Valeur incomplète : lire le bloc suivant
+                    if read_more():
+                        continue
+                    raise
+                if end == len(buffer) and read_more():
+                    # Un nombre peut se poursuivre dans le bloc suivant
+                    continue
+                start = byte_position
+                advance(end)
+                return value, start, byte_position
+
+        if next_character() != "{":
+            raise ValueError(f"Le fichier {path} ne contient pas un objet JSON.")
+        advance(position + 1)
+        if next_character() == "}":
+            return
+        while True:
+            next_character()
+            key, _, _ = decode_value()
+            if next_character() != ":":
+                raise ValueError(f"Caractère ':' attendu à la position {byte_position} du fichier {path}.")
+            advance(position + 1)
+            next_character()
+            value, start, end = decode_value()
+            yield key, value, start, end
+
+            separator = next_character()
+            advance(position + 1)
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Caractère ',' ou '}}' attendu à la position {byte_position - 1} du fichier {path}.")
+
+def iter_json_lines(path):
+    """
+    Cette fonction parcourt un fichier JSON Lines (format de DocumentStore) ligne par ligne.
+    Une dernière ligne tronquée par une écriture interrompue est ignorée.
+
+    :param path: Chemin du fichier JSON Lines.
+    :return: Un générateur de tuples (ville, document, position de début, position de fin), en octets.
+    """
+    with open(path, "rb") as file:
+        start = 0
+        for line in file:
+            end = start + len(line)
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                start = end
+                continue
+            city_name = record.pop("city")
+            yield city_name, record, start, end
+            start = end
+
+class LazyDocuments(MutableMapping):
+    """
+    Cette classe se comporte comme le dictionnaire {ville: document} chargé par Corpus.load_from_files, mais seule
+    la position de chaque document dans le fichier est conservée en mémoire : un document est relu sur le disque
+    lorsqu'il est demandé. Les documents ajoutés ou remplacés ensuite sont conservés en mémoire.
+    """
+    def __init__(self, path, offsets, city_key=None):
+        """
+        :param path: Chemin du fichier JSON ou JSON Lines.
+        :param offsets: Dictionnaire {ville: (position de début, position de fin)} des documents dans le fichier.
+        :param city_key: Clé contenant le nom de la ville dans chaque document (JSON Lines), retirée à la lecture.
+        """
+        self.path = path
+        self.offsets = offsets
+        self.city_key = city_key
+        self.updates = {}
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Cette méthode parcourt un fichier JSON ou JSON Lines (selon son extension) pour repérer la position
+        de chaque document. Comme avec json.load, la dernière version d'une ville enregistrée plusieurs fois est conservée.
+
+        :param path: Chemin du fichier.
+        :return: Un objet LazyDocuments.
+        """
+        json_lines = path.endswith(".jsonl")
+        records = iter_json_lines(path) if json_lines else iter_json_object(path)
+        offsets = {city_name: (start, end) for city_name, _, start, end in records}
+        return cls(path, offsets, "city" if json_lines else None)
+
+    def subset(self, city_names):
+        """
+        Cette méthode renvoie un objet LazyDocuments limité à certaines villes, qui relit le même fichier
+        (par exemple, pour qu'un autre processus lise lui-même une partie des documents).
+
+        :param city_names: Noms des villes.
+        :return: Un objet LazyDocuments.
+        """
+        documents = LazyDocuments(self.path, {city_name: self.offsets[city_name] for city_name in city_names}, self.city_key)
+        documents.updates = {city_name: self.updates[city_name] for city_name in city_names if city_name in self.updates}
+        return documents
+
+    def __getitem__(self, city_name):
+        if city_name in self.updates:
+            return self.updates[city_name]
+        start, end = self.offsets[city_name]
+        with open(self.path, "rb") as file:
+            file.seek(start)
+            document = json.loads(file.read(end - start))
+        if self.city_key is not None:
+            document.pop(self.city_key, None)
+        return document
+
+    def __setitem__(self, city_name, document):
+        if city_name not in self.updates:
+            self.offsets.setdefault(city_name, None)
+        self.updates[city_name] = document
+
+    def __delitem__(self, city_name):
+        del self.offsets[city_name]
+        self.updates.pop(city_name, None)
+
+    def __iter__(self):
+        return iter(self.offsets)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __contains__(self, city_name):
+        return city_name in self.offsets
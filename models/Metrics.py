@@ -0,0 +1,221 @@
+"""
+Ce module contient la classe Metrics qui mesure la durée des étapes de l'indexation et de la recherche.
+"""
+import bisect
+import cProfile
+import io
+import math
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# Bornes supérieures des intervalles des histogrammes, en secondes
+BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+
+class Histogram:
+    """
+    Cette classe compte les durées observées par intervalle (comme un histogramme Prometheus),
+    ce qui permet d'estimer les percentiles avec une mémoire constante.
+    """
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q):
+        """
+        Cette méthode estime un percentile par la borne supérieure de l'intervalle qui le contient.
+
+        :param q: Percentile, entre 0 et 1.
+        :return: La durée estimée, bornée par la durée maximale observée.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+        }
+
+class Metrics:
+    """
+    Cette classe regroupe les mesures d'un moteur de recherche : histogrammes des durées de chaque étape
+    (regroupées par famille, par exemple "build" ou "query"), compteurs, et valeurs calculées à la demande (jauges).
+    Une mesure ne coûte que deux lectures d'horloge et une mise à jour protégée par un verrou ;
+    avec enabled=False, aucune mesure n'est enregistrée.
+    """
+    def __init__(self, enabled=True, prefix="moteur_recherche"):
+        """
+        :param enabled: Active l'enregistrement des mesures.
+        :param prefix: Préfixe des noms des métriques au format Prometheus.
+        """
+        self.enabled = enabled
+        self.prefix = prefix
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+
+    def observe(self, family, stage, seconds):
+        """
+        Cette méthode enregistre la durée d'une étape.
+
+        :param family: Famille de l'étape ("build", "query", ...).
+        :param stage: Nom de l'étape.
+        :param seconds: Durée en secondes.
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get((family, stage))
+            if histogram is None:
+                histogram = self.histograms[(family, stage)] = Histogram()
+            histogram.observe(seconds)
+
+    def time(self, family, stage):
+        """
+        Cette méthode renvoie un gestionnaire de contexte qui mesure la durée du bloc qu'il entoure.
+
+        :param family: Famille de l'étape.
+        :param stage: Nom de l'étape.
+        """
+        return self.timer(family, stage) if self.enabled else nullcontext()
+
+    @contextmanager
+    def timer(self, family, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(family, stage, time.perf_counter() - start)
+
+    def increment(self, name, value=1):
+        """
+        Cette méthode incrémente un compteur.
+
+        :param name: Nom du compteur.
+        :param value: Valeur ajoutée.
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def register_gauge(self, name, function):
+        """
+        Cette méthode enregistre une valeur calculée au moment de la lecture des mesures (taille du cache, etc.).
+
+        :param name: Nom de la jauge.
+        :param function: Fonction sans argument renvoyant la valeur.
+        """
+        self.gauges[name] = function
+
+    def reset(self):
+        """
+        Cette méthode efface les durées et les compteurs enregistrés.
+        """
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def snapshot(self):
+        """
+        Cette méthode renvoie l'état courant des mesures.
+
+        :return: Dictionnaire {"stages": {famille: {étape: résumé}}, "counters": {...}, "gauges": {...}}, les durées
+                 étant exprimées en secondes.
+        """
+        with self.lock:
+            stages = {}
+            for (family, stage), histogram in self.histograms.items():
+                stages.setdefault(family, {})[stage] = histogram.summary()
+            counters = dict(self.counters)
+        gauges = {name: function() for name, function in self.gauges.items()}
+        return {"stages": stages, "counters": counters, "gauges": gauges}
+
+    def to_prometheus(self):
+        """
+        Cette méthode renvoie les mesures au format texte de Prometheus.
+
+        :return: Le texte à exposer (par exemple sur /metrics).
+        """
+        lines = []
+        with self.lock:
+            families = {}
+            for (family, stage), histogram in sorted(self.histograms.items()):
+                families.setdefault(family, []).append((stage, histogram.counts[:], histogram.count, histogram.sum))
+            counters = sorted(self.counters.items())
+
+        for family, histograms in families.items():
+            name = f"{self.prefix}_{family}_seconds"
+            lines.append(f"# TYPE {name} histogram")
+            for stage, counts, count, total in histograms:
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS, counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if math.isinf(bound) else repr(bound)
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {total!r}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+        for counter, value in counters:
+            lines.append(f"# TYPE {self.prefix}_{counter}_total counter")
+            lines.append(f"{self.prefix}_{counter}_total {value}")
+        for gauge, function in sorted(self.gauges.items()):
+            lines.append(f"# TYPE {self.prefix}_{gauge} gauge")
+            lines.append(f"{self.prefix}_{gauge} {float(function())!r}")
+        return "\n".join(lines) + "\n"
+
+def profile_call(function, *args, sort_by="cumulative", limit=25, **kwargs):
+    """
+    Cette fonction exécute un appel sous cProfile et tracemalloc, pour analyser une requête lente.
+    Le profilage ralentit fortement l'exécution : il n'est activé que pour cet appel.
+
+    :param function: La fonction à appeler.
+    :param sort_by: Critère de tri des fonctions dans le rapport (voir pstats).
+    :param limit: Nombre de fonctions affichées dans le rapport.
+    :return: Le résultat de l'appel et un dictionnaire {"seconds", "peak_memory", "profile"}.
+    """
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    # reset_peak n'existe qu'à partir de Python 3.9 : auparavant, le pic inclut les allocations tracées plus tôt
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        result = profiler.runcall(function, *args, **kwargs)
+    finally:
+        seconds = time.perf_counter() - start
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        if not tracing:
+            tracemalloc.stop()
+
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).sort_stats(sort_by).print_stats(limit)
+    return result, {"seconds": seconds, "peak_memory": peak_memory, "profile": report.getvalue()}
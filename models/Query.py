@@ -0,0 +1,51 @@
+"""
+Ce module contient la classe Query qui analyse la syntaxe des requêtes : phrases entre guillemets et opérateur NEAR.
+"""
+import re
+
+class Query:
+    """
+    Cette classe représente une requête analysée :
+    - "musée du louvre" : phrase exacte, les documents doivent contenir les mots consécutifs
+    - plage NEAR/5 surf : les documents où les deux mots apparaissent à au plus 5 mots d'écart sont favorisés
+    Tous les mots de la requête, y compris ceux des phrases et des opérateurs NEAR, contribuent au score.
+    """
+    PHRASE_PATTERN = re.compile(r'"([^"]*)"')
+    NEAR_PATTERN = re.compile(r'(\S+)\s+NEAR(?:/(\d+))?\s+(\S+)')
+
+    def __init__(self, text, phrases=(), near=()):
+        """
+        :param text: Texte de la requête, sans guillemets ni opérateurs.
+        :param phrases: Liste des phrases exactes.
+        :param near: Liste de tuples (mot, mot, distance maximale).
+        """
+        self.text = text
+        self.phrases = list(phrases)
+        self.near = list(near)
+
+    def __repr__(self):
+        return f"Query(text={self.text!r}, phrases={self.phrases!r}, near={self.near!r})"
+
+    @property
+    def has_operators(self):
+        """
+        Indique si la requête contient une phrase ou un opérateur NEAR.
+        """
+        return bool(self.phrases or self.near)
+
+    @classmethod
+    def parse(cls, query, default_distance=5):
+        """
+        Cette méthode analyse le texte d'une requête.
+
+        :param query: La requête sous forme de texte.
+        :param default_distance: Distance utilisée pour NEAR lorsqu'elle n'est pas précisée.
+        :return: Un objet Query.
+        """
+        phrases = [phrase for phrase in cls.PHRASE_PATTERN.findall(query) if phrase.strip()]
+        text = cls.PHRASE_PATTERN.sub(r" \1 ", query)
+
+        near = [(left, right, int(distance) if distance else default_distance)
+                for left, distance, right in cls.NEAR_PATTERN.findall(text)]
+        text = cls.NEAR_PATTERN.sub(r"\1 \3", text)
+        return cls(" ".join(text.split()), phrases, near)
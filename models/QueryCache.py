@@ -0,0 +1,87 @@
+"""
+Ce module contient la classe QueryCache qui conserve les résultats des requêtes les plus récentes.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+class QueryCache:
+    """
+    Cette classe implémente un cache LRU (les entrées les moins récemment utilisées sont retirées en premier),
+    de taille bornée et avec une durée de vie optionnelle. Chaque entrée est associée à la version de l'index
+    (Corpus.generation) : le cache est vidé dès que l'index change. Toutes les opérations sont protégées par un verrou.
+    """
+    def __init__(self, max_size=1024, ttl=None):
+        """
+        :param max_size: Nombre maximum de requêtes conservées.
+        :param ttl: Durée de vie d'une entrée en secondes (None pour ne jamais expirer).
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.generation = None
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, generation):
+        """
+        Cette méthode renvoie le résultat associé à une requête, s'il est en cache et encore valide.
+
+        :param key: Clé de la requête.
+        :param generation: Version courante de l'index.
+        :return: Le résultat, ou None s'il est absent.
+        """
+        with self.lock:
+            if generation != self.generation:
+                self.entries.clear()
+                self.generation = generation
+            entry = self.entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, generation, value):
+        """
+        Cette méthode enregistre le résultat d'une requête calculé pour une version de l'index.
+
+        :param key: Clé de la requête.
+        :param generation: Version de l'index utilisée pour calculer le résultat.
+        :param value: Le résultat.
+        """
+        with self.lock:
+            if generation != self.generation:
+                # Résultat calculé sur une autre version de l'index
+                return
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Cette méthode vide le cache.
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """
+        Cette méthode renvoie les statistiques d'utilisation du cache.
+
+        :return: Dictionnaire contenant la taille, le nombre de succès et d'échecs et le taux de succès.
+        """
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
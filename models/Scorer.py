@@ -0,0 +1,408 @@
+"""
+Ce module contient les fonctions de score utilisées par le moteur de recherche : la similarité cosinus sur les poids
+TF-IDF et le modèle probabiliste BM25.
+"""
+from contextlib import nullcontext
+import numpy as np
+
+def select_top_n(scores, top_n):
+    """
+    Cette fonction sélectionne les indices des top_n meilleurs scores par sélection partielle (np.partition),
+    puis trie uniquement ces candidats. À score égal, l'ordre des documents est conservé.
+
+    :param scores: Vecteur des scores.
+    :param top_n: Le nombre de résultats à retourner.
+
+    :return: Les indices des meilleurs scores, du plus élevé au plus faible.
+    """
+    return select_top_n_batch(scores[np.newaxis, :], top_n)[0]
+
+def select_top_n_batch(scores, top_n):
+    """
+    Cette fonction applique select_top_n à chaque ligne d'une matrice de scores, sans boucle sur les lignes.
+
+    :param scores: Matrice des scores (une ligne par requête).
+    :param top_n: Le nombre de résultats à retourner par ligne.
+
+    :return: Matrice des indices des meilleurs scores de chaque ligne, du plus élevé au plus faible.
+    """
+    num_rows, num_columns = scores.shape
+    top_n = min(top_n, num_columns)
+    if top_n <= 0:
+        return np.empty((num_rows, 0), dtype=np.int64)
+
+    # k-ième meilleur score de chaque ligne
+    thresholds = -np.partition(-scores, top_n - 1, axis=1)[:, top_n - 1:top_n]
+
+    # Tous les scores strictement supérieurs, complétés par les premiers documents à égalité avec le seuil
+    above = scores > thresholds
+    ties = scores == thresholds
+    missing = top_n - above.sum(axis=1, keepdims=True)
+    selected = above | (ties & (np.cumsum(ties, axis=1) <= missing))
+    top_ids = np.nonzero(selected)[1].reshape(num_rows, top_n)
+
+    # Trier les candidats par score décroissant (les identifiants sont déjà croissants)
+    top_scores = np.take_along_axis(scores, top_ids, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    return np.take_along_axis(top_ids, order, axis=1)
+
+class ScoringState:
+    """
+    Cette classe regroupe les valeurs précalculées par une fonction de score pour une version donnée de l'index.
+    Elle n'est jamais modifiée : une recherche en cours continue d'utiliser la version qu'elle a lue.
+    Les documents ajoutés depuis la dernière fusion forment un second segment (pending), dont le document i porte
+    l'identifiant index.num_documents + i, et les documents supprimés sont exclus des résultats.
+    """
+    __slots__ = ("generation", "index_generation", "index", "impacts", "upper_bounds", "pending", "deleted", "num_documents")
+
+    def __init__(self, generation, index, impacts, upper_bounds, index_generation=None, pending=None, deleted=None):
+        """
+        :param generation: Numéro de version de l'index (Corpus.generation).
+        :param index: Index inversé.
+        :param impacts: Contribution au score de chaque posting, pour un poids de requête égal à 1.
+        :param upper_bounds: Contribution maximale de chaque terme (utilisée pour l'élagage).
+        :param index_generation: Numéro de version de l'index fusionné (Corpus.index_generation).
+        :param pending: Objet ScoringState des documents en attente, ou None.
+        :param deleted: Identifiants triés des documents supprimés, ou None.
+        """
+        self.generation = generation
+        self.index_generation = index_generation
+        self.index = index
+        self.impacts = impacts
+        self.upper_bounds = upper_bounds
+        self.pending = pending
+        self.deleted = deleted if deleted is not None else np.empty(0, dtype=np.int64)
+        self.num_documents = index.num_documents + (pending.index.num_documents if pending is not None else 0)
+
+    def segments(self):
+        """
+        Cette méthode renvoie les segments de l'index et l'identifiant de leur premier document.
+
+        :return: Liste de tuples (ScoringState, décalage des identifiants).
+        """
+        if self.pending is None:
+            return [(self, 0)]
+        return [(self, 0), (self.pending, self.index.num_documents)]
+
+    def known_terms(self, term_ids):
+        """
+        Cette méthode indique les termes présents dans le vocabulaire du segment (les termes ajoutés depuis
+        la dernière fusion n'ont de postings que dans le segment des documents en attente).
+
+        :param term_ids: Identifiants des termes.
+        :return: Masque booléen des termes connus.
+        """
+        return np.asarray(term_ids) < self.index.vocabulary_size
+
+    def live_documents(self):
+        """
+        Cette méthode renvoie les identifiants des documents non supprimés.
+        """
+        return np.setdiff1d(np.arange(self.num_documents), self.deleted, assume_unique=True)
+
+    def phrase_documents(self, term_ids):
+        """
+        Cette méthode renvoie les documents contenant une phrase, dans tous les segments (voir InvertedIndex.phrase_counts).
+
+        :param term_ids: Identifiants des termes de la phrase.
+        :return: Identifiants croissants des documents.
+        """
+        return np.concatenate([segment.index.phrase_counts(term_ids)[0] + offset for segment, offset in self.segments()
+                               if segment.known_terms(term_ids).all()] + [np.empty(0, dtype=np.int64)])
+
+    def near_documents(self, left_term_id, right_term_id, distance):
+        """
+        Cette méthode renvoie les documents où deux termes sont proches, dans tous les segments (voir InvertedIndex.near_counts).
+
+        :param left_term_id: Identifiant du premier terme.
+        :param right_term_id: Identifiant du second terme.
+        :param distance: Nombre maximal de positions entre les deux termes.
+        :return: Identifiants croissants des documents.
+        """
+        return np.concatenate([segment.index.near_counts(left_term_id, right_term_id, distance)[0] + offset
+                               for segment, offset in self.segments()
+                               if segment.known_terms([left_term_id, right_term_id]).all()] + [np.empty(0, dtype=np.int64)])
+
+class Scorer:
+    """
+    Cette classe définit l'interface d'une fonction de score. Le score d'un document est la somme, sur les termes
+    de la requête, du poids du terme dans la requête multiplié par l'impact du posting, calculé lors de l'indexation.
+    """
+    def __init__(self):
+        self.state = None
+        # Objet Metrics recevant la durée du calcul des scores et de la sélection (défini par SearchEngine)
+        self.metrics = None
+
+    def __getstate__(self):
+        # Les valeurs précalculées et les mesures ne sont pas transmises aux autres processus
+        state = self.__dict__.copy()
+        state["state"] = None
+        state["metrics"] = None
+        return state
+
+    def time(self, stage):
+        """
+        Cette méthode mesure la durée d'une étape de la recherche, si des mesures sont demandées.
+
+        :param stage: Nom de l'étape ("score" ou "select").
+        :return: Un gestionnaire de contexte.
+        """
+        return self.metrics.time("query", stage) if self.metrics is not None else nullcontext()
+
+    def compute_impacts(self, corpus):
+        """
+        Cette méthode calcule l'impact de chaque posting de l'index du corpus.
+
+        :param corpus: Objet de la classe Corpus
+        :return: Vecteur des impacts, aligné sur les postings.
+        """
+        raise NotImplementedError
+
+    def prepare(self, corpus):
+        """
+        Cette méthode précalcule les impacts et leurs bornes lorsque l'index du corpus a changé.
+        Elle doit être appelée en détenant le verrou du corpus.
+
+        :param corpus: Objet de la classe Corpus
+        :return: L'objet ScoringState correspondant à la version courante de l'index.
+        """
+        if self.state is None or self.state.generation != corpus.generation:
+            # Les impacts de l'index fusionné ne sont recalculés qu'après une fusion
+            state = self.state
+            if state is None or state.index_generation != corpus.index_generation:
+                state = self.prepare_segment(corpus)
+            pending = self.prepare_segment(corpus.pending) if corpus.pending is not None else None
+            deleted = np.array(sorted(corpus.index.deleted), dtype=np.int64)
+            self.state = ScoringState(corpus.generation, state.index, state.impacts, state.upper_bounds,
+                                      corpus.index_generation, pending, deleted)
+        return self.state
+
+    def prepare_segment(self, corpus):
+        """
+        Cette méthode calcule les impacts des postings de l'index du corpus et leurs bornes.
+
+        :param corpus: Objet de la classe Corpus (l'index fusionné, ou les documents en attente).
+        :return: Un objet ScoringState.
+        """
+        index = corpus.index
+        impacts = self.compute_impacts(corpus)
+        if corpus.compact:
+            impacts = impacts.astype(np.float32)
+
+        # Impact maximal de chaque terme (0 pour les termes sans posting)
+        upper_bounds = np.zeros(index.vocabulary_size)
+        non_empty = np.flatnonzero(index.document_frequencies() > 0)
+        if len(non_empty):
+            upper_bounds[non_empty] = np.maximum.reduceat(impacts, index.indptr[non_empty])
+        return ScoringState(corpus.generation, index, impacts, upper_bounds, corpus.index_generation)
+
+    def finalize(self, scores, query_weights):
+        """
+        Cette méthode transforme les scores accumulés en scores finaux (par défaut, sans modification).
+
+        :param scores: Scores accumulés.
+        :param query_weights: Poids des termes de la requête.
+        :return: Les scores finaux.
+        """
+        return scores
+
+    def finalize_batch(self, scores, query_rows, query_weights):
+        """
+        Cette méthode applique finalize à une matrice de scores (une ligne par requête).
+
+        :param scores: Matrice des scores accumulés.
+        :param query_rows: Ligne (requête) de chaque terme.
+        :param query_weights: Poids de chaque terme.
+        :return: La matrice des scores finaux.
+        """
+        return scores
+
+    def top_n_batch(self, state, query_rows, term_ids, query_weights, num_queries, top_n):
+        """
+        Cette méthode calcule les scores de plusieurs requêtes en un seul produit de matrices creuses
+        (requêtes x termes) x (termes x documents), puis sélectionne les meilleurs documents de chaque requête.
+        La mémoire utilisée est proportionnelle à (nombre de requêtes x nombre de documents).
+
+        :param state: Objet ScoringState renvoyé par prepare.
+        :param query_rows: Ligne (requête) de chaque terme.
+        :param term_ids: Identifiant de chaque terme.
+        :param query_weights: Poids de chaque terme.
+        :param num_queries: Nombre de requêtes.
+        :param top_n: Le nombre de résultats à retourner par requête.
+
+        :return: Les matrices des identifiants des meilleurs documents et de leurs scores.
+        """
+        num_documents = state.num_documents
+        query_rows = np.asarray(query_rows, dtype=np.int64)
+        cells, contributions = [], []
+        for segment, offset in state.segments():
+            known = segment.known_terms(term_ids)
+            positions, lengths = segment.index.gather(term_ids[known])
+            cells.append(np.repeat(query_rows[known] * num_documents + offset, lengths) + segment.index.gather_doc_ids(term_ids[known]))
+            contributions.append(segment.impacts[positions] * np.repeat(query_weights[known], lengths))
+        scores = np.bincount(np.concatenate(cells), weights=np.concatenate(contributions),
+                             minlength=num_queries * num_documents).astype(np.float64, copy=False)
+        scores = self.finalize_batch(scores.reshape(num_queries, num_documents), query_rows, query_weights)
+        scores[:, state.deleted] = -np.inf
+
+        top_ids = select_top_n_batch(scores, min(top_n, num_documents - len(state.deleted)))
+        return top_ids, np.take_along_axis(scores, top_ids, axis=1)
+
+    def score(self, state, term_ids, query_weights):
+        """
+        Cette méthode calcule le score de tous les documents en un seul produit matrice-vecteur creux.
+
+        :param state: Objet ScoringState renvoyé par prepare.
+        :param term_ids: Identifiants des termes de la requête.
+        :param query_weights: Poids des termes de la requête.
+
+        :return: Vecteur des scores (un élément par document, -inf pour les documents supprimés).
+        """
+        segment_scores = []
+        for segment, _ in state.segments():
+            known = segment.known_terms(term_ids)
+            segment_scores.append(segment.index.dot(term_ids[known], query_weights[known], segment.impacts))
+        scores = self.finalize(np.concatenate(segment_scores), query_weights)
+        scores[state.deleted] = -np.inf
+        return scores
+
+    def top_n(self, state, term_ids, query_weights, top_n):
+        """
+        Cette méthode calcule le score de tous les documents en un seul produit matrice-vecteur creux
+        et sélectionne les meilleurs.
+
+        :param state: Objet ScoringState renvoyé par prepare.
+        :param term_ids: Identifiants des termes de la requête.
+        :param query_weights: Poids des termes de la requête.
+        :param top_n: Le nombre de résultats à retourner.
+
+        :return: Les identifiants des meilleurs documents et leurs scores.
+        """
+        with self.time("score"):
+            scores = self.score(state, term_ids, query_weights)
+        with self.time("select"):
+            top_ids = select_top_n(scores, min(top_n, state.num_documents - len(state.deleted)))
+        return top_ids, scores[top_ids]
+
+class CosineScorer(Scorer):
+    """
+    Cette classe calcule la similarité cosinus entre la requête et les vecteurs TF-IDF des documents.
+    Les normes des documents sont intégrées aux impacts lors de l'indexation.
+    """
+    def compute_impacts(self, corpus):
+        doc_norms = corpus.doc_norms[corpus.index.all_doc_ids()]
+        return np.divide(corpus.tfidf_values, doc_norms, out=np.zeros(len(doc_norms)), where=doc_norms != 0)
+
+    def finalize(self, scores, query_weights):
+        norm_query = np.linalg.norm(query_weights)
+        return scores / norm_query if norm_query != 0 else np.zeros(len(scores))
+
+    def finalize_batch(self, scores, query_rows, query_weights):
+        norm_queries = np.sqrt(np.bincount(query_rows, weights=query_weights ** 2, minlength=len(scores)))[:, np.newaxis]
+        return np.divide(scores, norm_queries, out=np.zeros_like(scores), where=norm_queries != 0)
+
+class BM25Scorer(Scorer):
+    """
+    Cette classe implémente le modèle BM25. L'IDF et la normalisation par la longueur des documents sont
+    précalculées dans l'impact de chaque posting. La recherche des meilleurs documents utilise l'élagage MaxScore :
+    les termes sont traités par impact maximal décroissant, et dès que la somme des impacts maximaux des termes
+    restants ne permet plus à un nouveau document d'entrer dans les top_n, seuls les documents déjà candidats
+    sont mis à jour (par recherche dichotomique dans les postings, sans parcourir les autres documents).
+    """
+    def __init__(self, k1=1.2, b=0.75, pruning=True):
+        """
+        :param k1: Saturation de la fréquence des termes.
+        :param b: Importance de la normalisation par la longueur des documents.
+        :param pruning: Active l'élagage MaxScore.
+        """
+        super().__init__()
+        self.k1 = k1
+        self.b = b
+        self.pruning = pruning
+
+    def compute_impacts(self, corpus):
+        index = corpus.index
+        # Statistiques de la collection entière, y compris lorsque le corpus est un shard
+        num_documents, doc_frequency, average_length = corpus.collection_statistics()
+        idf = np.log(1 + (num_documents - doc_frequency + 0.5) / (doc_frequency + 0.5))
+
+        doc_lengths = np.asarray(corpus.doc_lengths, dtype=np.float64)
+        length_norms = self.k1 * (1 - self.b + self.b * doc_lengths / average_length)
+
+        counts = np.asarray(index.counts, dtype=np.float64)
+        return idf[index.posting_term_ids()] * counts * (self.k1 + 1) / (counts + length_norms[index.all_doc_ids()])
+
+    def top_n(self, state, term_ids, query_weights, top_n):
+        if not self.pruning:
+            return super().top_n(state, term_ids, query_weights, top_n)
+
+        with self.time("score"):
+            # Élagage séparé de chaque segment : les top_n meilleurs documents figurent parmi les candidats réunis
+            candidates, scores = [], []
+            for segment, offset in state.segments():
+                known = segment.known_terms(term_ids)
+                deleted = state.deleted[(state.deleted >= offset) & (state.deleted < offset + segment.index.num_documents)] - offset
+                segment_candidates, segment_scores = self.max_score(segment, term_ids[known], query_weights[known], top_n, deleted)
+                candidates.append(segment_candidates + offset)
+                scores.append(segment_scores)
+            candidates, scores = np.concatenate(candidates), np.concatenate(scores)
+        with self.time("select"):
+            selected = select_top_n(scores, top_n)
+        top_ids, top_scores = candidates[selected], scores[selected]
+
+        # Compléter avec des documents de score nul (hors documents supprimés), comme le calcul exhaustif
+        missing = min(top_n, state.num_documents - len(state.deleted)) - len(top_ids)
+        if missing > 0:
+            excluded = np.concatenate([top_ids, state.deleted])
+            others = np.setdiff1d(np.arange(min(state.num_documents, len(excluded) + missing)), excluded)[:missing]
+            top_ids = np.concatenate([top_ids, others])
+            top_scores = np.concatenate([top_scores, np.zeros(len(others))])
+        return top_ids, top_scores
+
+    def max_score(self, state, term_ids, query_weights, top_n, deleted=None):
+        """
+        Cette méthode parcourt les postings des termes de la requête avec l'élagage MaxScore.
+
+        :param state: Objet ScoringState d'un segment de l'index.
+        :param term_ids: Identifiants des termes de la requête.
+        :param query_weights: Poids des termes de la requête.
+        :param top_n: Le nombre de résultats recherchés.
+        :param deleted: Identifiants triés des documents supprimés du segment, exclus des candidats.
+
+        :return: Les documents candidats et leurs scores, parmi lesquels figurent les top_n meilleurs documents.
+        """
+        index = state.index
+        bounds = state.upper_bounds[term_ids] * query_weights
+        order = np.argsort(-bounds, kind="stable")
+        term_ids, query_weights, bounds = term_ids[order], query_weights[order], bounds[order]
+        # remaining[i] : score maximal qu'un document peut encore obtenir à partir du terme i
+        remaining = np.append(np.cumsum(bounds[::-1])[::-1], 0.0)
+
+        candidates = np.empty(0, dtype=np.int64)
+        scores = np.empty(0)
+        threshold = 0.0
+        for i, (term_id, weight) in enumerate(zip(term_ids, query_weights)):
+            postings_slice = index.posting_slice(term_id)
+            doc_ids = index.term_doc_ids(term_id)
+            impacts = state.impacts[postings_slice] * weight
+
+            if len(scores) >= top_n and remaining[i] < threshold:
+                # Aucun nouveau document ne peut entrer dans les top_n : mise à jour des seuls candidats
+                positions = np.minimum(np.searchsorted(doc_ids, candidates), max(len(doc_ids) - 1, 0))
+                found = doc_ids[positions] == candidates if len(doc_ids) else np.zeros(len(candidates), dtype=bool)
+                scores[found] += impacts[positions[found]]
+            else:
+                # Fusion des postings du terme avec les candidats
+                merged_ids, inverse = np.unique(np.concatenate([candidates, doc_ids]), return_inverse=True)
+                scores = np.bincount(inverse, weights=np.concatenate([scores, impacts]), minlength=len(merged_ids))
+                candidates = merged_ids
+                if deleted is not None and len(deleted):
+                    live = ~np.isin(candidates, deleted, assume_unique=True)
+                    candidates, scores = candidates[live], scores[live]
+
+            # Retirer les candidats qui ne peuvent plus atteindre le k-ième meilleur score
+            if len(scores) >= top_n > 0:
+                threshold = np.partition(scores, len(scores) - top_n)[len(scores) - top_n]
+                keep = scores + remaining[i + 1] >= threshold
+                candidates, scores = candidates[keep], scores[keep]
+        return candidates, scores
@@ -1,31 +1,93 @@
 """
 Ce module contient la classe SearchEngine qui permet de réaliser la recherche par mots-clés.
 """
+import time
 import numpy as np
-import pandas as pd
-from collections import Counter
-import re
+from models.Metrics import profile_call
+from models.Query import Query
+from models.QueryCache import QueryCache
+from models.Scorer import CosineScorer, select_top_n
+from models.SearchResult import SearchResult, SearchResults
+from models.Suggester import Suggester
 
 class SearchEngine:
     """
     Cette classe regroupe les différentes méthodes permettant de réaliser une recherche et trouver les documents les plus pertinents.
     """
-    def __init__(self, corpus):
+    def __init__(self, corpus, index_path=None, scorer=None, cache_size=1024, cache_ttl=None, proximity_boost=0.5):
         """
         Cette méthode permet d'initialiser le moteur de recherche avec un objet Corpus.
-        Lors de l'initialisation, nous calculons la matrice TF-IDF.
+        Lors de l'initialisation, nous calculons la matrice TF-IDF, ou nous la rechargeons depuis le disque
+        si un index à jour y a été enregistré.
 
         :param corpus: Objet de la classe Corpus
+        :param index_path: Répertoire de l'index persistant (optionnel)
+        :param scorer: Fonction de score, par exemple BM25Scorer() (par défaut, la similarité cosinus)
+        :param cache_size: Nombre de requêtes conservées dans le cache des résultats (0 pour le désactiver)
+        :param cache_ttl: Durée de vie des résultats en cache, en secondes (optionnel)
+        :param proximity_boost: Bonus relatif accordé aux documents satisfaisant chaque opérateur NEAR de la requête
         """
         self.corpus = corpus
-        # Charger et préparer les textes
-        self.texts = corpus.prepare_texts()
-        # Calculer TF et IDF
-        self.corpus.calculate_tf(self.texts)
-        self.corpus.calculate_idf(self.texts)
+        self.proximity_boost = proximity_boost
+        self.scorer = scorer or CosineScorer()
+        self.cache = QueryCache(cache_size, cache_ttl) if cache_size else None
+        # Complétion et correction des requêtes, à partir du vocabulaire de l'index
+        self.suggester = Suggester(corpus)
+
+        # Les mesures de la recherche sont enregistrées avec celles de l'indexation du corpus
+        self.metrics = corpus.metrics
+        self.scorer.metrics = self.metrics
+        if self.cache is not None:
+            for name in ("size", "hits", "misses", "hit_rate"):
+                self.metrics.register_gauge(f"cache_{name}", lambda name=name: self.cache.stats()[name])
+
+        # Index déjà construit ou rechargé avec load_index (par exemple, un shard)
+        if corpus.tfidf_values is not None:
+            return
+
+        # Recharger l'index enregistré s'il correspond toujours aux données
+        fingerprint = None
+        if index_path is not None and corpus.data_file_path is not None:
+            fingerprint = corpus.fingerprint(corpus.data_file_path)
+            if corpus.load_index(index_path, fingerprint):
+                return
+
+        # Calculer TF et IDF, en lisant les textes un par un
+        self.corpus.calculate_tf(self.corpus.iter_texts())
+        self.corpus.calculate_idf()
         # Calculer la matrice TF-IDF
         self.corpus.calculate_tfidf()
 
+        if index_path is not None:
+            self.corpus.save_index(index_path, fingerprint)
+
+    def add_document(self, city_name, text):
+        """
+        Cette méthode ajoute une ville au moteur de recherche sans reconstruire l'index.
+        Elle est prise en compte dès la recherche suivante.
+
+        :param city_name: Nom de la ville
+        :param text: Texte de la section 'do' de la ville
+        """
+        self.corpus.add_document(city_name, text)
+
+    def update_document(self, city_name, text):
+        """
+        Cette méthode remplace le texte d'une ville (ou l'ajoute si elle n'est pas encore indexée).
+
+        :param city_name: Nom de la ville
+        :param text: Nouveau texte de la section 'do' de la ville
+        """
+        self.corpus.update_document(city_name, text)
+
+    def delete_document(self, city_name):
+        """
+        Cette méthode retire une ville du moteur de recherche.
+
+        :param city_name: Nom de la ville
+        """
+        self.corpus.delete_document(city_name)
+
     def transform_query_to_vector(self, query):
         """
         Cette méthode transforme une requête textuelle en un vecteur de termes
@@ -35,16 +97,10 @@ class SearchEngine:
 
         :return: Requête sous forme de vecteur
         """
-        # Nettoyer et séparer les mots de la requête
-        query_words = re.findall(r'\b\w+\b', query.lower())
-        query_word_counts = Counter(query_words)
-        
-        # Vecteur pour la requête
+        # Encoder la requête sous forme creuse, puis remplir le vecteur
+        term_ids, weights = self.corpus.encode_query(query)
         query_vector = np.zeros(len(self.corpus.vocabulary))
-
-        # Remplir le vecteur de la requête avec les occurrences des mots de la requête
-        for i, word in enumerate(self.corpus.vocabulary):
-            query_vector[i] = query_word_counts.get(word, 0)
+        query_vector[term_ids] = weights
 
         return query_vector
 
@@ -66,33 +122,217 @@ class SearchEngine:
             return 0
         return dot_product / (norm_query * norm_doc)
 
-    def search(self, query, top_n=5):
+    def select_top_n(self, scores, top_n):
+        """
+        Cette méthode sélectionne les indices des top_n meilleurs scores par sélection partielle (argpartition),
+        puis trie uniquement ces candidats. À score égal, l'ordre des documents est conservé.
+
+        :param scores: Vecteur des scores.
+        :param top_n: Le nombre de résultats à retourner.
+
+        :return: Les indices des meilleurs scores, du plus élevé au plus faible.
+        """
+        return select_top_n(scores, top_n)
+
+    def search(self, query, top_n=5, use_cache=True):
         """
         Cette méthode recherche les documents les plus pertinents en fonction de la requête.
+        Les phrases entre guillemets doivent figurer telles quelles dans les documents, et l'opérateur NEAR/k
+        favorise les documents où deux mots apparaissent à au plus k mots d'écart (voir la classe Query).
+        Si l'index ne conserve pas la position des termes, leurs mots sont recherchés comme les autres mots de la requête.
+        La durée de chaque étape (vectorize, score, select, render) est enregistrée dans self.metrics.
         
         :param query: La requête sous forme de texte.
         :param top_n: Le nombre de résultats à retourner (par défaut 5).
+        :param use_cache: Utiliser le cache des résultats (False pour toujours recalculer les scores).
         
-        :return: Un DataFrame contenant les résultats triés par similarité.
+        :return: Un objet SearchResults contenant les résultats triés par similarité
+                 (to_dataframe permet d'obtenir un DataFrame).
+        """
+        start = time.perf_counter()
+        with self.metrics.time("query", "vectorize"):
+            parsed_query = Query.parse(query)
+
+            # Intégrer les mises à jour en attente, puis lire un état cohérent de l'index
+            with self.corpus.lock:
+                self.corpus.refresh()
+                generation = self.corpus.generation
+                state = self.scorer.prepare(self.corpus)
+                city_names = self.corpus.city_names
+                # Sans les positions des termes, les phrases et les opérateurs NEAR sont traités comme de simples mots
+                if not state.index.has_positions:
+                    parsed_query = Query(parsed_query.text)
+
+                # Transformer la requête en vecteur creux (termes, poids)
+                term_ids, query_weights = self.corpus.encode_query(parsed_query.text)
+                phrases, near = self.encode_operators(parsed_query)
+
+            # Les requêtes ayant les mêmes termes connus partagent la même entrée du cache
+            order = np.argsort(term_ids)
+            cache_key = (tuple(term_ids[order].tolist()), tuple(query_weights[order].tolist()), top_n, phrases, near)
+        results = self.cache.get(cache_key, generation) if self.cache is not None and use_cache else None
+
+        if results is None:
+            if parsed_query.has_operators:
+                top_ids, top_scores = self.top_n_with_operators(state, term_ids, query_weights, phrases, near, top_n)
+            else:
+                # Calculer les scores sur les seuls postings de la requête et sélectionner les meilleurs résultats
+                top_ids, top_scores = self.scorer.top_n(state, term_ids, query_weights, top_n)
+            with self.metrics.time("query", "render"):
+                results = SearchResults(SearchResult(city_names[i], score, self.corpus) for i, score in zip(top_ids, top_scores))
+            if self.cache is not None and use_cache:
+                self.cache.put(cache_key, generation, results)
+
+        self.metrics.increment("queries")
+        self.metrics.observe("query", "total", time.perf_counter() - start)
+        # Copie de la liste, pour que l'appelant ne modifie pas l'entrée du cache
+        return SearchResults(results)
+
+    def profile_search(self, query, top_n=5, sort_by="cumulative", limit=25):
+        """
+        Cette méthode exécute une recherche sous cProfile et tracemalloc, sans utiliser le cache,
+        pour analyser une requête lente. Le profilage ralentit fortement la recherche : il n'est activé que pour cet appel.
+
+        :param query: La requête sous forme de texte.
+        :param top_n: Le nombre de résultats à retourner (par défaut 5).
+        :param sort_by: Critère de tri des fonctions dans le rapport (voir pstats).
+        :param limit: Nombre de fonctions affichées dans le rapport.
+
+        :return: Les résultats de la recherche et un dictionnaire {"seconds", "peak_memory", "profile"}
+                 (durée, pic de mémoire allouée en octets et rapport de cProfile).
+        """
+        return profile_call(self.search, query, top_n, use_cache=False, sort_by=sort_by, limit=limit)
+
+    def complete(self, prefix, limit=10):
+        """
+        Cette méthode complète un mot en cours de saisie (voir Suggester.complete).
+
+        :param prefix: Le début du mot.
+        :param limit: Nombre maximum de complétions (par défaut 10).
+
+        :return: Les termes de l'index commençant par le préfixe, du plus fréquent au moins fréquent.
+        """
+        with self.metrics.time("query", "complete"):
+            return self.suggester.complete(prefix, limit)
+
+    def suggest(self, query):
+        """
+        Cette méthode propose une correction d'une requête dont des mots sont absents de l'index
+        (voir Suggester.suggest), par exemple "musuem" -> "museum".
+
+        :param query: La requête sous forme de texte.
+
+        :return: La requête corrigée, ou None si tous les mots de la requête figurent dans l'index.
+        """
+        with self.metrics.time("query", "suggest"):
+            return self.suggester.suggest(query)
+
+    def encode_operators(self, parsed_query):
+        """
+        Cette méthode encode les phrases et les opérateurs NEAR d'une requête analysée.
+        Elle doit être appelée en détenant le verrou du corpus.
+
+        :param parsed_query: Objet de la classe Query.
+        :return: Les phrases (tuples d'identifiants de termes, None si un mot est absent du corpus)
+                 et les opérateurs NEAR (tuples (terme, terme, distance)), sous forme de tuples utilisables dans le cache.
+        """
+        phrases = []
+        for phrase in parsed_query.phrases:
+            term_ids = self.corpus.encode_phrase(phrase)
+            phrases.append(tuple(term_ids) if term_ids is not None else None)
+
+        near = []
+        for left, right, distance in parsed_query.near:
+            left_ids, right_ids = self.corpus.encode_phrase(left), self.corpus.encode_phrase(right)
+            # Un mot absent du corpus ne favorise aucun document
+            if left_ids is not None and right_ids is not None:
+                near.append((left_ids[0], right_ids[0], distance))
+        return tuple(phrases), tuple(near)
+
+    def top_n_with_operators(self, state, term_ids, query_weights, phrases, near, top_n):
+        """
+        Cette méthode sélectionne les meilleurs documents d'une requête contenant des phrases ou des opérateurs NEAR.
+        Les phrases sont recherchées par intersection des postings et comparaison des positions, sans relire les textes.
+
+        :param state: Objet ScoringState renvoyé par prepare.
+        :param term_ids: Identifiants des termes de la requête.
+        :param query_weights: Poids des termes de la requête.
+        :param phrases: Phrases encodées par encode_operators.
+        :param near: Opérateurs NEAR encodés par encode_operators.
+        :param top_n: Le nombre de résultats à retourner.
+
+        :return: Les identifiants des meilleurs documents et leurs scores.
+        """
+        with self.metrics.time("query", "score"):
+            scores = self.scorer.score(state, term_ids, query_weights)
+
+        with self.metrics.time("query", "positions"):
+            # Bonus de proximité
+            for left, right, distance in near:
+                doc_ids = state.near_documents(left, right, distance)
+                scores[doc_ids] *= 1 + self.proximity_boost
+
+            # Seuls les documents non supprimés contenant toutes les phrases sont retenus
+            candidates = state.live_documents()
+            for phrase in phrases:
+                if phrase is None:
+                    candidates = candidates[:0]
+                    break
+                doc_ids = state.phrase_documents(phrase)
+                candidates = np.intersect1d(candidates, doc_ids, assume_unique=True)
+
+        with self.metrics.time("query", "select"):
+            selected = select_top_n(scores[candidates], top_n)
+        return candidates[selected], scores[candidates[selected]]
+
+    def search_batch(self, queries, top_n=5, chunk_size=None, max_chunk_cells=1 << 24):
+        """
+        Cette méthode recherche les documents les plus pertinents pour plusieurs requêtes à la fois.
+        Les requêtes sont encodées dans une matrice creuse et traitées par blocs : chaque bloc est évalué en un seul
+        produit de matrices, puis les meilleurs résultats de chaque requête sont sélectionnés sans boucle Python.
+
+        :param queries: Liste des requêtes sous forme de texte.
+        :param top_n: Le nombre de résultats à retourner par requête (par défaut 5).
+        :param chunk_size: Nombre de requêtes par bloc (par défaut, déduit de max_chunk_cells).
+        :param max_chunk_cells: Nombre maximum de scores (requêtes x documents) calculés par bloc.
+
+        :return: Une liste d'objets SearchResults, dans l'ordre des requêtes.
         """
-        # Transformer la requête en vecteur
-        query_vector = self.transform_query_to_vector(query)
+        # Les requêtes contenant des phrases ou des opérateurs NEAR sont traitées une par une avec search
+        parsed_queries = [Query.parse(query) for query in queries]
+        if any(parsed_query.has_operators for parsed_query in parsed_queries):
+            simple = [i for i, parsed_query in enumerate(parsed_queries) if not parsed_query.has_operators]
+            results = [None] * len(queries)
+            for i, simple_results in zip(simple, self.search_batch([queries[i] for i in simple], top_n, chunk_size, max_chunk_cells)):
+                results[i] = simple_results
+            for i, parsed_query in enumerate(parsed_queries):
+                if parsed_query.has_operators:
+                    results[i] = self.search(queries[i], top_n)
+            return results
 
-        # Initialiser une liste pour les résultats
-        similarities = []
+        start = time.perf_counter()
+        with self.corpus.lock:
+            self.corpus.refresh()
+            state = self.scorer.prepare(self.corpus)
+            city_names = self.corpus.city_names
+            encoded_queries = [self.corpus.encode_query(parsed_query.text) for parsed_query in parsed_queries]
 
-        # Calculer la similarité entre la requête et chaque document
-        for i, doc_vector in enumerate(self.corpus.tfidf_matrix):
-            similarity_score = self.calculate_cosine_similarity(query_vector, doc_vector)
-            similarities.append((self.corpus.city_names[i], similarity_score))
+        num_documents = max(state.num_documents, 1)
+        chunk_size = chunk_size or max(1, max_chunk_cells // num_documents)
 
-        # Trier les résultats par score de similarité (du plus élevé au plus faible)
-        sorted_results = sorted(similarities, key=lambda x: x[1], reverse=True)
+        results = []
+        for offset in range(0, len(encoded_queries), chunk_size):
+            chunk = encoded_queries[offset:offset + chunk_size]
 
-        # Sélectionner les meilleurs résultats
-        top_results = sorted_results[:top_n]
+            # Matrice creuse des requêtes du bloc : ligne, terme et poids de chaque élément non nul
+            query_rows = np.repeat(np.arange(len(chunk)), [len(term_ids) for term_ids, _ in chunk])
+            term_ids = np.concatenate([term_ids for term_ids, _ in chunk])
+            query_weights = np.concatenate([weights for _, weights in chunk])
 
-        # Créer un DataFrame avec les résultats
-        results_df = pd.DataFrame(top_results, columns=["City", "Similarity Score"])
+            top_ids, top_scores = self.scorer.top_n_batch(state, query_rows, term_ids, query_weights, len(chunk), top_n)
+            for row_ids, row_scores in zip(top_ids, top_scores):
+                results.append(SearchResults(SearchResult(city_names[i], score, self.corpus) for i, score in zip(row_ids, row_scores)))
 
-        return results_df
+        self.metrics.increment("batch_queries", len(queries))
+        self.metrics.observe("query", "batch", time.perf_counter() - start)
+        return results
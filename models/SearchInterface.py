@@ -1,22 +1,47 @@
 """
 Ce module contient la classe SearchInterface qui permet créer l'interface graphique Tkinter et effectuer une recherche.
 """
+import re
 import tkinter as tk
+from models.SearchWorker import SearchWorker
 
 class SearchInterface:
     """
-    Cette classe inclut 2 méthodes permettant de créer l'interface graphique Tkinter et permettre à l'utilisateur de réaliser une recherche.
+    Cette classe permet de créer l'interface graphique Tkinter et à l'utilisateur de réaliser une recherche.
+    Les recherches sont exécutées dans un thread dédié (SearchWorker) : la fenêtre reste réactive pendant une recherche.
+    Le mot en cours de saisie est complété à chaque frappe, et une correction est proposée lorsqu'aucun document
+    ne correspond à la requête ; les complétions et les corrections sont aussi calculées dans leur propre thread.
     """
+    # Délai (ms) sans frappe avant de lancer la recherche pendant la saisie
+    DEBOUNCE_DELAY = 300
+    # Intervalle (ms) de vérification des résultats du thread de recherche
+    POLL_INTERVAL = 50
+    # Nombre de résultats affichés par page et nombre de caractères affichés par ville
+    PAGE_SIZE = 10
+    SNIPPET_LENGTH = 300
+    # Nombre de complétions affichées sous la barre de recherche
+    COMPLETION_COUNT = 5
+    # Mot en cours de saisie, à la fin de la requête
+    LAST_WORD_PATTERN = re.compile(r"\w+$")
+
     def __init__(self, root, search_engine):
         """
         Cette méthode permet de créer l'interface graphique Tkinter
         """
         self.root = root
         self.search_engine = search_engine
+        self.worker = SearchWorker(search_engine)
+        self.completion_worker = SearchWorker(search_engine, "complete")
+        self.suggestion_worker = SearchWorker(search_engine, "suggest")
+        self.debounce_job = None
+        self.results = []
+        self.displayed = 0
+        self.last_query = ""
+        self.suggestion = None
 
         # Configuration de la fenêtre principale
         self.root.title("Moteur de recherche des villes")
-        self.root.geometry("600x700")
+        self.root.geometry("600x820")
 
         # Barre de recherche
         self.search_label = tk.Label(root, text="Recherchez une ville, un mot-clé ou une phrase :")
@@ -24,6 +49,18 @@ class SearchInterface:
 
         self.search_entry = tk.Entry(root, width=50)
         self.search_entry.pack(pady=5)
+        self.search_entry.bind("<Return>", lambda event: self.perform_search())
+        self.search_entry.bind("<KeyRelease>", self.on_key_release)
+
+        # Complétions du mot en cours de saisie
+        self.completion_box = tk.Listbox(root, height=self.COMPLETION_COUNT, width=50)
+        self.completion_box.pack(pady=5)
+        self.completion_box.bind("<<ListboxSelect>>", lambda event: self.apply_completion())
+
+        # Recherche pendant la saisie
+        self.live_search = tk.BooleanVar(value=False)
+        self.live_search_check = tk.Checkbutton(root, text="Rechercher pendant la saisie", variable=self.live_search)
+        self.live_search_check.pack(pady=5)
 
         # Nombre maximum de résultats
         self.max_results_label = tk.Label(root, text="Nombre maximum de résultats à afficher :")
@@ -41,13 +78,79 @@ class SearchInterface:
         self.result_label = tk.Label(root, text="Résultats :")
         self.result_label.pack(pady=10)
 
+        # Correction proposée lorsque la requête ne correspond à aucun document
+        self.suggestion_button = tk.Button(root, text="", relief="flat", fg="blue", command=self.apply_suggestion, state="disabled")
+        self.suggestion_button.pack(pady=5)
+
         self.result_box = tk.Text(root, height=25, width=70, wrap="word", state="disabled")
         self.result_box.pack(pady=5)
 
+        self.more_button = tk.Button(root, text="Afficher plus de résultats", command=self.show_next_page, state="disabled")
+        self.more_button.pack(pady=5)
+
+        # Vérification périodique des résultats et arrêt du thread à la fermeture
+        self.root.after(self.POLL_INTERVAL, self.poll_results)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+
+    def on_key_release(self, event):
+        """
+        Cette méthode met à jour les complétions, puis relance la recherche après un court délai sans frappe,
+        si la recherche pendant la saisie est activée.
+        """
+        if event.keysym == "Return":
+            return
+        self.update_completions()
+        if not self.live_search.get():
+            return
+        if self.debounce_job is not None:
+            self.root.after_cancel(self.debounce_job)
+        self.debounce_job = self.root.after(self.DEBOUNCE_DELAY, self.perform_search)
+
+    def update_completions(self):
+        """
+        Cette méthode demande les termes de l'index les plus fréquents commençant par le mot en cours de saisie ;
+        ils sont affichés par poll_results.
+        """
+        match = self.LAST_WORD_PATTERN.search(self.search_entry.get())
+        if match is None:
+            self.completion_worker.cancel()
+            self.completion_box.delete(0, tk.END)
+        else:
+            self.completion_worker.submit(match.group(), self.COMPLETION_COUNT)
+
+    def apply_completion(self):
+        """
+        Cette méthode remplace le mot en cours de saisie par la complétion sélectionnée.
+        """
+        selection = self.completion_box.curselection()
+        if not selection:
+            return
+        term = self.completion_box.get(selection[0])
+        query = self.LAST_WORD_PATTERN.sub("", self.search_entry.get()) + term + " "
+        self.search_entry.delete(0, tk.END)
+        self.search_entry.insert(0, query)
+        self.search_entry.focus_set()
+        self.completion_worker.cancel()
+        self.completion_box.delete(0, tk.END)
+        if self.live_search.get():
+            self.perform_search()
+
+    def apply_suggestion(self):
+        """
+        Cette méthode remplace la requête par la correction proposée et relance la recherche.
+        """
+        if self.suggestion is None:
+            return
+        self.search_entry.delete(0, tk.END)
+        self.search_entry.insert(0, self.suggestion)
+        self.perform_search()
+
     def perform_search(self):
         """
-        Cette méthode permet de réaliser une recherche en appelant la méthode search de la classe SearchEngine
+        Cette méthode soumet la recherche au thread de recherche ; les résultats sont affichés par poll_results.
         """
+        self.debounce_job = None
+
         # Récupération de la requête utilisateur
         query = self.search_entry.get()
 
@@ -57,20 +160,103 @@ class SearchInterface:
         except ValueError:
             max_results = 10  # Par défaut si l'utilisateur entre une valeur non valide
 
-        # Recherche avec le moteur de recherche
-        results_df = self.search_engine.search(query, top_n=max_results)
+        if not query.strip():
+            self.worker.cancel()
+            self.display_message("")
+            return
+
+        # Recherche avec le moteur de recherche, en arrière-plan (les recherches précédentes sont abandonnées)
+        self.last_query = query
+        self.worker.submit(query, max_results)
+        self.result_label.config(text="Résultats : recherche en cours...")
+
+    def poll_results(self):
+        """
+        Cette méthode récupère, dans le thread de l'interface, le résultat de la dernière recherche terminée,
+        ainsi que les dernières complétions et la dernière correction calculées.
+        """
+        item = self.worker.poll()
+        if item is not None:
+            request_id, results, error = item
+            if error is not None:
+                self.display_message(f"Erreur lors de la recherche : {error}")
+            else:
+                self.display_results(results)
+
+        item = self.completion_worker.poll()
+        if item is not None:
+            request_id, terms, error = item
+            self.completion_box.delete(0, tk.END)
+            for term in terms if error is None else []:
+                self.completion_box.insert(tk.END, term)
+
+        item = self.suggestion_worker.poll()
+        if item is not None:
+            request_id, suggestion, error = item
+            self.suggestion = suggestion if error is None else None
+            if self.suggestion is not None:
+                self.suggestion_button.config(text=f"Vouliez-vous dire : {self.suggestion} ?", state="normal")
+        self.root.after(self.POLL_INTERVAL, self.poll_results)
 
-        # Affichage des résultats
+    def display_message(self, message):
+        """
+        Cette méthode remplace le contenu de la zone de résultats par un message.
+
+        :param message: Le message à afficher.
+        """
+        self.results = []
+        self.displayed = 0
+        self.suggestion_worker.cancel()
+        self.suggestion = None
+        self.suggestion_button.config(text="", state="disabled")
+        self.result_label.config(text="Résultats :")
+        self.more_button.config(state="disabled")
         self.result_box.config(state="normal")
-        self.result_box.delete(1.0, tk.END)  # Effacer les anciens résultats
-
-        if not results_df.empty:
-            for _, row in results_df.iterrows():
-                city_name = row['City']
-                similarity_score = row['Similarity Score']
-                city_info = self.search_engine.corpus.get_city_activities(city_name)
-                self.result_box.insert(tk.END, f"Ville : {city_name}\nScore de similarité : {similarity_score:.4f}\nDonnées associées : {city_info}\n{'-'*40}\n")
-        else:
-            self.result_box.insert(tk.END, "Aucun résultat trouvé.")
+        self.result_box.delete(1.0, tk.END)
+        self.result_box.insert(tk.END, message)
+        self.result_box.config(state="disabled")
+
+    def display_results(self, results):
+        """
+        Cette méthode affiche la première page des résultats.
+
+        :param results: Les résultats de la recherche (SearchResults).
+        """
+        if not results or not any(result.score > 0 for result in results):
+            self.display_message("Aucun résultat trouvé.")
+            self.display_suggestion()
+            return
+        self.display_message("")
+        self.results = results
+        self.result_label.config(text=f"Résultats : {len(results)}")
+        self.show_next_page()
 
+    def display_suggestion(self):
+        """
+        Cette méthode demande une correction de la dernière requête, si certains de ses mots sont absents de l'index ;
+        elle est affichée par poll_results (la première correction construit l'index des suppressions).
+        """
+        self.suggestion_worker.submit(self.last_query)
+
+    def show_next_page(self):
+        """
+        Cette méthode ajoute la page suivante des résultats ; seul le début du texte de chaque ville est affiché.
+        """
+        page = self.results[self.displayed:self.displayed + self.PAGE_SIZE]
+        self.displayed += len(page)
+
+        self.result_box.config(state="normal")
+        for result in page:
+            self.result_box.insert(tk.END, f"Ville : {result.city}\nScore de similarité : {result.score:.4f}\nDonnées associées : {result.snippet(self.SNIPPET_LENGTH)}\n{'-'*40}\n")
         self.result_box.config(state="disabled")
+
+        self.more_button.config(state="normal" if self.displayed < len(self.results) else "disabled")
+
+    def close(self):
+        """
+        Cette méthode arrête le thread de recherche et ferme la fenêtre.
+        """
+        self.worker.close()
+        self.completion_worker.close()
+        self.suggestion_worker.close()
+        self.root.destroy()
@@ -0,0 +1,71 @@
+"""
+Ce module contient les classes SearchResult et SearchResults qui représentent les résultats d'une recherche.
+"""
+import pandas as pd
+
+class SearchResult:
+    """
+    Cette classe représente un résultat de recherche : la ville, son score et l'accès à son texte.
+    Le texte n'est lu dans le corpus qu'au moment où il est demandé.
+    """
+    __slots__ = ("city", "score", "corpus")
+
+    def __init__(self, city, score, corpus):
+        """
+        :param city: Nom de la ville.
+        :param score: Score de la ville pour la requête.
+        :param corpus: Objet de la classe Corpus contenant le texte de la ville.
+        """
+        self.city = city
+        self.score = float(score)
+        self.corpus = corpus
+
+    def __repr__(self):
+        return f"SearchResult(city={self.city!r}, score={self.score:.4f})"
+
+    def __eq__(self, other):
+        return isinstance(other, SearchResult) and (self.city, self.score) == (other.city, other.score)
+
+    @property
+    def text(self):
+        """
+        Texte complet de la section 'do' de la ville.
+        """
+        return self.corpus.get_city_activities(self.city)
+
+    def snippet(self, length=300):
+        """
+        Cette méthode renvoie le début du texte de la ville, pour un affichage rapide.
+
+        :param length: Nombre maximum de caractères.
+        :return: Le début du texte, suivi de "..." s'il a été tronqué.
+        """
+        text = self.text
+        return text if len(text) <= length else text[:length].rstrip() + "..."
+
+class SearchResults(list):
+    """
+    Cette classe représente la liste ordonnée des résultats d'une recherche.
+    Le DataFrame pandas n'est construit qu'à la demande, pour l'analyse.
+    """
+    @property
+    def cities(self):
+        """
+        Noms des villes, du meilleur au moins bon résultat.
+        """
+        return [result.city for result in self]
+
+    @property
+    def scores(self):
+        """
+        Scores des villes, du meilleur au moins bon résultat.
+        """
+        return [result.score for result in self]
+
+    def to_dataframe(self):
+        """
+        Cette méthode renvoie les résultats sous forme de DataFrame.
+
+        :return: Un DataFrame contenant les colonnes "City" et "Similarity Score".
+        """
+        return pd.DataFrame({"City": self.cities, "Similarity Score": self.scores}, columns=["City", "Similarity Score"])
@@ -0,0 +1,169 @@
+"""
+Ce module contient la classe SearchServer qui expose le moteur de recherche sur HTTP (JSON).
+"""
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    """
+    Cette classe traite les requêtes HTTP :
+    - GET /search?q=<requête>&top_n=<nombre>&snippet=<caractères> : résultats de la recherche
+    - GET /health : état du service
+    - GET /metrics : mesures du moteur de recherche au format texte de Prometheus
+    """
+    protocol_version = "HTTP/1.1"
+    # Un client trop lent à envoyer sa requête libère son thread au bout de 10 secondes
+    timeout = 10
+
+    def do_GET(self):
+        try:
+            self.route(urlparse(self.path))
+        except Exception as exception:
+            # Une erreur du moteur de recherche est renvoyée au client
+            self.send_json(500, {"error": f"Erreur interne : {exception}"})
+
+    def route(self, url):
+        """
+        Cette méthode traite une requête selon son chemin.
+
+        :param url: Adresse de la requête (urlparse).
+        """
+        if url.path == "/search":
+            self.handle_search(parse_qs(url.query))
+        elif url.path == "/health":
+            self.send_json(200, {"status": "ok", "documents": len(self.server.search_engine.corpus.city_names)})
+        elif url.path == "/metrics":
+            self.send_body(200, self.server.search_engine.metrics.to_prometheus().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self.send_json(404, {"error": f"Chemin inconnu : {url.path}"})
+
+    def handle_search(self, parameters):
+        """
+        Cette méthode exécute une recherche à partir des paramètres de l'URL.
+
+        :param parameters: Paramètres de l'URL (parse_qs).
+        """
+        query = parameters.get("q", [""])[0]
+        if not query.strip():
+            self.send_json(400, {"error": "Le paramètre q est obligatoire."})
+            return
+        try:
+            top_n = int(parameters.get("top_n", [self.server.default_top_n])[0])
+            snippet_length = int(parameters.get("snippet", [self.server.snippet_length])[0])
+        except ValueError:
+            self.send_json(400, {"error": "Les paramètres top_n et snippet doivent être des entiers."})
+            return
+        top_n = max(0, min(top_n, self.server.max_top_n))
+
+        search_engine = self.server.search_engine
+        results = search_engine.search(query, top_n=top_n)
+        with search_engine.metrics.time("query", "snippet"):
+            payload = {
+                "query": query,
+                "results": [
+                    {"city": result.city, "score": result.score, **({"snippet": result.snippet(snippet_length)} if snippet_length > 0 else {})}
+                    for result in results
+                ],
+            }
+        self.send_json(200, payload)
+
+    def send_json(self, status, payload):
+        """
+        Cette méthode envoie une réponse JSON.
+
+        :param status: Code de statut HTTP.
+        :param payload: Contenu de la réponse.
+        """
+        self.send_body(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+    def send_body(self, status, body, content_type):
+        """
+        Cette méthode envoie une réponse.
+
+        :param status: Code de statut HTTP.
+        :param body: Contenu de la réponse (octets).
+        :param content_type: Type du contenu.
+        """
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        # La connexion est fermée après chaque réponse : une connexion inactive (keep-alive) occuperait
+        # un thread du pool et une place jusqu'à l'expiration du délai
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Pas de journalisation par requête sur la sortie d'erreur
+        pass
+
+class SearchServer(HTTPServer):
+    """
+    Cette classe sert un moteur de recherche sur HTTP. L'index est chargé une seule fois et partagé en lecture
+    par un nombre borné de threads de traitement.
+    Le nombre de connexions acceptées en attente d'un thread est lui aussi borné : au-delà, le serveur répond
+    immédiatement 503, et les connexions suivantes restent dans la file d'attente du système (listen backlog).
+    """
+    # Réponse envoyée lorsque toutes les places sont occupées
+    UNAVAILABLE_BODY = json.dumps({"error": "Le service est surchargé, veuillez réessayer."}, ensure_ascii=False).encode("utf-8")
+
+    def __init__(self, search_engine, host="127.0.0.1", port=8000, workers=8, default_top_n=10, max_top_n=100, snippet_length=200,
+                 queue_size=64):
+        """
+        :param search_engine: Objet de la classe SearchEngine, déjà initialisé.
+        :param host: Adresse d'écoute.
+        :param port: Port d'écoute (0 pour un port libre choisi par le système).
+        :param workers: Nombre de threads traitant les connexions.
+        :param default_top_n: Nombre de résultats renvoyés par défaut.
+        :param max_top_n: Nombre maximum de résultats par requête.
+        :param snippet_length: Nombre de caractères du texte renvoyés par défaut pour chaque ville.
+        :param queue_size: Nombre de connexions acceptées pouvant attendre un thread libre.
+        """
+        super().__init__((host, port), SearchRequestHandler)
+        self.search_engine = search_engine
+        self.default_top_n = default_top_n
+        self.max_top_n = max_top_n
+        self.snippet_length = snippet_length
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search")
+        # Places disponibles : connexions en cours de traitement ou en attente d'un thread
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def process_request(self, request, client_address):
+        """
+        Cette méthode confie chaque connexion à un thread du pool plutôt que de la traiter dans la boucle principale,
+        ou la refuse (503) si toutes les places sont occupées.
+        """
+        if not self.slots.acquire(blocking=False):
+            self.reject_request(request)
+            return
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def reject_request(self, request):
+        """
+        Cette méthode répond 503 à une connexion refusée, puis la ferme.
+        """
+        self.search_engine.metrics.increment("rejected_requests")
+        try:
+            request.sendall(b"HTTP/1.1 503 Service Unavailable\r\nContent-Type: application/json; charset=utf-8\r\n"
+                            + f"Content-Length: {len(self.UNAVAILABLE_BODY)}\r\nConnection: close\r\n\r\n".encode("ascii")
+                            + self.UNAVAILABLE_BODY)
+        except OSError:
+            pass
+        finally:
+            self.shutdown_request(request)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False)
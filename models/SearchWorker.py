@@ -0,0 +1,100 @@
+"""
+Ce module contient la classe SearchWorker qui exécute les recherches (ou les complétions et corrections)
+dans un thread dédié.
+"""
+import queue
+import threading
+
+class SearchWorker:
+    """
+    Cette classe exécute les recherches en arrière-plan, pour ne pas bloquer l'interface graphique.
+    Seule la dernière requête soumise compte : les requêtes en attente plus anciennes ne sont pas exécutées
+    et les résultats d'une requête dépassée pendant son exécution sont ignorés.
+    Une autre méthode du moteur peut être exécutée de la même façon (par exemple complete ou suggest).
+    """
+    def __init__(self, search_engine, method="search"):
+        """
+        :param search_engine: Objet de la classe SearchEngine.
+        :param method: Nom de la méthode du moteur exécutée pour chaque requête (par défaut search).
+        """
+        self.search_engine = search_engine
+        self.function = getattr(search_engine, method)
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.latest_id = 0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name=f"{method}-worker", daemon=True)
+        self.thread.start()
+
+    def submit(self, query, *args):
+        """
+        Cette méthode soumet une requête ; elle rend obsolètes toutes les requêtes soumises auparavant.
+
+        :param query: La requête.
+        :param args: Autres arguments de la méthode exécutée (par exemple, le nombre de résultats à retourner).
+        :return: L'identifiant de la requête.
+        """
+        with self.lock:
+            self.latest_id += 1
+            request_id = self.latest_id
+        self.requests.put((request_id, query, args))
+        return request_id
+
+    def cancel(self):
+        """
+        Cette méthode rend obsolètes toutes les requêtes soumises.
+        """
+        with self.lock:
+            self.latest_id += 1
+
+    def is_stale(self, request_id):
+        with self.lock:
+            return request_id != self.latest_id
+
+    def run(self):
+        while True:
+            request = self.requests.get()
+            # Ne garder que la requête la plus récente
+            while request is not None:
+                try:
+                    request = self.requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    break
+            if request is None:
+                return
+
+            request_id, query, args = request
+            if self.is_stale(request_id):
+                continue
+            try:
+                results, error = self.function(query, *args), None
+            except Exception as exception:
+                results, error = None, exception
+            if not self.is_stale(request_id):
+                self.results.put((request_id, results, error))
+
+    def poll(self):
+        """
+        Cette méthode renvoie le résultat de la dernière requête s'il est disponible, sans attendre.
+        Elle est appelée depuis le thread de l'interface (par exemple avec root.after).
+
+        :return: Un tuple (identifiant, résultats, exception), ou None si aucun résultat récent n'est disponible.
+        """
+        latest = None
+        while True:
+            try:
+                item = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if not self.is_stale(item[0]):
+                latest = item
+        return latest
+
+    def close(self):
+        """
+        Cette méthode arrête le thread de recherche.
+        """
+        self.cancel()
+        self.requests.put(None)
@@ -0,0 +1,308 @@
+"""
+Ce module contient la classe ShardedSearchEngine qui répartit l'index sur plusieurs shards, construits et interrogés
+en parallèle dans des processus distincts.
+"""
+import heapq
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import numpy as np
+from models.Corpus import Corpus
+from models.LazyDocuments import LazyDocuments
+from models.Query import Query
+from models.QueryCache import QueryCache
+from models.Scorer import CosineScorer
+from models.SearchEngine import SearchEngine
+from models.SearchResult import SearchResult, SearchResults
+from models.Vocabulary import TermIndex, Vocabulary
+
+# Version du format des shards enregistrés (à incrémenter si leur organisation change)
+SHARDS_FORMAT_VERSION = 2
+
+# Shards chargés par chaque processus, indexés par répertoire
+loaded_shards = {}
+
+def build_shard(documents, analyzer, store_positions):
+    """
+    Cette fonction lit les textes d'un shard un par un, les découpe et construit son index inversé,
+    dans un processus du pool.
+
+    :param documents: Documents du shard ({ville: document}). Un objet LazyDocuments est relu sur le disque
+                      par le processus lui-même.
+    :param analyzer: Analyseur du corpus.
+    :param store_positions: Conserver la position des mots dans l'index.
+    :return: Les villes indexées du shard, son vocabulaire trié et son index.
+    """
+    shard = Corpus(analyzer, store_positions)
+    shard.data = documents
+    shard.calculate_tf(shard.iter_texts())
+    return shard.city_names, shard.vocabulary, shard.index
+
+def load_shard(directory, analyzer, store_positions, compact, scorer):
+    """
+    Cette fonction renvoie le moteur de recherche d'un shard, chargé (par projection mémoire) lors du premier appel
+    dans le processus courant.
+
+    :param directory: Répertoire du shard.
+    :param analyzer: Analyseur du corpus.
+    :param store_positions: Conserver la position des mots dans l'index.
+    :param compact: Index compressé.
+    :param scorer: Fonction de score.
+    :return: Un objet SearchEngine.
+    """
+    search_engine = loaded_shards.get(directory)
+    if search_engine is None:
+        shard = Corpus(analyzer, store_positions, compact=compact)
+        if not shard.load_index(directory):
+            raise ValueError(f"Le shard {directory} est invalide.")
+        search_engine = loaded_shards[directory] = SearchEngine(shard, scorer=scorer, cache_size=0)
+    return search_engine
+
+def search_shard(directory, analyzer, store_positions, compact, scorer, queries, top_n):
+    """
+    Cette fonction recherche plusieurs requêtes dans un shard, dans un processus du pool.
+
+    :param directory: Répertoire du shard.
+    :param analyzer: Analyseur du corpus.
+    :param store_positions: Conserver la position des mots dans l'index.
+    :param compact: Index compressé.
+    :param scorer: Fonction de score.
+    :param queries: Liste des requêtes sous forme de texte.
+    :param top_n: Le nombre de résultats à retourner par requête.
+    :return: Pour chaque requête, la liste des tuples (ville, score) des meilleurs documents du shard.
+    """
+    search_engine = load_shard(directory, analyzer, store_positions, compact, scorer)
+    if len(queries) == 1:
+        all_results = [search_engine.search(queries[0], top_n)]
+    else:
+        all_results = search_engine.search_batch(queries, top_n)
+    return [[(result.city, float(result.score)) for result in results] for results in all_results]
+
+class ShardedSearchEngine:
+    """
+    Cette classe répartit les documents du corpus en plusieurs shards (parts contiguës du corpus), dont les index
+    sont construits en parallèle dans un pool de processus puis enregistrés sur le disque. Une recherche est envoyée
+    à tous les shards (chaque processus charge les shards par projection mémoire) et leurs meilleurs résultats
+    sont fusionnés.
+    Les shards partagent le vocabulaire et les statistiques (IDF, longueur moyenne) de la collection entière :
+    les scores sont identiques à ceux de SearchEngine. Les shards ne peuvent pas être modifiés après leur construction.
+    """
+    def __init__(self, corpus, num_shards=None, workers=None, index_path=None, scorer=None, cache_size=1024, cache_ttl=None):
+        """
+        :param corpus: Objet de la classe Corpus, dont les données sont chargées.
+        :param num_shards: Nombre de shards (par défaut, le nombre de processeurs).
+        :param workers: Nombre de processus (par défaut, le nombre de shards).
+        :param index_path: Répertoire des shards (par défaut, un répertoire temporaire supprimé par close).
+                           Des shards déjà enregistrés et à jour y sont rechargés.
+        :param scorer: Fonction de score, par exemple BM25Scorer() (par défaut, la similarité cosinus).
+        :param cache_size: Nombre de requêtes conservées dans le cache des résultats (0 pour le désactiver).
+        :param cache_ttl: Durée de vie des résultats en cache, en secondes (optionnel).
+        """
+        self.corpus = corpus
+        self.metrics = corpus.metrics
+        self.scorer = scorer or CosineScorer()
+        self.num_shards = max(1, num_shards or os.cpu_count() or 1)
+        self.cache = QueryCache(cache_size, cache_ttl) if cache_size else None
+        self.temporary = index_path is None
+        self.index_path = tempfile.mkdtemp(prefix="shards-") if index_path is None else index_path
+        self.executor = ProcessPoolExecutor(max_workers=workers or self.num_shards)
+
+        fingerprint = None
+        if corpus.data_file_path is not None and not self.temporary:
+            fingerprint = corpus.fingerprint(corpus.data_file_path)
+        if not self.load_shards(fingerprint):
+            self.build_shards(fingerprint)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def shard_directory(self, shard_id):
+        return os.path.join(self.index_path, f"shard_{shard_id:03d}")
+
+    def load_shards(self, fingerprint):
+        """
+        Cette méthode vérifie si des shards à jour sont enregistrés dans index_path.
+
+        :param fingerprint: Empreinte des données sources (None si elle est inconnue).
+        :return: True si les shards peuvent être utilisés.
+        """
+        meta_path = os.path.join(self.index_path, "shards.json")
+        if fingerprint is None or not os.path.exists(meta_path):
+            return False
+        with open(meta_path, 'r', encoding='utf-8') as file:
+            meta = json.load(file)
+        if (meta.get("format_version") != SHARDS_FORMAT_VERSION or meta.get("fingerprint") != fingerprint
+                or meta.get("num_shards") != self.num_shards or meta.get("analyzer") != self.corpus.analyzer.signature()
+                or meta.get("compact") != self.corpus.compact):
+            return False
+        self.corpus.city_names = meta["city_names"]
+        self.corpus.city_index = {city: i for i, city in enumerate(self.corpus.city_names)}
+        return True
+
+    def build_shards(self, fingerprint):
+        """
+        Cette méthode construit les shards : les textes sont lus, découpés et indexés en parallèle, puis les index
+        sont renumérotés dans le vocabulaire commun et pondérés avec les statistiques de la collection entière.
+        Chaque processus reçoit les villes de son shard : les textes chargés avec Corpus.load_streaming sont relus
+        sur le disque par le processus, sans être chargés par le processus principal.
+
+        :param fingerprint: Empreinte des données sources, enregistrée avec les shards.
+        """
+        corpus = self.corpus
+        cities = list(corpus.data)
+        bounds = np.linspace(0, len(cities), self.num_shards + 1).astype(int)
+
+        with self.metrics.time("build", "shards"):
+            futures = [self.executor.submit(build_shard, self.shard_documents(cities[start:end]), corpus.analyzer, corpus.store_positions)
+                       for start, end in zip(bounds[:-1], bounds[1:])]
+            built = [future.result() for future in futures]
+        del cities
+
+        # Villes indexées (celles qui ont une section 'do'), dans l'ordre des shards
+        shard_bounds = np.cumsum([0] + [len(shard_cities) for shard_cities, _, _ in built])
+        corpus.city_names = [city for shard_cities, _, _ in built for city in shard_cities]
+        corpus.city_index = {city: i for i, city in enumerate(corpus.city_names)}
+
+        # Vocabulaire commun, trié comme celui d'un index unique
+        words = sorted(set().union(*(shard_vocabulary for _, shard_vocabulary, _ in built)))
+        term_index = {word: i for i, word in enumerate(words)}
+        vocabulary = Vocabulary.from_words(words)
+        del words
+
+        shards = []
+        for shard_id, (shard_cities, shard_vocabulary, index) in enumerate(built):
+            shard = Corpus(corpus.analyzer, corpus.store_positions, corpus.metrics, corpus.compact)
+            shard.vocabulary = vocabulary
+            shard.term_index = TermIndex(vocabulary)
+            term_mapping = np.fromiter(map(term_index.__getitem__, shard_vocabulary), dtype=np.int64, count=len(shard_vocabulary))
+            shard.index = index.expand_vocabulary(term_mapping, len(vocabulary))
+            shard.city_names = corpus.city_names[shard_bounds[shard_id]:shard_bounds[shard_id + 1]]
+            shard.city_index = {city: i for i, city in enumerate(shard.city_names)}
+            shard.update_tf_values()
+            shards.append(shard)
+        del built, term_index
+
+        # Statistiques de la collection entière, communes à tous les shards
+        collection = {
+            "num_documents": len(corpus.city_names),
+            "doc_frequency": np.sum([shard.index.document_frequencies() for shard in shards], axis=0, dtype=np.int64),
+            "average_length": np.concatenate([shard.doc_lengths for shard in shards]).mean() if corpus.city_names else 1.0,
+        }
+        for shard_id, shard in enumerate(shards):
+            shard.collection = collection
+            shard.calculate_idf()
+            shard.calculate_tfidf()
+            shard.save_index(self.shard_directory(shard_id), fingerprint)
+
+        meta = {
+            "format_version": SHARDS_FORMAT_VERSION,
+            "fingerprint": fingerprint,
+            "analyzer": corpus.analyzer.signature(),
+            "num_shards": self.num_shards,
+            "compact": self.corpus.compact,
+            "city_names": corpus.city_names,
+        }
+        with open(os.path.join(self.index_path, "shards.json"), 'w', encoding='utf-8') as file:
+            json.dump(meta, file)
+
+    def shard_documents(self, cities):
+        """
+        Cette méthode renvoie les documents d'une partie des villes, transmis au processus qui construit le shard.
+
+        :param cities: Noms des villes du shard.
+        :return: Un objet LazyDocuments relisant le fichier des données, ou un dictionnaire si les données sont en mémoire.
+        """
+        data = self.corpus.data
+        if isinstance(data, LazyDocuments):
+            return data.subset(cities)
+        return {city: data[city] for city in cities}
+
+    def cache_key(self, query, top_n):
+        """
+        Cette méthode renvoie la clé d'une requête dans le cache : ses termes analysés, comme dans SearchEngine.search,
+        pour que les requêtes ne différant que par la casse ou les espaces partagent la même entrée.
+
+        :param query: La requête sous forme de texte.
+        :param top_n: Le nombre de résultats à retourner.
+        :return: Un tuple utilisable comme clé.
+        """
+        parsed_query = Query.parse(query)
+        tokenize = self.corpus.tokenize
+        terms = tuple(sorted(Counter(tokenize(parsed_query.text)).items()))
+        phrases = tuple(tuple(tokenize(phrase)) for phrase in parsed_query.phrases)
+        near = tuple((tuple(tokenize(left)), tuple(tokenize(right)), distance) for left, right, distance in parsed_query.near)
+        return terms, phrases, near, top_n
+
+    def scatter(self, queries, top_n):
+        """
+        Cette méthode envoie des requêtes à tous les shards et fusionne leurs meilleurs résultats.
+        Les résultats de chaque shard sont triés par score décroissant : ils sont fusionnés comme des tas,
+        à score égal dans l'ordre des shards, soit l'ordre des documents dans le corpus.
+
+        :param queries: Liste des requêtes sous forme de texte.
+        :param top_n: Le nombre de résultats à retourner par requête.
+        :return: Une liste d'objets SearchResults, dans l'ordre des requêtes.
+        """
+        futures = [
+            self.executor.submit(search_shard, self.shard_directory(shard_id), self.corpus.analyzer,
+                                 self.corpus.store_positions, self.corpus.compact, self.scorer, queries, top_n)
+            for shard_id in range(self.num_shards)
+        ]
+        shard_results = [future.result() for future in futures]
+
+        results = []
+        for i in range(len(queries)):
+            merged = heapq.merge(*(shard[i] for shard in shard_results), key=lambda result: -result[1])
+            results.append(SearchResults(SearchResult(city, score, self.corpus) for city, score in islice(merged, top_n)))
+        return results
+
+    def search(self, query, top_n=5):
+        """
+        Cette méthode recherche les documents les plus pertinents dans tous les shards (voir SearchEngine.search).
+
+        :param query: La requête sous forme de texte.
+        :param top_n: Le nombre de résultats à retourner (par défaut 5).
+        :return: Un objet SearchResults contenant les résultats triés par similarité.
+        """
+        start = time.perf_counter()
+        # Les shards n'étant jamais modifiés, la version de l'index est constante
+        cache_key = self.cache_key(query, top_n) if self.cache is not None else None
+        results = self.cache.get(cache_key, 0) if self.cache is not None else None
+        if results is None:
+            results = self.scatter([query], top_n)[0]
+            if self.cache is not None:
+                self.cache.put(cache_key, 0, results)
+
+        self.metrics.increment("queries")
+        self.metrics.observe("query", "total", time.perf_counter() - start)
+        return SearchResults(results)
+
+    def search_batch(self, queries, top_n=5):
+        """
+        Cette méthode recherche plusieurs requêtes : chaque shard reçoit toutes les requêtes en un seul message.
+
+        :param queries: Liste des requêtes sous forme de texte.
+        :param top_n: Le nombre de résultats à retourner par requête (par défaut 5).
+        :return: Une liste d'objets SearchResults, dans l'ordre des requêtes.
+        """
+        start = time.perf_counter()
+        results = self.scatter(list(queries), top_n) if len(queries) else []
+        self.metrics.increment("batch_queries", len(queries))
+        self.metrics.observe("query", "batch", time.perf_counter() - start)
+        return results
+
+    def close(self):
+        """
+        Cette méthode arrête les processus et supprime les shards enregistrés dans un répertoire temporaire.
+        """
+        self.executor.shutdown()
+        if self.temporary:
+            shutil.rmtree(self.index_path, ignore_errors=True)
@@ -0,0 +1,283 @@
+"""
+Ce module contient la classe Suggester qui complète les mots en cours de saisie et corrige les fautes de frappe
+des requêtes à partir du vocabulaire de l'index.
+"""
+import bisect
+import re
+import threading
+import numpy as np
+from models.InvertedIndex import concatenate_ranges
+from models.Scorer import select_top_n
+from models.Vocabulary import Vocabulary
+
+def deletes(word, max_distance):
+    """
+    Cette fonction renvoie les variantes d'un mot obtenues en supprimant au plus max_distance caractères.
+
+    :param word: Le mot.
+    :param max_distance: Nombre maximum de caractères supprimés.
+    :return: L'ensemble des variantes, y compris le mot lui-même.
+    """
+    variants = frontier = {word}
+    for _ in range(max_distance):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants = variants | frontier
+    return variants
+
+def edit_distance(source, target, max_distance):
+    """
+    Cette fonction calcule la distance d'édition entre deux mots (insertion, suppression, substitution et
+    transposition de deux caractères voisins), en s'arrêtant dès qu'elle dépasse max_distance.
+    Le début et la fin communs sont ignorés, et seules les cases à au plus max_distance de la diagonale sont calculées.
+
+    :param source: Le premier mot.
+    :param target: Le second mot.
+    :param max_distance: Distance maximale recherchée.
+    :return: La distance, ou max_distance + 1 si elle est supérieure à max_distance.
+    """
+    if abs(len(source) - len(target)) > max_distance:
+        return max_distance + 1
+
+    # Ignorer le début et la fin communs
+    start = 0
+    while start < len(source) and start < len(target) and source[start] == target[start]:
+        start += 1
+    end = 0
+    while end < len(source) - start and end < len(target) - start and source[-1 - end] == target[-1 - end]:
+        end += 1
+    source, target = source[start:len(source) - end], target[start:len(target) - end]
+    if not source or not target:
+        return min(max(len(source), len(target)), max_distance + 1)
+
+    # Programmation dynamique limitée à la bande |i - j| <= max_distance
+    outside = max_distance + 1
+    before_previous, previous = None, [j if j <= max_distance else outside for j in range(len(target) + 1)]
+    for i in range(1, len(source) + 1):
+        current = [i if i <= max_distance else outside] + [outside] * len(target)
+        row_minimum = current[0]
+        for j in range(max(1, i - max_distance), min(len(target), i + max_distance) + 1):
+            value = previous[j - 1] + (source[i - 1] != target[j - 1])
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if i > 1 and j > 1 and source[i - 1] == target[j - 2] and source[i - 2] == target[j - 1] \
+                    and before_previous[j - 2] + 1 < value:
+                value = before_previous[j - 2] + 1
+            current[j] = value
+            if value < row_minimum:
+                row_minimum = value
+        if row_minimum > max_distance:
+            return outside
+        before_previous, previous = previous, current
+    return min(previous[-1], outside)
+
+class SuggestionState:
+    """
+    Cette classe regroupe le vocabulaire et les fréquences des termes d'une version donnée de l'index.
+    L'index des suppressions, coûteux à construire, n'est calculé que lors de la première correction.
+    """
+    __slots__ = ("generation", "vocabulary", "doc_frequency", "sorted_size", "delete_hashes", "delete_term_ids")
+
+    def __init__(self, generation, vocabulary, doc_frequency, sorted_size=None):
+        """
+        :param generation: Numéro de version de l'index (Corpus.generation).
+        :param vocabulary: Termes (liste, ou objet Vocabulary si l'index est compressé).
+        :param doc_frequency: Nombre de documents contenant chaque terme.
+        :param sorted_size: Nombre de termes triés en début de vocabulaire (par défaut, tous) : les termes suivants
+                            ont été ajoutés depuis la dernière fusion de l'index.
+        """
+        self.generation = generation
+        self.vocabulary = vocabulary
+        self.doc_frequency = doc_frequency
+        self.sorted_size = len(doc_frequency) if sorted_size is None else sorted_size
+        self.delete_hashes = None
+        self.delete_term_ids = None
+
+    def find(self, term):
+        """
+        Cette méthode renvoie l'identifiant d'un terme présent dans au moins un document, ou -1.
+        """
+        if isinstance(self.vocabulary, Vocabulary):
+            term_id = self.vocabulary.find(term)
+        else:
+            term_id = bisect.bisect_left(self.vocabulary, term, hi=self.sorted_size)
+            if term_id == self.sorted_size or self.vocabulary[term_id] != term:
+                # Termes ajoutés depuis la dernière fusion, non triés
+                term_id = next((i for i in range(self.sorted_size, len(self.doc_frequency)) if self.vocabulary[i] == term), -1)
+        return term_id if term_id >= 0 and self.doc_frequency[term_id] > 0 else -1
+
+    def prefix_range(self, prefix):
+        """
+        Cette méthode recherche, par recherche dichotomique, les termes triés commençant par un préfixe.
+        Les termes ajoutés depuis la dernière fusion de l'index sont ignorés (voir prefix_ids).
+
+        :param prefix: Le préfixe.
+        :return: Les identifiants (début, fin) de l'intervalle des termes commençant par le préfixe.
+        """
+        if isinstance(self.vocabulary, Vocabulary):
+            return self.vocabulary.prefix_range(prefix)
+        size = self.sorted_size
+        start = bisect.bisect_left(self.vocabulary, prefix, hi=size)
+        # Le plus grand caractère Unicode suit tous les termes commençant par le préfixe
+        end = bisect.bisect_left(self.vocabulary, prefix + "\U0010ffff", lo=start, hi=size)
+        return start, end
+
+    def prefix_ids(self, prefix):
+        """
+        Cette méthode renvoie les identifiants des termes commençant par un préfixe, y compris ceux ajoutés
+        depuis la dernière fusion de l'index, dans l'ordre alphabétique.
+
+        :param prefix: Le préfixe.
+        :return: Vecteur des identifiants des termes.
+        """
+        start, end = self.prefix_range(prefix)
+        term_ids = list(range(start, end))
+        added = [i for i in range(self.sorted_size, len(self.doc_frequency)) if self.vocabulary[i].startswith(prefix)]
+        if added:
+            term_ids = sorted(term_ids + added, key=self.vocabulary.__getitem__)
+        return np.array(term_ids, dtype=np.int64)
+
+class Suggester:
+    """
+    Cette classe propose des complétions et des corrections à partir du vocabulaire de l'index, classées par
+    nombre de documents contenant chaque terme :
+    - complétion : les termes commençant par un préfixe sont consécutifs dans le vocabulaire trié,
+      et sont retrouvés par recherche dichotomique ;
+    - correction (méthode SymSpell) : chaque terme est indexé par les variantes obtenues en supprimant jusqu'à
+      max_distance caractères de son début. Les termes partageant une variante avec le mot saisi sont les seuls
+      candidats dont la distance d'édition est calculée.
+    Les données sont recalculées lorsque l'index du corpus change.
+    """
+    # Mots de la requête (les opérateurs NEAR sont conservés tels quels)
+    WORD_PATTERN = re.compile(r"\w+")
+
+    def __init__(self, corpus, max_distance=2, prefix_length=7):
+        """
+        :param corpus: Objet de la classe Corpus.
+        :param max_distance: Distance d'édition maximale d'une correction.
+        :param prefix_length: Nombre de caractères du début de chaque terme indexés pour la correction
+                              (limite la taille de l'index des suppressions).
+        """
+        self.corpus = corpus
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.state = None
+        self.lock = threading.Lock()
+
+    def prepare(self):
+        """
+        Cette méthode renvoie le vocabulaire et les fréquences de la version courante de l'index.
+
+        :return: Un objet SuggestionState.
+        """
+        corpus = self.corpus
+        with corpus.lock:
+            corpus.refresh()
+            state = self.state
+            if state is None or state.generation != corpus.generation:
+                if corpus.index is None:
+                    state = SuggestionState(corpus.generation, [], np.zeros(0, dtype=np.int64))
+                elif corpus.pending is not None:
+                    # Fréquences de l'index augmentées de celles des documents en attente
+                    state = SuggestionState(corpus.generation, corpus.vocabulary, corpus.pending.collection["doc_frequency"],
+                                            corpus.index.vocabulary_size)
+                else:
+                    state = SuggestionState(corpus.generation, corpus.vocabulary, corpus.index.document_frequencies())
+                self.state = state
+        return state
+
+    def build_deletion_index(self, state):
+        """
+        Cette méthode construit l'index des suppressions d'une version du vocabulaire, s'il n'existe pas encore.
+        Les variantes sont représentées par leur empreinte (hash) triée : deux variantes de même empreinte
+        produisent au pire un candidat de trop, écarté par le calcul de la distance.
+
+        :param state: Objet SuggestionState.
+        """
+        with self.lock:
+            if state.delete_hashes is not None:
+                return
+            hashes, term_ids = [], []
+            for term_id in np.flatnonzero(state.doc_frequency > 0).tolist():
+                variants = deletes(state.vocabulary[term_id][:self.prefix_length], self.max_distance)
+                hashes.extend(map(hash, variants))
+                term_ids.extend([term_id] * len(variants))
+            hashes = np.array(hashes, dtype=np.int64)
+            order = np.argsort(hashes, kind="stable")
+            state.delete_term_ids = np.array(term_ids, dtype=np.int32)[order]
+            state.delete_hashes = hashes[order]
+
+    def complete(self, prefix, limit=10):
+        """
+        Cette méthode complète un mot en cours de saisie.
+
+        :param prefix: Le début du mot (il est normalisé comme les textes : minuscules, sans accents).
+        :param limit: Nombre maximum de complétions.
+        :return: Les termes commençant par le préfixe, du plus fréquent au moins fréquent.
+        """
+        state = self.prepare()
+        prefix = self.corpus.analyzer.normalize(prefix.strip())
+        if not prefix:
+            return []
+        term_ids = state.prefix_ids(prefix)
+        doc_frequency = state.doc_frequency[term_ids]
+        selected = select_top_n(doc_frequency, limit)
+        return [state.vocabulary[term_ids[i]] for i in selected.tolist() if doc_frequency[i] > 0]
+
+    def correct(self, word, limit=5):
+        """
+        Cette méthode recherche les termes les plus proches d'un mot mal orthographié.
+
+        :param word: Le mot (il est normalisé comme les textes).
+        :param limit: Nombre maximum de corrections.
+        :return: Les termes à au plus max_distance modifications du mot, classés par distance
+                 puis du plus fréquent au moins fréquent (le mot lui-même s'il figure dans l'index).
+                 La distance est aussi limitée par la longueur du mot : aucune modification jusqu'à 2 caractères,
+                 une seule jusqu'à 5 caractères (les mots courts ont trop de voisins pour être corrigés sûrement).
+        """
+        state = self.prepare()
+        word = self.corpus.analyzer.normalize(word.strip())
+        if not word:
+            return []
+        self.build_deletion_index(state)
+        max_distance = min(self.max_distance, len(word) // 3)
+
+        # Candidats partageant une variante avec le mot
+        hashes = np.fromiter(map(hash, deletes(word[:self.prefix_length], max_distance)), dtype=np.int64)
+        starts = np.searchsorted(state.delete_hashes, hashes, side="left")
+        ends = np.searchsorted(state.delete_hashes, hashes, side="right")
+        candidates = np.unique(state.delete_term_ids[concatenate_ranges(starts, ends - starts)])
+
+        ranked = []
+        for term_id in candidates.tolist():
+            term = state.vocabulary[term_id]
+            distance = edit_distance(word, term, max_distance)
+            if distance <= max_distance:
+                ranked.append((distance, -int(state.doc_frequency[term_id]), term))
+        ranked.sort()
+        return [term for _, _, term in ranked[:limit]]
+
+    def suggest(self, query):
+        """
+        Cette méthode corrige une requête : chaque mot absent de l'index est remplacé par sa meilleure correction.
+
+        :param query: La requête sous forme de texte.
+        :return: La requête corrigée, ou None si aucun mot n'a été corrigé.
+        """
+        state = self.prepare()
+        analyzer = self.corpus.analyzer
+
+        def replace(match):
+            word = match.group()
+            normalized = analyzer.normalize(word)
+            if word == "NEAR" or not analyzer.token_pattern.fullmatch(normalized):
+                return word
+            term = analyzer.analyze_token(normalized)
+            if term is None or state.find(term) >= 0:
+                return word
+            corrections = self.correct(normalized, limit=1)
+            return corrections[0] if corrections else word
+
+        corrected = self.WORD_PATTERN.sub(replace, query)
+        return corrected if corrected != query else None
@@ -0,0 +1,148 @@
+"""
+Ce module contient la classe Vocabulary qui stocke les termes triés de l'index dans un bloc d'octets contigu.
+"""
+from collections.abc import Mapping, Sequence
+import numpy as np
+
+class Vocabulary(Sequence):
+    """
+    Cette classe se comporte comme la liste triée des termes de l'index, mais les termes sont stockés dans un seul
+    bloc d'octets (UTF-8) accompagné de la position de début de chaque terme, au lieu d'un objet str par terme.
+    Un terme est décodé lorsqu'il est lu, et son identifiant est retrouvé par recherche dichotomique
+    (l'ordre des octets UTF-8 est celui des chaînes Python).
+    """
+    def __init__(self, data, offsets):
+        """
+        :param data: Termes encodés en UTF-8 et concaténés (tableau d'octets).
+        :param offsets: Position de début de chaque terme dans data (taille nombre de termes + 1).
+        """
+        # Le tableau n'est pas recopié : un vocabulaire projeté en mémoire reste partagé entre les processus
+        self.data = np.frombuffer(data, dtype=np.uint8) if isinstance(data, bytes) else np.asanyarray(data, dtype=np.uint8)
+        self.offsets = offsets
+
+    @classmethod
+    def from_words(cls, words):
+        """
+        Cette méthode construit le vocabulaire à partir d'une liste de termes triés.
+
+        :param words: Termes triés par ordre croissant, sans doublon.
+        :return: Un objet Vocabulary.
+        """
+        encoded = [word.encode("utf-8") for word in words]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+        return cls(b"".join(encoded), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def encoded(self, term_id):
+        return self.data[self.offsets[term_id]:self.offsets[term_id + 1]].tobytes()
+
+    def __getitem__(self, term_id):
+        if isinstance(term_id, slice):
+            return [self[i] for i in range(*term_id.indices(len(self)))]
+        term_id = int(term_id)
+        if term_id < 0:
+            term_id += len(self)
+        if not 0 <= term_id < len(self):
+            raise IndexError("Identifiant de terme hors du vocabulaire.")
+        return self.encoded(term_id).decode("utf-8")
+
+    def __iter__(self):
+        data, offsets = self.data, np.asarray(self.offsets).tolist()
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            yield data[start:end].tobytes().decode("utf-8")
+
+    def __eq__(self, other):
+        if isinstance(other, Vocabulary):
+            return np.array_equal(self.data, other.data) and np.array_equal(self.offsets, other.offsets)
+        if isinstance(other, Sequence) and not isinstance(other, str):
+            return len(self) == len(other) and all(word == other_word for word, other_word in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Vocabulary({len(self)} termes)"
+
+    def find(self, word):
+        """
+        Cette méthode recherche un terme par recherche dichotomique.
+
+        :param word: Le terme.
+        :return: L'identifiant du terme, ou -1 s'il est absent.
+        """
+        key = word.encode("utf-8")
+        term_id = self.bisect(key)
+        return term_id if term_id < len(self) and self.encoded(term_id) == key else -1
+
+    def prefix_range(self, prefix):
+        """
+        Cette méthode recherche, par recherche dichotomique, les termes commençant par un préfixe :
+        ils sont consécutifs dans le vocabulaire trié.
+
+        :param prefix: Le préfixe.
+        :return: Les identifiants (début, fin) de l'intervalle des termes commençant par le préfixe.
+        """
+        key = prefix.encode("utf-8")
+        start = self.bisect(key)
+        # L'octet 0xFF n'apparaît dans aucun texte UTF-8 : key + 0xFF suit tous les termes commençant par key
+        end = self.bisect(key + b"\xff", lo=start)
+        return start, end
+
+    def bisect(self, key, lo=0):
+        """
+        Cette méthode recherche par dichotomie la position d'un terme encodé dans le vocabulaire trié
+        (équivalent de bisect.bisect_left, dont le paramètre key n'existe qu'à partir de Python 3.10).
+
+        :param key: Le terme encodé en UTF-8.
+        :param lo: Identifiant à partir duquel chercher.
+        :return: L'identifiant du premier terme supérieur ou égal à key.
+        """
+        hi = len(self)
+        while lo < hi:
+            middle = (lo + hi) // 2
+            if self.encoded(middle) < key:
+                lo = middle + 1
+            else:
+                hi = middle
+        return lo
+
+    def index(self, word, *args):
+        term_id = self.find(word) if isinstance(word, str) else -1
+        if term_id < 0:
+            raise ValueError(f"{word!r} n'est pas dans le vocabulaire.")
+        return term_id
+
+    def __contains__(self, word):
+        return isinstance(word, str) and self.find(word) >= 0
+
+    def tolist(self):
+        return list(self)
+
+class TermIndex(Mapping):
+    """
+    Cette classe associe à chaque terme d'un objet Vocabulary son identifiant (comme le dictionnaire {terme: identifiant}),
+    sans stocker de dictionnaire.
+    """
+    def __init__(self, vocabulary):
+        """
+        :param vocabulary: Objet Vocabulary.
+        """
+        self.vocabulary = vocabulary
+
+    def __getitem__(self, word):
+        term_id = self.vocabulary.find(word) if isinstance(word, str) else -1
+        if term_id < 0:
+            raise KeyError(word)
+        return term_id
+
+    def __contains__(self, word):
+        return word in self.vocabulary
+
+    def __iter__(self):
+        return iter(self.vocabulary)
+
+    def __len__(self):
+        return len(self.vocabulary)
@@ -0,0 +1,38 @@
+from models.Corpus import Corpus
+from models.SearchEngine import SearchEngine
+from models.SearchServer import SearchServer
+from models.ShardedSearchEngine import ShardedSearchEngine
+import argparse
+
+# Lancement du service de recherche HTTP (sans interface graphique)
+def main():
+    parser = argparse.ArgumentParser(description="Service HTTP du moteur de recherche des villes")
+    parser.add_argument("--host", default="127.0.0.1", help="Adresse d'écoute")
+    parser.add_argument("--port", type=int, default=8000, help="Port d'écoute")
+    parser.add_argument("--workers", type=int, default=8, help="Nombre de threads de traitement")
+    parser.add_argument("--queue-size", type=int, default=64, help="Nombre de connexions pouvant attendre un thread libre (au-delà, réponse 503)")
+    parser.add_argument("--shards", type=int, default=0, help="Nombre de shards interrogés en parallèle dans des processus (0 pour un index unique)")
+    parser.add_argument("--compact", action="store_true", help="Index compressé (identifiants delta/varbyte, poids en float32)")
+    args = parser.parse_args()
+
+    # Chargement des données et de l'index (une seule fois pour toutes les requêtes)
+    corpus = Corpus(compact=args.compact)
+    corpus.load_streaming('./data/data.json')
+    if args.shards > 0:
+        search_engine = ShardedSearchEngine(corpus, num_shards=args.shards, index_path='./data/shards')
+    else:
+        search_engine = SearchEngine(corpus, index_path='./data/index')
+
+    server = SearchServer(search_engine, host=args.host, port=args.port, workers=args.workers, queue_size=args.queue_size)
+    print(f"Service de recherche disponible sur http://{args.host}:{server.server_port}/search?q=...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.shards > 0:
+            search_engine.close()
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ import pytest
 from io import StringIO
 import sys
 import os
+import json
+import numpy as np
 
 @pytest.fixture
 def corpus():
@@ -36,3 +38,745 @@ def test_get_corpus_info(corpus):
     )
     assert output == expected_output
 
+
+def test_inverted_index_postings(corpus):
+    texts = corpus.prepare_texts()
+    corpus.calculate_tf(texts)
+
+    # Seules les entrées non nulles sont stockées
+    assert corpus.index.nnz == sum(len(set(text.lower().replace(".", "").split())) for text in texts)
+
+    doc_ids, counts = corpus.index.postings(corpus.vocabulary.index("visit"))
+    assert [corpus.city_names[i] for i in doc_ids] == ["Paris", "New York"]
+    assert list(counts) == [1, 1]
+
+def test_search_top_n(corpus):
+    from models.SearchEngine import SearchEngine
+    search_engine = SearchEngine(corpus)
+
+    results = search_engine.search("british museum", top_n=2)
+    assert results.cities == ["London", "Paris"]
+    assert results[0].score > 0
+    assert results[1].score == 0
+    assert results[0].text == corpus.data["London"]["do"]
+    assert results[0].snippet(10) == "Explore th..."
+
+    results_df = results.to_dataframe()
+    assert list(results_df.columns) == ["City", "Similarity Score"]
+    assert list(results_df["City"]) == ["London", "Paris"]
+
+def test_calculate_idf_whole_words(corpus):
+    texts = ["Modern art museum.", "A beach party.", "Street art and a party."]
+    corpus.calculate_tf(texts)
+    corpus.calculate_idf(texts)
+
+    # "art" ne doit pas être compté dans "party"
+    art = corpus.vocabulary.index("art")
+    party = corpus.vocabulary.index("party")
+    assert corpus.index.document_frequencies()[art] == 2
+    assert corpus.idf_vector[art] == corpus.idf_vector[party]
+
+def test_save_and_load_index(corpus, tmp_path):
+    from models.Corpus import Corpus
+    texts = corpus.prepare_texts()
+    corpus.calculate_tf(texts)
+    corpus.calculate_idf(texts)
+    corpus.calculate_tfidf()
+    corpus.save_index(tmp_path, fingerprint="v1")
+
+    # Une empreinte différente invalide l'index
+    assert not Corpus().load_index(tmp_path, fingerprint="v2")
+
+    loaded = Corpus()
+    assert loaded.load_index(tmp_path, fingerprint="v1")
+    assert loaded.vocabulary == corpus.vocabulary
+    assert loaded.city_names == corpus.city_names
+    assert isinstance(loaded.tfidf_values, np.memmap)
+    assert np.allclose(loaded.tfidf_matrix, corpus.tfidf_matrix)
+
+def test_encode_query(corpus):
+    texts = corpus.prepare_texts()
+    corpus.calculate_tf(texts)
+
+    term_ids, weights = corpus.encode_query("Visit VISIT the unknownword Café!")
+    terms = {corpus.vocabulary[term_id]: weight for term_id, weight in zip(term_ids, weights)}
+    assert terms == {"visit": 2, "the": 1}
+
+@pytest.fixture
+def wikivoyage_stub():
+    """Serveur HTTP local simulant l'API MediaWiki (prop=revisions)."""
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from urllib.parse import urlparse, parse_qs
+
+    pages = {
+        "Paris": "Intro\n== Do ==\nVisit the '''Louvre'''.\n== Eat ==\nCroissants.",
+        "London": "== See ==\nBig Ben.\n== Do ==\nWalk along the [[Thames]].",
+        "Rome": "== See ==\nThe Colosseum.",
+    }
+    requested_titles = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            titles = parse_qs(urlparse(self.path).query)["titles"][0].split("|")
+            requested_titles.append(titles)
+            result = {"query": {"pages": [
+                {"title": title, "revisions": [{"slots": {"main": {"content": pages[title]}}}]}
+                if title in pages else {"title": title, "missing": True}
+                for title in titles
+            ]}}
+            body = json.dumps(result).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/w/api.php", requested_titles
+    server.shutdown()
+
+def test_crawl_batches_and_resumes(wikivoyage_stub, tmp_path):
+    sys.path.append(os.path.abspath(".."))
+    from data.data_api import crawl
+    api_url, requested_titles = wikivoyage_stub
+    output_file = tmp_path / "data.json"
+    checkpoint_file = tmp_path / "checkpoint.json"
+    cities = ["Paris", "London", "Rome", "Atlantis"]
+
+    store_file = tmp_path / "data.jsonl"
+    collected = crawl(cities, api_url=api_url, output_file=str(output_file), store_file=str(store_file),
+                      checkpoint_file=str(checkpoint_file), batch_size=2, requests_per_second=0)
+    assert sorted(collected) == ["London", "Paris"]
+    assert "Louvre" in collected["Paris"] and "Croissants" not in collected["Paris"]
+    assert sorted(map(len, requested_titles)) == [2, 2]
+
+    # Un second crawl ne redemande aucune page déjà traitée
+    assert crawl(cities, api_url=api_url, output_file=str(output_file), store_file=str(store_file),
+                 checkpoint_file=str(checkpoint_file)) == {}
+    assert len(requested_titles) == 2
+    with open(output_file, encoding="utf-8") as file:
+        assert sorted(json.load(file)) == ["London", "Paris"]
+
+def test_document_store_append_and_compact(tmp_path):
+    from models.Corpus import Corpus
+    from models.DocumentStore import DocumentStore
+    store_file = tmp_path / "data.jsonl"
+
+    with DocumentStore(store_file, flush_every=2) as store:
+        store.append("Paris", {"do": "Visit the Louvre."})
+        store.append("London", {"do": "Walk along the Thames."})
+        store.append("Paris", {"do": "Visit the Eiffel Tower."})
+
+    # Une écriture interrompue laisse une dernière ligne tronquée
+    with open(store_file, "a", encoding="utf-8") as file:
+        file.write('{"city": "Rome", "do": "Visit')
+    with DocumentStore(store_file) as store:
+        store.append("Lima", {"do": "Surf at Miraflores."})
+
+    corpus = Corpus()
+    corpus.load_from_store(store_file)
+    assert corpus.data == {
+        "Paris": {"do": "Visit the Eiffel Tower."},
+        "London": {"do": "Walk along the Thames."},
+        "Lima": {"do": "Surf at Miraflores."},
+    }
+
+    DocumentStore(store_file).compact(tmp_path / "data.json")
+    with open(tmp_path / "data.json", encoding="utf-8") as file:
+        assert json.load(file) == corpus.data
+
+def test_incremental_updates_match_full_rebuild(corpus):
+    from models.Corpus import Corpus
+    from models.SearchEngine import SearchEngine
+    search_engine = SearchEngine(corpus)
+    # Fusion explicite uniquement
+    corpus.merge_ratio = float("inf")
+
+    search_engine.add_document("Rome", "Visit the Colosseum and enjoy a gelato.")
+    search_engine.update_document("Paris", "Enjoy the Louvre museum.")
+    search_engine.delete_document("London")
+    results = search_engine.search("enjoy the museum", top_n=3)
+
+    # Reconstruire l'index complet à partir des mêmes données
+    rebuilt = Corpus()
+    rebuilt.data = dict(corpus.data)
+    expected = SearchEngine(rebuilt).search("enjoy the museum", top_n=3)
+
+    # Avant la fusion, les poids des documents existants ne sont pas recalculés, mais les mêmes villes sont trouvées
+    assert corpus.index.num_documents == 3 and corpus.pending is not None
+    assert sorted(results.cities) == sorted(expected.cities)
+
+    corpus.merge()
+    results = search_engine.search("enjoy the museum", top_n=3)
+    assert corpus.pending is None and not corpus.is_dirty
+    assert corpus.vocabulary == sorted(corpus.vocabulary)
+    assert corpus.index.document_frequencies()[corpus.term_index["british"]] == 0
+    assert sorted(corpus.city_names) == sorted(rebuilt.city_names)
+    assert dict(zip(results.cities, results.scores)) == pytest.approx(dict(zip(expected.cities, expected.scores)))
+
+def test_pending_documents_are_searched_before_merge(corpus):
+    import threading
+    from models.Scorer import BM25Scorer
+    from models.SearchEngine import SearchEngine
+    corpus.merge_ratio = float("inf")
+    search_engine = SearchEngine(corpus)
+    bm25 = SearchEngine(corpus, scorer=BM25Scorer())
+    exhaustive = SearchEngine(corpus, scorer=BM25Scorer(pruning=False))
+    search_engine.search("visit")
+    index, impacts = corpus.index, search_engine.scorer.state.impacts
+
+    # Les ajouts et suppressions sont visibles sans fusionner l'index ni recalculer les impacts existants
+    search_engine.add_document("Rome", "Visit the Colosseum and the Vatican museum.")
+    search_engine.delete_document("London")
+    results = search_engine.search("museum colosseum", top_n=5)
+    assert corpus.index is index and search_engine.scorer.state.impacts is impacts
+    assert results.cities[0] == "Rome" and "London" not in results.cities
+    assert len(results) == 3 and "London" not in search_engine.search_batch(["museum"], top_n=5)[0].cities
+    assert search_engine.search('"vatican museum"').cities == ["Rome"]
+    assert search_engine.complete("vat") == ["vatican"]
+    for query in ["museum", "visit the colosseum", "central park"]:
+        results, expected = bm25.search(query, top_n=2), exhaustive.search(query, top_n=2)
+        assert results.cities == expected.cities and results.scores == pytest.approx(expected.scores)
+
+    # Une recherche n'attend pas la fin d'une fusion
+    finished = threading.Event()
+    with corpus.merge_lock:
+        searcher = threading.Thread(target=lambda: (search_engine.search("gelato"), finished.set()))
+        searcher.start()
+        assert finished.wait(5)
+    searcher.join()
+
+    # Au-delà de merge_ratio, la fusion est lancée en arrière-plan
+    corpus.merge_ratio = 0
+    search_engine.add_document("Lima", "Surf at Miraflores.")
+    search_engine.search("surf")
+    corpus.merge_thread.join()
+    assert not corpus.is_dirty and corpus.index.num_documents == 4 and "London" not in corpus.city_names
+    assert search_engine.search("surf").cities[0] == "Lima"
+
+def test_add_document_keeps_scoring_state(corpus):
+    from models.SearchEngine import SearchEngine
+    search_engine = SearchEngine(corpus)
+    with corpus.lock:
+        state = search_engine.scorer.prepare(corpus)
+    term_ids, weights = corpus.encode_query("visit")
+
+    # Un ajout en attente ne modifie pas l'index lu par une recherche en cours
+    search_engine.add_document("Rome", "Visit the Colosseum.")
+    assert state.index.num_documents == 3
+    assert len(search_engine.scorer.score(state, term_ids, weights)) == 3
+    top_ids, _ = search_engine.top_n_with_operators(state, term_ids, weights, (), (), 5)
+    assert sorted(top_ids.tolist()) == [0, 1, 2]
+    assert "Rome" in search_engine.search("visit").cities
+
+def test_clean_json_parallel(tmp_path):
+    sys.path.append(os.path.abspath(".."))
+    from data.data_clean import clean_json
+    data = {
+        "Paris": {"do": "Visit the Eiffel Tower, and enjoy the Seine!"},
+        "Zürich": {"do": ["Swim in the lake.", "Ski around Zürich."]},
+        "Rome": {"do": "See the Colosseum."},
+    }
+    input_file = tmp_path / "data.json"
+    output_file = tmp_path / "data_cleaned.json"
+    with open(input_file, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False)
+
+    clean_json(str(input_file), str(output_file), stop_words={"the", "and", "in", "around"}, workers=2, chunk_size=1)
+
+    with open(output_file, encoding="utf-8") as file:
+        cleaned = json.load(file)
+    assert list(cleaned) == ["Paris", "Zürich", "Rome"]
+    assert cleaned["Paris"] == {"do": "visit eiffel tower enjoy seine"}
+    assert cleaned["Zürich"] == {"do": ["swim lake", "ski z rich"]}
+
+def test_analyzer_shared_by_index_and_queries(corpus):
+    from models.Analyzer import Analyzer
+    analyzer = Analyzer(stop_words={"the", "and"})
+    assert analyzer.analyze("Visit the Stade Vélodrome and São Paulo!") == ["visit", "stade", "velodrome", "sao", "paulo"]
+
+    corpus.data["Marseille"] = {"do": "Watch football at the Stade Vélodrome."}
+    texts = corpus.prepare_texts()
+    corpus.calculate_tf(texts)
+    term_ids, _ = corpus.encode_query("VELODROME")
+    assert [corpus.vocabulary[term_id] for term_id in term_ids] == ["velodrome"]
+
+def test_bm25_pruning_matches_exhaustive(corpus):
+    from models.SearchEngine import SearchEngine
+    from models.Scorer import BM25Scorer
+    corpus.data["Rome"] = {"do": "Visit the Colosseum, visit the Forum and enjoy a long walk in the park."}
+    corpus.data["Oslo"] = {"do": "Visit the Opera house."}
+    pruned = SearchEngine(corpus, scorer=BM25Scorer())
+    exhaustive = SearchEngine(corpus, scorer=BM25Scorer(pruning=False))
+
+    for query in ["visit", "visit the park", "museum palace tower", "unknownword"]:
+        for top_n in [1, 2, 5]:
+            expected = exhaustive.search(query, top_n=top_n)
+            results = pruned.search(query, top_n=top_n)
+            assert results.cities == expected.cities
+            assert np.allclose(results.scores, expected.scores)
+
+    assert pruned.search("unknownword", top_n=2).scores == [0, 0]
+
+def test_query_cache(corpus):
+    from models.SearchEngine import SearchEngine
+    search_engine = SearchEngine(corpus, cache_size=2)
+
+    first = search_engine.search("Museum")
+    second = search_engine.search("museum!")
+    assert first == second
+    assert search_engine.cache.stats()["hits"] == 1
+
+    # Une modification du corpus invalide le cache
+    search_engine.add_document("Rome", "Visit the Vatican museum.")
+    assert "Rome" in search_engine.search("museum").cities
+    assert search_engine.cache.stats()["misses"] == 2
+
+    # Taille bornée : l'entrée la moins récemment utilisée est retirée
+    search_engine.search("tower")
+    search_engine.search("park")
+    assert search_engine.cache.stats()["size"] == 2
+
+def test_search_batch_matches_search(corpus):
+    from models.SearchEngine import SearchEngine
+    search_engine = SearchEngine(corpus, cache_size=0)
+    queries = ["visit the tower", "", "museum", "park square visit", "unknownword", "the"]
+
+    batch = search_engine.search_batch(queries, top_n=2, chunk_size=4)
+    assert len(batch) == len(queries)
+    for query, results in zip(queries, batch):
+        expected = search_engine.search(query, top_n=2)
+        assert results.cities == expected.cities
+        assert np.allclose(results.scores, expected.scores)
+
+    # La durée enregistrée est celle du lot, et non depuis le démarrage du processus
+    batch_stage = search_engine.metrics.snapshot()["stages"]["query"]["batch"]
+    assert batch_stage["count"] == 1 and batch_stage["sum"] < 5
+
+def test_search_server(corpus):
+    import socket
+    import threading
+    from urllib.error import HTTPError
+    from urllib.request import urlopen
+    from models.SearchEngine import SearchEngine
+    from models.SearchServer import SearchServer
+    server = SearchServer(SearchEngine(corpus), port=0, workers=2, snippet_length=10)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    try:
+        with urlopen(f"{base_url}/search?q=british+museum&top_n=1") as response:
+            payload = json.load(response)
+        assert payload == {"query": "british museum", "results": [
+            {"city": "London", "score": pytest.approx(payload["results"][0]["score"]), "snippet": "Explore th..."},
+        ]}
+        assert payload["results"][0]["score"] > 0
+
+        with urlopen(f"{base_url}/health") as response:
+            assert json.load(response) == {"status": "ok", "documents": 3}
+            assert response.headers["Connection"] == "close"
+
+        # Le serveur ferme la connexion après la réponse, même si le client demande à la garder ouverte
+        with socket.create_connection(("127.0.0.1", server.server_port), timeout=5) as connection:
+            connection.sendall(b"GET /health HTTP/1.1\r\nHost: localhost\r\nConnection: keep-alive\r\n\r\n")
+            received = b""
+            while chunk := connection.recv(4096):
+                received += chunk
+        assert received.startswith(b"HTTP/1.1 200")
+
+        with urlopen(f"{base_url}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert 'moteur_recherche_query_seconds_count{stage="total"} 1' in response.read().decode("utf-8")
+
+        with pytest.raises(HTTPError) as error:
+            urlopen(f"{base_url}/search?q=")
+        assert error.value.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_search_server_backpressure_and_errors(corpus):
+    import socket
+    import threading
+    import time
+    from urllib.error import HTTPError
+    from urllib.request import urlopen
+    from models.SearchEngine import SearchEngine
+    from models.SearchServer import SearchServer
+    search_engine = SearchEngine(corpus)
+    server = SearchServer(search_engine, port=0, workers=1, queue_size=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    try:
+        # Une connexion inactive occupe la seule place : la suivante est refusée immédiatement
+        with socket.create_connection(("127.0.0.1", server.server_port)):
+            with pytest.raises(HTTPError) as error:
+                urlopen(f"{base_url}/health", timeout=5)
+            assert error.value.code == 503
+        assert search_engine.metrics.snapshot()["counters"]["rejected_requests"] == 1
+
+        # La place est libérée à la fermeture de la connexion ; une erreur du moteur est renvoyée en 500
+        def failing_search(query, top_n=5):
+            raise RuntimeError("index indisponible")
+        search_engine.search = failing_search
+        for _ in range(50):
+            with pytest.raises(HTTPError) as error:
+                urlopen(f"{base_url}/search?q=museum", timeout=5)
+            if error.value.code != 503:
+                break
+            time.sleep(0.1)
+        assert error.value.code == 500
+        assert json.load(error.value) == {"error": "Erreur interne : index indisponible"}
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_search_worker_skips_stale_queries():
+    import threading
+    import time
+    from models.SearchWorker import SearchWorker
+
+    class SlowEngine:
+        def __init__(self):
+            self.queries = []
+            self.release = threading.Event()
+
+        def search(self, query, top_n=5):
+            self.queries.append(query)
+            if query == "first":
+                self.release.wait(5)
+            return [query] * top_n
+
+    engine = SlowEngine()
+    worker = SearchWorker(engine)
+    worker.submit("first", 1)
+    while not engine.queries:
+        time.sleep(0.01)
+    worker.submit("second", 1)
+    last_id = worker.submit("third", 2)
+    engine.release.set()
+
+    deadline = time.monotonic() + 5
+    item = None
+    while item is None and time.monotonic() < deadline:
+        item = worker.poll()
+        time.sleep(0.01)
+    worker.close()
+
+    # "second" n'est jamais exécutée et le résultat de "first" est ignoré
+    assert item == (last_id, ["third", "third"], None)
+    assert engine.queries == ["first", "third"]
+
+def test_search_worker_runs_completions_and_suggestions(corpus):
+    import time
+    from models.SearchEngine import SearchEngine
+    from models.SearchWorker import SearchWorker
+    search_engine = SearchEngine(corpus)
+
+    def wait(worker):
+        deadline = time.monotonic() + 5
+        item = None
+        while item is None and time.monotonic() < deadline:
+            item = worker.poll()
+            time.sleep(0.01)
+        worker.close()
+        return item
+
+    completion_worker = SearchWorker(search_engine, "complete")
+    request_id = completion_worker.submit("Pa", 5)
+    assert wait(completion_worker) == (request_id, ["palace", "park"], None)
+
+    suggestion_worker = SearchWorker(search_engine, "suggest")
+    request_id = suggestion_worker.submit("British musuem")
+    assert wait(suggestion_worker) == (request_id, "British museum", None)
+
+def test_benchmark_synthetic_corpus(tmp_path):
+    sys.path.append(os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+    from benchmark import run_benchmark
+    from corpus_generator import generate_corpus
+
+    corpus_data, vocabulary, _ = generate_corpus(50, vocabulary_size=200, mean_length=20, seed=1)
+    assert len(corpus_data) == 50
+    assert all(set(details) == {"do"} for details in corpus_data.values())
+    assert generate_corpus(50, vocabulary_size=200, mean_length=20, seed=1)[0] == corpus_data
+
+    results = run_benchmark(50, num_queries=20, vocabulary_size=200, mean_length=20, measure_memory=False, work_dir=tmp_path)
+    assert results["num_documents"] == 50
+    assert results["build_peak_memory_mb"] is None
+    assert 0 < results["latency_ms_p50"] <= results["latency_ms_p99"]
+    assert results["qps"] > 0
+
+def test_phrase_and_near_queries(corpus):
+    from models.Compression import varbyte_decode, varbyte_encode
+    from models.Query import Query
+    from models.SearchEngine import SearchEngine
+
+    values = np.array([0, 1, 127, 128, 16384, 2 ** 40])
+    assert varbyte_decode(varbyte_encode(values)[0]).tolist() == values.tolist()
+
+    query = Query.parse('"the seine" beach NEAR/2 tower')
+    assert (query.text, query.phrases, query.near) == ("the seine beach tower", ["the seine"], [("beach", "tower", 2)])
+
+    search_engine = SearchEngine(corpus)
+    index = corpus.index
+    doc_ids, counts = index.phrase_counts(corpus.encode_phrase("and visit"))
+    assert [corpus.city_names[i] for i in doc_ids] == ["New York"] and counts.tolist() == [1]
+    assert search_engine.search('"the british museum"').cities == ["London"]
+    assert search_engine.search('"museum british"').cities == []
+    assert search_engine.search('visit "unknown words"').cities == []
+
+    # "park" et "visit" sont à 2 mots d'écart à New York
+    assert [corpus.city_names[i] for i in index.near_counts(corpus.term_index["visit"], corpus.term_index["park"], 2)[0]] == ["New York"]
+    assert len(index.near_counts(corpus.term_index["visit"], corpus.term_index["park"], 1)[0]) == 0
+    plain = search_engine.search("visit park")
+    boosted = search_engine.search("visit NEAR/3 park")
+    assert boosted.cities == plain.cities and boosted.scores[0] == pytest.approx(plain.scores[0] * 1.5)
+
+    # Les positions sont conservées par les mises à jour incrémentales
+    search_engine.add_document("Rome", "Visit the Colosseum, then visit the British Museum exhibition.")
+    assert search_engine.search('"the british museum"').cities == ["London", "Rome"]
+
+def test_operators_without_positions(corpus):
+    from models.Corpus import Corpus
+    from models.SearchEngine import SearchEngine
+    unpositioned = Corpus(store_positions=False)
+    unpositioned.data = dict(corpus.data)
+    search_engine = SearchEngine(unpositioned)
+    assert not unpositioned.index.has_positions
+
+    # Les phrases et les opérateurs NEAR sont recherchés comme de simples mots
+    for query, plain in [('"eiffel tower"', "eiffel tower"), ("museum NEAR/3 british", "museum british")]:
+        results, expected = search_engine.search(query, top_n=3), search_engine.search(plain, top_n=3)
+        assert results.cities == expected.cities and results.scores == expected.scores
+    assert search_engine.search_batch(['"eiffel tower"', "park"], top_n=1)[0].cities == ["Paris"]
+
+def test_corpus_search_uses_index(corpus, capsys):
+    assert corpus.search("the") == [("Paris", 2), ("London", 1)]
+    assert corpus.search("British Museum") == [("London", 1)]
+    assert corpus.search("museum british") == []
+    assert corpus.search("castle") == []
+    assert capsys.readouterr().out == ""
+
+    assert corpus.most_common_terms(3) == [("and", 3), ("the", 3), ("visit", 2)]
+    corpus.add_document("Rome", "Visit the Colosseum.")
+    assert corpus.most_common_terms(1) == [("the", 4)]
+    assert corpus.search("colosseum") == [("Rome", 1)]
+
+def test_corpus_search_without_positions(corpus):
+    from models.Corpus import Corpus
+    unpositioned = Corpus(store_positions=False)
+    unpositioned.data = dict(corpus.data)
+    assert unpositioned.search("British Museum") == [("London", 1)]
+    assert unpositioned.search("visit the") == [("Paris", 1)]
+    assert unpositioned.search("museum british") == []
+    assert unpositioned.search("the") == corpus.search("the")
+
+def test_load_streaming(tmp_path, corpus):
+    from models.Corpus import Corpus
+    from models.DocumentStore import DocumentStore
+    from models.LazyDocuments import LazyDocuments, iter_json_object
+    from models.SearchEngine import SearchEngine
+
+    data_file = tmp_path / "data.json"
+    data_file.write_text(json.dumps({**corpus.data, "Montréal": {"do": "Visit the Vieux-Port, café terrace."}}, ensure_ascii=False, indent=4), encoding="utf-8")
+    raw = data_file.read_bytes()
+    for city, document, start, end in iter_json_object(str(data_file), chunk_size=16):
+        assert json.loads(raw[start:end]) == document
+
+    streamed = Corpus()
+    streamed.load_streaming(str(data_file))
+    assert isinstance(streamed.data, LazyDocuments)
+    assert streamed.get_city_activities("Montréal") == "Visit the Vieux-Port, café terrace."
+
+    loaded = Corpus()
+    loaded.load_from_files(str(data_file), str(data_file))
+    for query in ("visit", "cafe museum", '"the eiffel tower"'):
+        assert SearchEngine(streamed).search(query) == SearchEngine(loaded).search(query)
+
+    # JSON Lines : la dernière version d'une ville est conservée
+    store_file = str(tmp_path / "data.jsonl")
+    with DocumentStore(store_file) as store:
+        store.append("Paris", {"do": "Old text."})
+        store.append("Rome", {"do": "Visit the Colosseum."})
+        store.append("Paris", {"do": "New text."})
+    streamed.load_streaming(store_file)
+    assert dict(streamed.data) == {"Paris": {"do": "New text."}, "Rome": {"do": "Visit the Colosseum."}}
+
+def test_tfidf_sparse_and_chunked_export(corpus, tmp_path):
+    import pandas as pd
+    with pytest.raises(ValueError):
+        corpus.get_tfidf_matrix()
+
+    corpus.build_index()
+    dense = corpus.get_tfidf_matrix(sparse=False)
+    sparse = corpus.get_tfidf_matrix()
+    assert all(isinstance(dtype, pd.SparseDtype) and dtype.fill_value == 0 for dtype in sparse.dtypes)
+    assert list(sparse.index) == list(dense.index) and list(sparse.columns) == list(dense.columns)
+    assert np.allclose(sparse.sparse.to_dense().values, dense.values)
+
+    chunks = list(corpus.iter_tfidf_chunks(chunk_size=2))
+    assert len(chunks) == 2
+    long_format = pd.concat(chunks).set_index(["City", "Term"])["TF-IDF"]
+    expected = dense.stack()
+    expected = expected[expected != 0]
+    assert np.allclose(long_format.sort_index().values, expected.sort_index().values)
+
+    pq = pytest.importorskip("pyarrow.parquet")
+    assert corpus.write_tfidf_parquet(str(tmp_path / "tfidf.parquet"), chunk_size=2) == len(long_format)
+    assert pq.read_table(str(tmp_path / "tfidf.parquet")).num_rows == len(long_format)
+
+def test_metrics_stages_and_profile(corpus):
+    from models.Metrics import Metrics
+    from models.SearchEngine import SearchEngine
+    search_engine = SearchEngine(corpus)
+    search_engine.search("british museum")
+    search_engine.search("british museum")
+
+    snapshot = search_engine.metrics.snapshot()
+    assert {"tokenize", "index", "tf", "idf", "tfidf", "norms"} <= set(snapshot["stages"]["build"])
+    query_stages = snapshot["stages"]["query"]
+    assert query_stages["total"]["count"] == 2
+    # La deuxième recherche est lue dans le cache
+    assert query_stages["score"]["count"] == query_stages["select"]["count"] == query_stages["render"]["count"] == 1
+    assert query_stages["total"]["p50"] <= query_stages["total"]["max"]
+    assert snapshot["counters"]["queries"] == 2
+    assert snapshot["gauges"]["cache_hit_rate"] == 0.5
+
+    text = search_engine.metrics.to_prometheus()
+    assert 'moteur_recherche_query_seconds_bucket{stage="total",le="+Inf"} 2' in text
+    assert "moteur_recherche_cache_hits 1.0" in text
+
+    # Le profilage recalcule les scores sans passer par le cache
+    results, report = search_engine.profile_search("british museum", top_n=1)
+    assert results.cities == ["London"]
+    assert report["peak_memory"] > 0 and "function calls" in report["profile"]
+    assert search_engine.metrics.snapshot()["stages"]["query"]["score"]["count"] == 2
+
+    disabled = Metrics(enabled=False)
+    with disabled.time("build", "load"):
+        pass
+    assert disabled.snapshot() == {"stages": {}, "counters": {}, "gauges": {}}
+
+def test_sharded_search_matches_single_index(corpus, tmp_path):
+    from models.Corpus import Corpus
+    from models.Scorer import BM25Scorer
+    from models.SearchEngine import SearchEngine
+    from models.ShardedSearchEngine import ShardedSearchEngine
+    data_path = tmp_path / "data.json"
+    data_path.write_text(json.dumps(corpus.data), encoding="utf-8")
+    queries = ["visit the museum", "park", '"central park"', "seine NEAR/3 cruise", "unknown"]
+
+    for scorer in (None, BM25Scorer):
+        single = Corpus()
+        single.data = dict(corpus.data)
+        search_engine = SearchEngine(single, scorer=scorer() if scorer else None)
+
+        sharded_corpus = Corpus()
+        sharded_corpus.load_streaming(str(data_path))
+        with ShardedSearchEngine(sharded_corpus, num_shards=2, workers=1, index_path=str(tmp_path / "shards"),
+                                 scorer=scorer() if scorer else None) as sharded:
+            for query in queries:
+                expected, results = search_engine.search(query, top_n=3), sharded.search(query, top_n=3)
+                assert results.cities == expected.cities and results.scores == expected.scores
+            assert [results.cities for results in sharded.search_batch(queries, top_n=3)] == \
+                [results.cities for results in search_engine.search_batch(queries, top_n=3)]
+        # Les shards enregistrés sont rechargés tant que les données n'ont pas changé
+        assert (tmp_path / "shards" / "shards.json").exists()
+
+    reloaded_corpus = Corpus()
+    reloaded_corpus.load_streaming(str(data_path))
+    with ShardedSearchEngine(reloaded_corpus, num_shards=2, workers=1, index_path=str(tmp_path / "shards")) as sharded:
+        assert sharded.search("british museum", top_n=1).cities == ["London"]
+        # Le cache est indexé par les termes analysés de la requête
+        assert sharded.search("  British   MUSEUM ", top_n=1).cities == ["London"]
+        assert sharded.cache_key("museum  British", 1) == sharded.cache_key("british museum", 1)
+        assert sharded.cache.hits == 1
+    assert reloaded_corpus.metrics.snapshot()["stages"]["build"].get("shards") is None
+
+    # Les données chargées en mémoire sont découpées par ville entre les processus
+    memory_corpus = Corpus()
+    memory_corpus.data = dict(corpus.data)
+    with ShardedSearchEngine(memory_corpus, num_shards=3, workers=1, index_path=str(tmp_path / "memory_shards")) as sharded:
+        assert memory_corpus.city_names == single.city_names
+        assert sharded.search("british museum", top_n=1).cities == ["London"]
+
+def test_compact_index_and_vocabulary(corpus, tmp_path):
+    from models.Corpus import Corpus
+    from models.SearchEngine import SearchEngine
+    from models.Vocabulary import TermIndex, Vocabulary
+    vocabulary = Vocabulary.from_words(["café", "musée", "parc"])
+    assert vocabulary == ["café", "musée", "parc"] and vocabulary[-1] == "parc" and vocabulary[:2] == ["café", "musée"]
+    assert vocabulary.index("musée") == 1 and "tour" not in vocabulary and vocabulary.find("tour") == -1
+    assert vocabulary.prefix_range("m") == (1, 2) and vocabulary.prefix_range("") == (0, 3) and vocabulary.prefix_range("z") == (3, 3)
+    assert dict(TermIndex(vocabulary)) == {"café": 0, "musée": 1, "parc": 2}
+    with pytest.raises(KeyError):
+        TermIndex(vocabulary)["tour"]
+
+    compact = Corpus(compact=True)
+    compact.data = dict(corpus.data)
+    compact.build_index()
+    corpus.build_index()
+    assert compact.index.is_compressed and compact.index.doc_ids is None
+    assert compact.tfidf_values.dtype == np.float32
+    assert list(compact.vocabulary) == list(corpus.vocabulary)
+    # Sans compression, les termes restent dans une liste et un dictionnaire
+    assert isinstance(corpus.vocabulary, list) and isinstance(corpus.term_index, dict)
+    assert isinstance(compact.term_index, TermIndex)
+    term_id = corpus.term_index["museum"]
+    assert np.array_equal(compact.index.postings(term_id)[0], corpus.index.postings(term_id)[0])
+
+    for query in ["visit the museum", '"central park"', "seine NEAR/3 cruise"]:
+        expected, results = SearchEngine(corpus).search(query, top_n=3), SearchEngine(compact).search(query, top_n=3)
+        assert results.cities == expected.cities
+        assert np.allclose(results.scores, expected.scores, atol=1e-6)
+
+    compact.save_index(str(tmp_path / "index"))
+    reloaded = Corpus(compact=True)
+    reloaded.data = dict(corpus.data)
+    assert reloaded.load_index(str(tmp_path / "index"))
+    assert reloaded.index.is_compressed and reloaded.vocabulary == compact.vocabulary
+    # Le vocabulaire projeté en mémoire n'est pas recopié
+    assert isinstance(reloaded.vocabulary.data, np.memmap)
+    assert SearchEngine(reloaded).complete("pa") == SearchEngine(corpus).complete("pa")
+    # Un index compressé n'est pas rechargé par un corpus non compressé
+    uncompressed = Corpus()
+    uncompressed.data = dict(corpus.data)
+    assert not uncompressed.load_index(str(tmp_path / "index"))
+
+def test_autocomplete_and_spelling_suggestions(corpus):
+    from models.SearchEngine import SearchEngine
+    from models.Suggester import edit_distance
+    assert edit_distance("musuem", "museum", 2) == 1 and edit_distance("parc", "park", 2) == 1
+    assert edit_distance("tower", "palace", 2) == 3
+
+    search_engine = SearchEngine(corpus)
+    assert search_engine.suggester.prepare().prefix_ids("p").tolist() == [corpus.term_index["palace"], corpus.term_index["park"]]
+    assert search_engine.complete("Pa") == ["palace", "park"]
+    assert search_engine.complete("The") == ["the"] and search_engine.complete("xyz") == []
+    assert search_engine.complete("vi", limit=1) == ["visit"]
+
+    assert search_engine.suggester.correct("musuem") == ["museum"]
+    assert search_engine.suggester.correct("tw") == []
+    assert search_engine.suggest("British musuem") == "British museum"
+    assert search_engine.suggest('"centrl park" NEAR/3 seine') == '"central park" NEAR/3 seine'
+    assert search_engine.suggest("visit the museum") is None
+
+    # Les suggestions suivent les mises à jour de l'index
+    search_engine.add_document("Rome", "Admire the Colosseum and the Pantheon.")
+    assert search_engine.complete("pa") == ["palace", "pantheon", "park"]
+    assert search_engine.suggest("colloseum") == "colosseum"
+
+def test_calculate_idf_accepts_generators(corpus):
+    corpus.calculate_idf(corpus.iter_texts())
+    assert corpus.index.num_documents == 3 and len(corpus.idf_vector) == len(corpus.vocabulary)
+    # Un générateur ne reconstruit pas l'index existant ; une liste de taille différente le reconstruit
+    corpus.calculate_idf(text for text in ["Only one text"])
+    assert corpus.index.num_documents == 3
+    corpus.calculate_idf(["Only one text"])
+    assert corpus.index.num_documents == 1